@@ -1,11 +1,20 @@
 
 
+import time
 from collections import defaultdict
 import numpy as np
 import matplotlib.pyplot as plt
 
 from .util import politica_procesable
+from .util import nombres_acciones
 from .util import calcula_dimensiones
+from .util import crea_muestreador
+from .util import VistaQ
+from .util import DistribucionInicial
+from .util import retornos_descontados
+from .util import FlujoUniformes
+from .punto_control import guarda_punto_control
+from .punto_control import reanuda_entrenamiento
 
 class MonteCarlo:
 
@@ -15,20 +24,56 @@ class MonteCarlo:
     Parámetros:
     -----------
     
-    transiciones: array
+    transiciones: array, TransicionesDispersas o ModeloGenerativo
         Matriz de probabilidades de transición. Cada fila representa un estado y cada columna una acción.
+        También se acepta el formato disperso generado por Problem(..., dispersa=True) y el modelo generativo
+        de Problem.modelo_generativo(), que no construye ninguna matriz de transiciones.
     
     recompensas: array
         Matriz de recompensas. Cada fila representa un estado y cada columna una acción.
 
-    politica0: dict
-        Política inicial. Si no se especifica, se inicializa aleatoriamente.
+    politica0: dict o array
+        Política inicial, con la acción de cada estado. Si no se especifica, se inicializa aleatoriamente.
     
     factor_descuento: float
         Factor de descuento. Por defecto es 0.9.
 
     max_iteraciones: int 
         Número máximo de iteraciones. Por defecto es 1000.
+
+    modo_actualizacion: str
+        Forma de actualizar la función Q con cada retorno. Con 'media' (por defecto) Q es la media de todos los retornos
+        observados, calculada de forma incremental con la suma y el número de visitas. Con 'constante' se usa un paso
+        constante, Q = Q + factor_aprendizaje*(U - Q), que da más peso a los retornos recientes.
+
+    factor_aprendizaje: float
+        Tamaño del paso cuando modo_actualizacion es 'constante'. Por defecto es 0.1.
+
+    estado_inicial: None, int o array
+        Distribución de los estados iniciales de los episodios. Si es None (por defecto) se elige un estado no terminal de forma uniforme,
+        si es un entero se empieza siempre en ese estado y si es un array de pesos (uno por estado) se elige con probabilidad proporcional al peso.
+
+    semilla: int o Generator
+        Semilla o generador de números aleatorios de NumPy propio de la instancia, que se usa también para la política
+        inicial aleatoria. Por defecto es None (semilla aleatoria).
+
+    max_pasos_episodio: int
+        Número máximo de pasos de cada episodio. Si no se especifica es el 10% de max_iteraciones (como mínimo 1).
+
+    parada: CriterioParada
+        Criterio de parada anticipada (política estable, cambio de Q por debajo de una tolerancia o tiempo máximo),
+        que se comprueba al final de cada episodio. Por defecto es None, y se completan siempre max_iteraciones + 1 episodios.
+
+    punto_control: String
+        Ruta de un punto de control (.npz). Si se indica, al empezar a entrenar se reanuda desde él si ya existe, y se
+        guarda cada episodios_punto_control episodios y al terminar. Por defecto es None, sin puntos de control.
+
+    episodios_punto_control: int
+        Número de episodios entre dos puntos de control. Por defecto es 100.
+
+    telemetria: Telemetria
+        Instrumentación del entrenamiento (registro de cada episodio y, opcionalmente, tiempo de cada fase de un paso).
+        Por defecto es None, sin instrumentación.
     
     Atributos:
     -----------
@@ -39,17 +84,54 @@ class MonteCarlo:
     acciones: int
         Número de acciones del problema.
 
-    racum: Dict
-        Diccionario que almacena las recompensas acumuladas por cada par (estado, acción).
+    sucesores: Array
+        Índices de los posibles estados sucesores de cada par (acción, estado). Es None con un modelo generativo.
+
+    probabilidades: Array
+        Probabilidad de cada uno de los sucesores.
+
+    muestreador: MuestreadorSucesores o ModeloGenerativo
+        Tablas alias precalculadas para muestrear el siguiente estado en tiempo constante, o el propio modelo generativo.
+
+    racum: Array
+        Tabla de tamaño estados x acciones con la suma de los retornos observados para cada par (estado, acción).
+
+    visitas: Array
+        Tabla de tamaño estados x acciones con el número de retornos observados para cada par (estado, acción).
+
+    terminales: Array
+        Máscara booleana con los estados terminales, calculada una sola vez en el constructor.
+
+    distribucion_inicial: DistribucionInicial
+        Distribución precalculada de los estados iniciales de los episodios.
+
+    politica: Array
+        Acción elegida en cada estado por la política actual.
+
+    tabla_q: Array
+        Tabla de tamaño estados x acciones que almacena los valores de la función Q para cada par (estado, acción).
 
-    q: Dict
-        Diccionario que almacena los valores de la función Q para cada par (estado, acción).
+    q: VistaQ
+        Vista de solo lectura de tabla_q con forma de diccionario, q[estado][accion].
+
+    generador: Generator
+        Generador de números aleatorios de la instancia.
+
+    uniformes: FlujoUniformes
+        Flujo de uniformes generados por bloques a partir de generador, del que salen todos los números aleatorios del entrenamiento.
+
+    episodio_truncado: bool
+        Indica si el último episodio generado se cortó antes de llegar a un estado terminal.
+
+    episodios: int
+        Número de episodios completados durante el entrenamiento.
 
     Métodos:
     -----------
 
     es_terminal(estado) -> bool
         Comprueba si un estado es terminal. Consideramos que un estado es terminal si la suma de las recompensas asociadas a cada acción es 0.
+        La comprobación se hace sobre la máscara terminales, precalculada en el constructor.
     
     siguiente_estado(estado, accion) -> int
         Devuelve el siguiente estado tras ejecutar una acción en un estado dado, en este caso la eleccion del siguiente estado se ve afectada por la probabilidad de transición.
@@ -59,21 +141,31 @@ class MonteCarlo:
         Devuelve la recompensa asociada a una acción en un estado dado.
     
     estado_aleatorio_no_terminal() -> int
-        Devuelve un estado aleatorio no terminal y realiza una comprobación para asegurarse de que el estado no es terminal.
+        Devuelve un estado inicial no terminal según la distribución de estados iniciales, en tiempo constante.
     
     generar_episodio() -> List
         Genera un episodio siguiendo la política actual. Un episodio es una lista de tuplas de la forma (estado, acción, recompensa).
-        Comienza en un estado aleatorio no terminal y termina cuando se alcanza un estado terminal, cuando se supera el número máximo de iteraciones o 
-        cuando el contador supera el 10% del número máximo de iteraciones para evitar bucles infinitos.
+        Comienza en un estado aleatorio no terminal y termina cuando se alcanza un estado terminal o tras max_pasos_episodio pasos
+        para evitar bucles infinitos.
     
     entrenar_primera_visita() -> None
         Entrena el algoritmo de Monte Carlo con el método de primera visita. Se generan episodios y se actualizan los valores de la función Q y la política 
-        solo si el par (estado, acción) no ha sido visitado previamente en el episodio.
+        solo si el par (estado, acción) no ha sido visitado previamente en el episodio. Los retornos de todo el episodio se calculan con una sola
+        pasada hacia atrás mediante retornos_descontados().
     
     entrenar_cada_visita() -> None
         Entrena el algoritmo de Monte Carlo con el método de cada visita. Se generan episodios y se actualizan los valores de la función Q y la política 
         en cada visita.
+
+    Los dos métodos de entrenamiento se reanudan desde el punto de control si lo hay; si no, el contador episodios vuelve
+    a cero, por lo que cada llamada entrena de nuevo todos los episodios partiendo de la tabla Q y los retornos actuales.
     
+    registra_episodio(episodio, inicio_actualizacion=None) -> None
+        Pasa a la telemetría el registro de un episodio ya usado para actualizar la función Q.
+
+    actualiza_q(estado, accion, U) -> None
+        Incorpora el retorno U del par (estado, acción) a la función Q en tiempo constante y actualiza la política en ese estado.
+
     obtener_politica() -> List
         Devuelve la política óptima obtenida tras entrenar el algoritmo de Monte Carlo. La política se devuelve en un formato procesable por la función 
         politica_procesable().
@@ -81,40 +173,70 @@ class MonteCarlo:
 
 
     
-    def __init__(self, transiciones, recompensas, politica0=None, factor_descuento=0.9, max_iteraciones=1000):
+    def __init__(self, transiciones, recompensas, politica0=None, factor_descuento=0.9, max_iteraciones=1000, modo_actualizacion='media', factor_aprendizaje=0.1, estado_inicial=None, semilla=None, max_pasos_episodio=None, parada=None, punto_control=None, episodios_punto_control=100, telemetria=None):
 
 
         self.transiciones = transiciones 
         self.recompensas = recompensas 
 
+        self.generador = np.random.default_rng(semilla)
+
         self.estados, self.acciones = calcula_dimensiones(transiciones) 
         
         if politica0 is None:
-            self.politica = {s: np.random.choice(self.acciones) for s in range(self.estados)} 
+            self.politica = self.generador.integers(self.acciones, size=self.estados)
+        elif isinstance(politica0, dict):
+            self.politica = np.array([politica0[s] for s in range(self.estados)])
         else :
-            self.politica = politica0
+            self.politica = np.array(politica0)
 
         self.factor_descuento = factor_descuento 
         assert 0.0 < self.factor_descuento <= 1.0, "El valor del descuento debe estar entre 0 y 1"
 
         self.max_iteraciones = max_iteraciones 
+
+        self.max_pasos_episodio = max(1, int(self.max_iteraciones*0.1)) if max_pasos_episodio is None else int(max_pasos_episodio)
+        assert self.max_pasos_episodio > 0, "El número máximo de pasos por episodio debe ser un entero positivo"
+
+        self.modo_actualizacion = modo_actualizacion
+        assert self.modo_actualizacion in ('media', 'constante'), "El modo de actualización debe ser 'media' o 'constante'"
+
+        self.factor_aprendizaje = factor_aprendizaje
+        assert 0.0 < self.factor_aprendizaje <= 1.0, "El valor del factor de aprendizaje debe estar entre 0 y 1"
         
 
-        self.racum = {s: {a: [] for a in range(self.acciones)} for s in range(self.estados)}
+        self.racum = np.zeros((self.estados, self.acciones))
+        self.visitas = np.zeros((self.estados, self.acciones), dtype=np.int64)
+
+
+        self.uniformes = FlujoUniformes(self.generador)
+        self.sucesores, self.probabilidades, self.muestreador = crea_muestreador(transiciones, self.uniformes)
 
+        self.terminales = np.asarray(self.recompensas).sum(axis=1) == 0
+        self.distribucion_inicial = DistribucionInicial(self.terminales, estado_inicial, self.uniformes)
 
-        self.q = {s: {a: 0.0 for a in range(self.acciones)} for s in range(self.estados)} 
+        self.tabla_q = np.zeros((self.estados, self.acciones))
+        self.parada = parada
+        self.punto_control = punto_control
+        self.episodios_punto_control = int(episodios_punto_control)
+        assert self.episodios_punto_control > 0, "El número de episodios entre puntos de control debe ser un entero positivo"
+        self.telemetria = telemetria
+        self.episodio_truncado = False
+        self.episodios = 0
+
+
+    @property
+    def q(self):
+        return VistaQ(self.tabla_q)
 
 
     def es_terminal(self, estado):
     
-        return sum(self.recompensas[estado]) == 0
+        return self.terminales[estado]
  
 
     def siguiente_estado(self,estado,accion):
-        matriz_accion_elegida = self.transiciones[accion]
-        posibles_siguientes_estados = matriz_accion_elegida[estado]
-        return np.random.choice(range(self.estados), p=posibles_siguientes_estados)
+        return self.muestreador.muestrea(estado, accion)
     
 
     def recompensa_accion(self,estado,accion):
@@ -122,61 +244,116 @@ class MonteCarlo:
        
 
     def estado_aleatorio_no_terminal(self):
-        estado = np.random.choice(range(self.estados))
-        while self.es_terminal(estado):
-            estado = np.random.choice(range(self.estados))
-        return estado
+        return self.distribucion_inicial.muestrea()
     
 
     def generar_episodio(self):
+        fases = self.telemetria is not None and self.telemetria.fases
+        seleccion = muestreo = 0.0
         episodio = [] # Lista de tuplas (estado, acción, recompensa)
         estado = self.estado_aleatorio_no_terminal() # Estado inicial
-        while(self.es_terminal(estado)):
-            estado = np.random.choice(range(self.estados))
-        accion= np.random.choice(range(self.acciones))
+        accion= int(self.uniformes.random()*self.acciones)
         recompensa = self.recompensas[estado][accion]
         contador = 0
 
         while not self.es_terminal(estado):
             episodio.append((estado, accion, recompensa))
+            if fases:
+                t0 = time.perf_counter()
             estado = self.siguiente_estado(estado, accion)
+            if fases:
+                t1 = time.perf_counter()
             accion = self.politica[estado]
+            if fases:
+                muestreo += t1 - t0
+                seleccion += time.perf_counter() - t1
             recompensa = self.recompensas[estado][accion]
             contador += 1
 
-            if(contador > self.max_iteraciones * 0.1):
+            if contador >= self.max_pasos_episodio:
                 break
 
+        self.episodio_truncado = not self.es_terminal(estado)
+        if fases:
+            self.telemetria.acumula_fases(seleccion, muestreo, 0.0)
         return episodio
 
 
     def entrenar_primera_visita(self):
-        for _ in range(self.max_iteraciones + 1):
+        reanuda_entrenamiento(self)
+        telemetria = self.telemetria
+        if telemetria is not None:
+            telemetria.inicia(self)
+        if self.parada is not None:
+            self.parada.inicia(self)
+        while self.episodios < self.max_iteraciones + 1:
             episodio = self.generar_episodio()
+            if telemetria is not None and telemetria.fases:
+                inicio = time.perf_counter()
+            retornos = retornos_descontados([reward for _, _, reward in episodio], self.factor_descuento)
             visitados = set()
             for t in range(len(episodio)):
-                estado, accion, reward = episodio[t]
+                estado, accion, _ = episodio[t]
                 if (estado, accion) not in visitados:
                     visitados.add((estado, accion))
-                    U = sum([self.factor_descuento**(i-t)*reward for i in range(t, len(episodio))])
-                    self.racum[estado][accion].append(U)
-                    self.q[estado][accion] = np.mean(self.racum[estado][accion])
-                    self.politica[estado] = max(self.q[estado], key=self.q[estado].get)
+                    self.actualiza_q(estado, accion, retornos[t])
+            self.episodios += 1
+            if telemetria is not None:
+                self.registra_episodio(episodio, inicio if telemetria.fases else None)
+            if self.punto_control is not None and self.episodios % self.episodios_punto_control == 0:
+                guarda_punto_control(self, self.punto_control)
+            if self.parada is not None and self.parada.comprueba(self):
+                break
+        if self.punto_control is not None:
+            guarda_punto_control(self, self.punto_control)
 
 
     def entrenar_cada_visita(self):
-        for _ in range(self.max_iteraciones + 1):
+        reanuda_entrenamiento(self)
+        telemetria = self.telemetria
+        if telemetria is not None:
+            telemetria.inicia(self)
+        if self.parada is not None:
+            self.parada.inicia(self)
+        while self.episodios < self.max_iteraciones + 1:
             episodio = self.generar_episodio()
+            if telemetria is not None and telemetria.fases:
+                inicio = time.perf_counter()
+            retornos = retornos_descontados([reward for _, _, reward in episodio], self.factor_descuento)
             for t in range(len(episodio)):
-                estado, accion, reward = episodio[t]
-                U = sum([self.factor_descuento**(i-t)*reward for i in range(t, len(episodio))])
-                self.racum[estado][accion].append(U)
-                self.q[estado][accion] = np.mean(self.racum[estado][accion])
-                self.politica[estado] = max(self.q[estado], key=self.q[estado].get)
+                estado, accion, _ = episodio[t]
+                self.actualiza_q(estado, accion, retornos[t])
+            self.episodios += 1
+            if telemetria is not None:
+                self.registra_episodio(episodio, inicio if telemetria.fases else None)
+            if self.punto_control is not None and self.episodios % self.episodios_punto_control == 0:
+                guarda_punto_control(self, self.punto_control)
+            if self.parada is not None and self.parada.comprueba(self):
+                break
+        if self.punto_control is not None:
+            guarda_punto_control(self, self.punto_control)
+
+
+    def registra_episodio(self, episodio, inicio_actualizacion=None):
+        # pasa a la telemetría el episodio recién usado para actualizar Q (Monte Carlo no tiene error TD)
+        if inicio_actualizacion is not None:
+            self.telemetria.acumula_fases(0.0, 0.0, time.perf_counter() - inicio_actualizacion)
+        recompensa = sum(reward for _, _, reward in episodio)
+        self.telemetria.registra_episodio(self, len(episodio), self.episodio_truncado, recompensa)
+
+
+    def actualiza_q(self, estado, accion, U):
+        self.racum[estado, accion] += U
+        self.visitas[estado, accion] += 1
+        if self.modo_actualizacion == 'media':
+            self.tabla_q[estado, accion] = self.racum[estado, accion] / self.visitas[estado, accion]
+        else:
+            self.tabla_q[estado, accion] += self.factor_aprendizaje * (U - self.tabla_q[estado, accion])
+        self.politica[estado] = np.argmax(self.tabla_q[estado])
         
 
     def obtener_politica(self):
-        acciones = ['esperar','N','NE','E','SE','S','SO','O','NO']
+        acciones = nombres_acciones(self.transiciones)
         return politica_procesable(self.politica, acciones)
 
 
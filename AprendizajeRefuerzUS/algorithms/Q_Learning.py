@@ -1,6 +1,15 @@
+import time
 import numpy as np
-import mdptoolbox.mdp as mdp
+import math as math
+from .util import calcula_dimensiones
 from .util import politica_procesable
+from .util import nombres_acciones
+from .util import crea_muestreador
+from .util import VistaQ
+from .util import DistribucionInicial
+from .util import FlujoUniformes
+from .punto_control import guarda_punto_control
+from .punto_control import reanuda_entrenamiento
 
 
 
@@ -11,37 +20,109 @@ class Q_Learning:
 
     Parámetros:
     -----------
-    transiciones: array
+    transiciones: array o TransicionesDispersas
         Matriz de probabilidades de transición. Cada fila representa un estado y cada columna una acción.
+        El formato disperso de Problem(..., dispersa=True) y el modelo generativo de Problem.modelo_generativo() solo
+        se aceptan con el motor nativo: el de mdptoolbox necesita la matriz densa.
 
     recompensas: array
         Matriz de recompensas. Cada fila representa un estado y cada columna una acción.
-    
+
     factor_descuento: float
         Factor de descuento. Por defecto es 0.9.
 
     max_iteraciones: int
-        Número máximo de iteraciones. Por defecto es 10000.
-    
+        Número máximo de iteraciones (pasos). Por defecto es 10000.
+
+    motor: str
+        Implementación a utilizar. Con 'mdptoolbox' (por defecto) se usa mdptoolbox.mdp.QLearning. Con 'nativo' se usa la
+        implementación propia, que comparte el muestreo de sucesores y la tabla Q con SARSA y es la única que admite los
+        parámetros marcados como "solo motor nativo"; pasar alguno de ellos con el motor de mdptoolbox es un error.
+
+    max_episodios: int
+        Número máximo de episodios (solo motor nativo). Si no se especifica, el entrenamiento termina al agotar max_iteraciones.
+
+    pasos_por_episodio: int
+        Número máximo de pasos de cada episodio (solo motor nativo). Por defecto es 100, igual que mdptoolbox.
+
+    factor_aprendizaje: float
+        Factor de aprendizaje constante (solo motor nativo). Si no se especifica se usa 1/sqrt(n+2), igual que mdptoolbox.
+
+    epsilon: float
+        Probabilidad de exploración constante (solo motor nativo). Si no se especifica se usa 1/log(n+2), igual que mdptoolbox.
+
+    semilla: int o Generator
+        Semilla o generador de números aleatorios de NumPy (solo motor nativo).
+
+    callback: función
+        Función que se llama al final de cada episodio con el propio modelo como argumento (solo motor nativo).
+        Si devuelve True, el entrenamiento se detiene.
+
+    estado_inicial: None, int o array
+        Distribución de los estados iniciales de los episodios. Si es None (por defecto) se elige un estado no terminal de forma uniforme,
+        si es un entero se empieza siempre en ese estado y si es un array de pesos (uno por estado) se elige con probabilidad proporcional al peso (solo motor nativo).
+
+    parada: CriterioParada
+        Criterio de parada anticipada (política estable, cambio de Q por debajo de una tolerancia o tiempo máximo),
+        que se comprueba al final de cada episodio (solo motor nativo). Por defecto es None.
+
+    punto_control: String
+        Ruta de un punto de control (.npz). Si se indica, al empezar a entrenar se reanuda desde él si ya existe, y se
+        guarda cada episodios_punto_control episodios y al terminar. Por defecto es None, sin puntos de control (solo motor nativo).
+
+    episodios_punto_control: int
+        Número de episodios entre dos puntos de control. Por defecto es 100.
+
+    telemetria: Telemetria
+        Instrumentación del entrenamiento (registro de cada episodio y, opcionalmente, tiempo de cada fase de un paso).
+        Por defecto es None, sin instrumentación (solo motor nativo).
+
     Atributos:
     -----------
 
     modelo: Objeto
-        Modelo de Q-Learning que implementa el algoritmo pasando los parámetros especificados.
-    
-    
+        Modelo de Q-Learning que implementa el algoritmo pasando los parámetros especificados (solo motor mdptoolbox).
+
+    estados: int
+        Número de estados del problema.
+
+    acciones: int
+        Número de acciones del problema.
+
+    terminales: Array
+        Máscara booleana con los estados terminales, calculada una sola vez en el constructor.
+
+    distribucion_inicial: DistribucionInicial
+        Distribución precalculada de los estados iniciales de los episodios.
+
+    tabla_q: Array
+        Tabla de tamaño estados x acciones que almacena los valores de la función Q (solo motor nativo).
+
+    Q: VistaQ
+        Vista de solo lectura de tabla_q con forma de diccionario, Q[estado][accion].
+
+    iteraciones: int
+        Número de pasos realizados durante el entrenamiento.
+
+    episodios: int
+        Número de episodios realizados durante el entrenamiento.
+
+
     Métodos:
     -----------
 
     entrenar() -> None
-        Entrena el modelo de Q-Learning mediante el metodo run() del objeto modelo.
-    
+        Entrena el modelo de Q-Learning. Con el motor nativo, cada episodio empieza en un estado de la distribución inicial y termina
+        al llegar a un estado terminal o tras pasos_por_episodio pasos, y el entrenamiento termina al agotar max_iteraciones o
+        max_episodios o cuando se cumple el criterio de parada. Con el motor de mdptoolbox se usa el metodo run() del objeto modelo.
+
     obtener_politica() -> List
         Devuelve la política óptima obtenida tras haber entrenado el modelo.
 
     """
 
-    def __init__(self, transiciones, recompensas, factor_descuento=0.9 , max_iteraciones=10000):
+    def __init__(self, transiciones, recompensas, factor_descuento=0.9 , max_iteraciones=10000, motor='mdptoolbox', max_episodios=None,
+                 pasos_por_episodio=100, factor_aprendizaje=None, epsilon=None, semilla=None, callback=None, estado_inicial=None, parada=None, punto_control=None, episodios_punto_control=100, telemetria=None):
 
         self.transiciones = transiciones
 
@@ -50,16 +131,132 @@ class Q_Learning:
         self.factor_descuento = factor_descuento
 
         self.max_iteraciones = max_iteraciones
-    
 
-        self.modelo = mdp.QLearning(self.transiciones, self.recompensas, self.factor_descuento, n_iter=self.max_iteraciones)
+        self.motor = motor
+        assert self.motor in ('nativo', 'mdptoolbox'), "El motor debe ser 'nativo' o 'mdptoolbox'"
+
+        self.estados, self.acciones = calcula_dimensiones(transiciones)
+
+        if self.motor == 'mdptoolbox':
+            import mdptoolbox.mdp as mdp
+            assert not hasattr(self.transiciones, 'muestrea'), "El motor de mdptoolbox necesita la matriz de transiciones"
+            assert not hasattr(self.transiciones, 'sucesores'), "El motor de mdptoolbox necesita la matriz de transiciones densa, use motor='nativo'"
+            nativos = {'max_episodios': max_episodios, 'factor_aprendizaje': factor_aprendizaje, 'epsilon': epsilon, 'semilla': semilla,
+                       'callback': callback, 'estado_inicial': estado_inicial, 'parada': parada, 'punto_control': punto_control,
+                       'telemetria': telemetria}
+            usados = [nombre for nombre, valor in nativos.items() if valor is not None]
+            assert not usados and pasos_por_episodio == 100, f"Estos parámetros solo se pueden usar con motor='nativo': {usados or ['pasos_por_episodio']}"
+
+            self.modelo = mdp.QLearning(self.transiciones, self.recompensas, self.factor_descuento, n_iter=self.max_iteraciones)
+            return
+
+        assert 0.0 < self.factor_descuento <= 1.0, "El valor del descuento debe estar entre 0 y 1"
+        assert int(self.max_iteraciones) > 0, "El número máximo de iteraciones debe ser un entero positivo"
+
+        self.max_episodios = max_episodios
+        self.pasos_por_episodio = int(pasos_por_episodio)
+        assert self.pasos_por_episodio > 0, "El número de pasos por episodio debe ser un entero positivo"
+
+        self.factor_aprendizaje = factor_aprendizaje
+        assert self.factor_aprendizaje is None or 0.0 < self.factor_aprendizaje <= 1.0, "El valor del factor de aprendizaje debe estar entre 0 y 1"
+
+        self.epsilon = epsilon
+        assert self.epsilon is None or 0.0 <= self.epsilon <= 1.0, "El valor de epsilon debe estar entre 0 y 1"
+
+        self.generador = np.random.default_rng(semilla)
+        self.callback = callback
+        self.parada = parada
+        self.punto_control = punto_control
+        self.episodios_punto_control = int(episodios_punto_control)
+        assert self.episodios_punto_control > 0, "El número de episodios entre puntos de control debe ser un entero positivo"
+        self.telemetria = telemetria
+
+        self.uniformes = FlujoUniformes(self.generador)
+        self.sucesores, self.probabilidades, self.muestreador = crea_muestreador(transiciones, self.uniformes)
+
+        self.terminales = np.asarray(self.recompensas).sum(axis=1) == 0
+        self.distribucion_inicial = DistribucionInicial(self.terminales, estado_inicial, self.uniformes)
+
+        self.tabla_q = np.zeros((self.estados, self.acciones))
+        self.iteraciones = 0
+        self.episodios = 0
+
+    @property
+    def Q(self):
+        if self.motor == 'mdptoolbox':
+            return VistaQ(self.modelo.Q)
+        return VistaQ(self.tabla_q)
 
     def entrenar(self):
-        self.modelo.run()
-        
+        if self.motor == 'mdptoolbox':
+            self.modelo.run()
+            return
+
+        reanuda_entrenamiento(self)
+        q = self.tabla_q
+        recompensas = np.asarray(self.recompensas)
+        uniforme = self.uniformes.random
+        n = self.iteraciones
+        max_iteraciones = int(self.max_iteraciones)
+        telemetria = self.telemetria
+        fases = telemetria is not None and telemetria.fases
+        if telemetria is not None:
+            telemetria.inicia(self)
+        if self.parada is not None:
+            self.parada.inicia(self)
+
+        while n < max_iteraciones and (self.max_episodios is None or self.episodios < self.max_episodios):
+            estado = self.distribucion_inicial.muestrea()
+            pasos, total, suma_td, max_td = 0, 0.0, 0.0, 0.0
+            for _ in range(self.pasos_por_episodio):
+                n += 1
+                if fases:
+                    t0 = time.perf_counter()
+                epsilon = 1/math.log(n + 2) if self.epsilon is None else self.epsilon
+                if uniforme() < epsilon:
+                    accion = int(uniforme()*self.acciones)
+                else:
+                    accion = int(np.argmax(q[estado]))
+                if fases:
+                    t1 = time.perf_counter()
+                siguiente_estado = self.muestreador.muestrea(estado, accion)
+                if fases:
+                    t2 = time.perf_counter()
+
+                alpha = 1/math.sqrt(n + 2) if self.factor_aprendizaje is None else self.factor_aprendizaje
+                td = recompensas[estado, accion] + self.factor_descuento*q[siguiente_estado].max() - q[estado, accion]
+                q[estado, accion] += alpha*td
+                if telemetria is not None:
+                    pasos += 1
+                    total += recompensas[estado, accion]
+                    suma_td += abs(td)
+                    max_td = max(max_td, abs(td))
+                    if fases:
+                        telemetria.acumula_fases(t1 - t0, t2 - t1, time.perf_counter() - t2)
+
+                estado = siguiente_estado
+                if self.terminales[estado] or n >= max_iteraciones:
+                    break
+
+            self.iteraciones = n
+            self.episodios += 1
+            if telemetria is not None:
+                telemetria.registra_episodio(self, pasos, not self.terminales[estado], total, suma_td/pasos, max_td)
+            if self.punto_control is not None and self.episodios % self.episodios_punto_control == 0:
+                guarda_punto_control(self, self.punto_control)
+            if self.callback is not None and self.callback(self) is True:
+                break
+            if self.parada is not None and self.parada.comprueba(self):
+                break
+
+        if self.punto_control is not None:
+            guarda_punto_control(self, self.punto_control)
+
     def obtener_politica(self):
-        acciones = ['esperar','N','NE','E','SE','S','SO','O','NO']
-        return politica_procesable(self.modelo.policy,acciones)
-    
-    
+        acciones = nombres_acciones(self.transiciones)
+        if self.motor == 'mdptoolbox':
+            return politica_procesable(self.modelo.policy,acciones)
+        return politica_procesable(np.argmax(self.tabla_q, axis=1),acciones)
+
+
 
@@ -0,0 +1,438 @@
+import numpy as np
+from .util import calcula_dimensiones
+from .util import politica_procesable
+from .util import nombres_acciones
+from .util import crea_muestreador
+from .util import VistaQ
+from .util import DistribucionInicial
+from .util import FlujoUniformes
+from .punto_control import guarda_punto_control
+from .punto_control import reanuda_entrenamiento
+
+
+class ColaPrioridad:
+
+    """
+    Cola de prioridad máxima de claves enteras (de 0 a claves - 1) guardada como un montículo binario en dos listas
+    paralelas, una con las prioridades y otra con las claves, sin crear un objeto por entrada. Son listas de Python y no
+    arrays de NumPy porque el montículo se recorre elemento a elemento, y leer y escribir floats sueltos en una lista es
+    más rápido que en un array; solo se pasan a arrays para compactar. Cada clave está como mucho una vez pendiente:
+    el índice actual guarda su prioridad vigente y, si se vuelve a insertar con más prioridad, la entrada anterior no se
+    busca en el montículo sino que se marca como obsoleta (borrado perezoso) y se descarta cuando llega a la cima.
+    Si las entradas obsoletas pasan a ser más que las vigentes (con un margen de 64), el montículo se reconstruye.
+
+    Parámetros:
+    -----------
+    claves: int
+        Número de claves distintas (por ejemplo, estados x acciones).
+
+    Atributos:
+    -----------
+    prioridades: List
+        Prioridad de cada entrada del montículo. Solo son válidas las n primeras.
+
+    indices: List
+        Clave de cada entrada del montículo.
+
+    actual: Array
+        Prioridad vigente de cada clave, 0 si no está pendiente.
+
+    n: int
+        Número de entradas del montículo, vigentes y obsoletas.
+
+    Métodos:
+    -----------
+    inserta(clave, prioridad) -> None
+        Añade la clave con esa prioridad, o sube su prioridad si ya estaba pendiente con una menor.
+
+    extrae() -> Tuple
+        Quita y devuelve la clave pendiente de mayor prioridad y su prioridad, o (-1, 0.0) si no queda ninguna.
+
+    compacta() -> None
+        Reconstruye el montículo solo con las entradas vigentes.
+
+    vacia() -> None
+        Quita todas las claves.
+    """
+
+    def __init__(self, claves):
+        self.prioridades = []
+        self.indices = []
+        self.actual = np.zeros(claves)
+        self.n = 0
+        self.pendientes = 0
+
+    def __len__(self):
+        return self.pendientes
+
+    def inserta(self, clave, prioridad):
+        vigente = self.actual[clave]
+        if prioridad <= vigente:
+            return
+        if vigente == 0.0:
+            self.pendientes += 1
+        self.actual[clave] = prioridad
+        prioridades, indices = self.prioridades, self.indices
+        if self.n == len(prioridades):
+            prioridades.append(prioridad)
+            indices.append(clave)
+        # se sube la entrada nueva mientras su padre tenga menos prioridad
+        i = self.n
+        self.n += 1
+        while i > 0:
+            padre = (i - 1) >> 1
+            if prioridades[padre] >= prioridad:
+                break
+            prioridades[i], indices[i] = prioridades[padre], indices[padre]
+            i = padre
+        prioridades[i], indices[i] = prioridad, clave
+        if self.n > 2*self.pendientes + 64:
+            self.compacta()
+
+    def extrae(self):
+        prioridades, indices, actual = self.prioridades, self.indices, self.actual
+        while self.n > 0:
+            prioridad, clave = prioridades[0], indices[0]
+            # la última entrada pasa a la cima y se baja mientras algún hijo tenga más prioridad
+            self.n -= 1
+            n = self.n
+            ultima, ultima_clave = prioridades[n], indices[n]
+            i = 0
+            while True:
+                hijo = 2*i + 1
+                if hijo >= n:
+                    break
+                if hijo + 1 < n and prioridades[hijo + 1] > prioridades[hijo]:
+                    hijo += 1
+                if prioridades[hijo] <= ultima:
+                    break
+                prioridades[i], indices[i] = prioridades[hijo], indices[hijo]
+                i = hijo
+            if n > 0:
+                prioridades[i], indices[i] = ultima, ultima_clave
+            if actual[clave] == prioridad:
+                actual[clave] = 0.0
+                self.pendientes -= 1
+                return clave, prioridad
+            # entrada obsoleta: la clave se volvió a insertar con más prioridad o ya se extrajo
+        return -1, 0.0
+
+    def compacta(self):
+        prioridades = np.array(self.prioridades[:self.n])
+        indices = np.array(self.indices[:self.n], dtype=np.int64)
+        vigentes = self.actual[indices] == prioridades
+        prioridades, indices = prioridades[vigentes], indices[vigentes]
+        # un array ordenado de mayor a menor ya es un montículo de máximos
+        orden = np.argsort(-prioridades, kind='stable')
+        self.prioridades = prioridades[orden].tolist()
+        self.indices = indices[orden].tolist()
+        self.n = len(self.prioridades)
+
+    def vacia(self):
+        self.actual[:] = 0.0
+        self.n = 0
+        self.pendientes = 0
+
+
+def calcula_pares_predecesores(sucesores, probabilidades):
+    """
+    Calcula, para cada estado, los pares (estado, acción) desde los que se puede llegar a él, como índices de la tabla Q
+    aplanada (estado*acciones + accion). Se devuelve en formato CSR: los pares que llevan al estado s son
+    pares[inicio[s]:inicio[s+1]].
+
+    Parámetros:
+    -----------
+    sucesores: Array
+        Índices de los estados sucesores, de tamaño acciones x estados x K.
+
+    probabilidades: Array
+        Probabilidad de cada sucesor, de tamaño acciones x estados x K.
+    """
+
+    acciones, estados, k = sucesores.shape
+    claves = np.broadcast_to((np.arange(estados)[None, :]*acciones + np.arange(acciones)[:, None])[:, :, None], sucesores.shape)
+    usados = probabilidades > 0
+    pares = np.unique(np.stack([sucesores[usados], claves[usados]], axis=1), axis=0)
+    inicio = np.zeros(estados + 1, dtype=np.int64)
+    inicio[1:] = np.cumsum(np.bincount(pares[:, 0], minlength=estados))
+    return pares[:, 1], inicio
+
+
+class DynaQ:
+
+    """
+    Clase que implementa Dyna-Q con barrido priorizado aprovechando el modelo exacto del problema. Cada paso real se
+    aprende como en Q-Learning y después se hacen hasta pasos_planificacion actualizaciones simuladas: se extrae de una
+    cola de prioridad el par (estado, acción) con mayor error TD respecto al modelo, se le aplica la actualización
+    esperada de Bellman, Q(s,a) = R(s,a) + factor_descuento * sum_s' P(s'|s,a) max_a' Q(s',a'), y si cambia el valor
+    del estado se vuelven a evaluar los pares que llevan a él. Así cada paso real se propaga hacia atrás por el modelo
+    y hacen falta muchos menos pasos reales para llegar a la misma política. Como el valor inicial de la tabla Q (0) es
+    optimista, la primera vez que se actualiza un estado también se encolan las acciones de sus sucesores.
+
+    Parámetros:
+    -----------
+    transiciones: List o TransicionesDispersas
+        Matriz de probabilidades de transición, densa o en el formato disperso de Problem(..., dispersa=True). No se
+        acepta el modelo generativo, porque la planificación necesita las probabilidades.
+
+    recompensas: List
+        Matriz de recompensas. Cada fila representa un estado y cada columna una acción.
+
+    factor_descuento: float
+        Factor de descuento. Por defecto es 0.9.
+
+    factor_aprendizaje: float
+        Factor de aprendizaje de los pasos reales. Las actualizaciones simuladas son esperadas y no lo usan. Por defecto es 0.5.
+
+    max_iteraciones: int
+        Número máximo de iteraciones (se completan max_iteraciones + 1 episodios). Por defecto es 1000.
+
+    epsilon: float
+        Probabilidad de exploración. Por defecto es 0.1.
+
+    pasos_planificacion: int
+        Número máximo de actualizaciones simuladas después de cada paso real. Con 0 es Q-Learning. Por defecto es 10.
+
+    umbral_prioridad: float
+        Error TD mínimo para que un par entre en la cola. Por defecto es 1e-4.
+
+    estado_inicial: None, int o array
+        Distribución de los estados iniciales de los episodios, como en SARSA.
+
+    semilla: int o Generator
+        Semilla o generador de números aleatorios de NumPy propio de la instancia.
+
+    max_pasos_episodio: int
+        Número máximo de pasos de cada episodio. Si no se especifica es el 10% de max_iteraciones (como mínimo 1).
+
+    parada: CriterioParada
+        Criterio de parada anticipada que se comprueba al final de cada episodio. Por defecto es None.
+
+    punto_control: String
+        Ruta de un punto de control (.npz) desde el que se reanuda y en el que se guarda el entrenamiento. La cola no se
+        guarda: al reanudar se vuelve a llenar con los pares cuyo error supera el umbral. Por defecto es None.
+
+    episodios_punto_control: int
+        Número de episodios entre dos puntos de control. Por defecto es 100.
+
+    telemetria: Telemetria
+        Instrumentación del entrenamiento (registro de cada episodio, sin medir las fases de cada paso). Por defecto es None.
+
+    Atributos:
+    -----------
+    tabla_q: Array
+        Tabla de tamaño estados x acciones que almacena los valores de la función Q.
+
+    Q: VistaQ
+        Vista de solo lectura de tabla_q con forma de diccionario, Q[estado][accion].
+
+    valores: Array
+        Máximo de cada fila de tabla_q (0 en los estados terminales).
+
+    cola: ColaPrioridad
+        Pares (estado, acción) pendientes de actualizar, con su error TD como prioridad.
+
+    episodios: int
+        Número de episodios completados durante el entrenamiento.
+
+    pasos_reales: int
+        Número de pasos muestreados del entorno.
+
+    actualizaciones: int
+        Número de actualizaciones simuladas realizadas.
+
+    Métodos:
+    -----------
+    seleccionar_accion(estado) -> int
+        Selecciona una acción siguiendo una política epsilon-greedy.
+
+    planifica(pasos) -> int
+        Hace hasta ese número de actualizaciones simuladas y devuelve cuántas ha hecho.
+
+    entrenar() -> None
+        Entrena el algoritmo.
+
+    obtener_politica() -> List
+        Devuelve la política greedy aprendida a partir de la función Q.
+    """
+
+    def __init__(self, transiciones, recompensas, factor_descuento=0.9, factor_aprendizaje=0.5, max_iteraciones=1000, epsilon=0.1,
+                 pasos_planificacion=10, umbral_prioridad=1e-4, estado_inicial=None, semilla=None, max_pasos_episodio=None,
+                 parada=None, punto_control=None, episodios_punto_control=100, telemetria=None):
+
+        self.transiciones = transiciones
+        self.recompensas = recompensas
+
+        self.factor_descuento = factor_descuento
+        assert 0.0 < self.factor_descuento <= 1.0, "El valor del descuento debe estar entre 0 y 1"
+
+        self.factor_aprendizaje = factor_aprendizaje
+        assert 0.0 < self.factor_aprendizaje <= 1.0, "El valor del factor de aprendizaje debe estar entre 0 y 1"
+
+        self.max_iteraciones = int(max_iteraciones)
+        assert self.max_iteraciones > 0, "El número máximo de iteraciones debe ser un entero positivo"
+
+        self.epsilon = epsilon
+        assert 0.0 < self.epsilon <= 1.0, "El valor de epsilon debe estar entre 0 y 1"
+
+        self.pasos_planificacion = int(pasos_planificacion)
+        assert self.pasos_planificacion >= 0, "El número de pasos de planificación no puede ser negativo"
+
+        self.umbral_prioridad = umbral_prioridad
+        assert self.umbral_prioridad > 0, "El umbral de prioridad debe ser positivo"
+
+        self.max_pasos_episodio = max(1, int(self.max_iteraciones*0.1)) if max_pasos_episodio is None else int(max_pasos_episodio)
+        assert self.max_pasos_episodio > 0, "El número máximo de pasos por episodio debe ser un entero positivo"
+
+        self.generador = np.random.default_rng(semilla)
+        self.uniformes = FlujoUniformes(self.generador)
+
+        self.estados, self.acciones = calcula_dimensiones(transiciones)
+        self.sucesores, self.probabilidades, self.muestreador = crea_muestreador(transiciones, self.uniformes)
+        assert self.sucesores is not None, "Dyna-Q necesita las transiciones, no un modelo generativo"
+        self.pares_predecesores, self.inicio_predecesores = calcula_pares_predecesores(self.sucesores, self.probabilidades)
+
+        self.matriz_recompensas = np.asarray(self.recompensas, dtype=np.float64)
+        self.terminales = self.matriz_recompensas.sum(axis=1) == 0
+        self.distribucion_inicial = DistribucionInicial(self.terminales, estado_inicial, self.uniformes)
+
+        self.tabla_q = np.zeros((self.estados, self.acciones))
+        self.valores = np.zeros(self.estados)
+        self.revisados = np.zeros(self.estados, dtype=bool)
+        self.expandidos = np.zeros(self.estados, dtype=bool)
+        self.cola = ColaPrioridad(self.estados*self.acciones)
+        self.parada = parada
+        self.punto_control = punto_control
+        self.episodios_punto_control = int(episodios_punto_control)
+        assert self.episodios_punto_control > 0, "El número de episodios entre puntos de control debe ser un entero positivo"
+        self.telemetria = telemetria
+        self.episodios = 0
+        self.pasos_reales = 0
+        self.actualizaciones = 0
+
+    @property
+    def Q(self):
+        return VistaQ(self.tabla_q)
+
+    def seleccionar_accion(self, estado):
+        u = self.uniformes.random()
+        if u < self.epsilon:
+            return int(u/self.epsilon*self.acciones)
+        return int(np.argmax(self.tabla_q[estado]))
+
+    def backup(self, estado, accion):
+        # actualización esperada de Bellman de un par con el modelo exacto
+        esperado = self.probabilidades[accion, estado] @ self.valores[self.sucesores[accion, estado]]
+        return self.matriz_recompensas[estado, accion] + self.factor_descuento*esperado
+
+    def encola_predecesores(self, estado):
+        pares = self.pares_predecesores[self.inicio_predecesores[estado]:self.inicio_predecesores[estado + 1]]
+        estados, acciones = np.divmod(pares, self.acciones)
+        validos = ~self.terminales[estados]
+        estados, acciones, pares = estados[validos], acciones[validos], pares[validos]
+        # error de todos los predecesores a la vez
+        esperado = (self.probabilidades[acciones, estados] * self.valores[self.sucesores[acciones, estados]]).sum(axis=1)
+        errores = np.abs(self.matriz_recompensas[estados, acciones] + self.factor_descuento*esperado - self.tabla_q[estados, acciones])
+        for par, error in zip(pares[errores > self.umbral_prioridad].tolist(), errores[errores > self.umbral_prioridad].tolist()):
+            self.cola.inserta(par, error)
+
+    def encola_acciones(self, estado):
+        # con el modelo se conoce el error de todas las acciones del estado, no solo el de la elegida
+        esperado = (self.probabilidades[:, estado] * self.valores[self.sucesores[:, estado]]).sum(axis=1)
+        errores = np.abs(self.matriz_recompensas[estado] + self.factor_descuento*esperado - self.tabla_q[estado])
+        for accion in np.flatnonzero(errores > self.umbral_prioridad).tolist():
+            self.cola.inserta(estado*self.acciones + accion, errores[accion])
+
+    def encola_estado(self, estado):
+        self.encola_acciones(estado)
+        if self.expandidos[estado]:
+            return
+        self.expandidos[estado] = True
+        # los sucesores que aún no se han revisado conservan el valor inicial de la tabla Q, que es optimista;
+        # se encolan también para que su valor real llegue a este estado
+        sucesores = self.sucesores[:, estado][self.probabilidades[:, estado] > 0]
+        nuevos = np.unique(sucesores[~self.revisados[sucesores] & ~self.terminales[sucesores]])
+        self.revisados[nuevos] = True
+        for sucesor in nuevos.tolist():
+            self.encola_acciones(sucesor)
+
+    def actualiza_valor(self, estado):
+        # si cambia el máximo de la fila hay que revisar los pares que llevan a este estado
+        anterior = self.valores[estado]
+        self.valores[estado] = self.tabla_q[estado].max()
+        if self.valores[estado] != anterior:
+            self.encola_predecesores(estado)
+
+    def planifica(self, pasos):
+        hechas = 0
+        while hechas < pasos:
+            par, _ = self.cola.extrae()
+            if par < 0:
+                break
+            estado, accion = divmod(par, self.acciones)
+            self.tabla_q[estado, accion] = self.backup(estado, accion)
+            self.actualiza_valor(estado)
+            # las demás acciones del estado pueden seguir con su valor inicial y ocultar el cambio a los predecesores
+            self.encola_estado(estado)
+            hechas += 1
+        self.actualizaciones += hechas
+        return hechas
+
+    def rellena_cola(self):
+        # pares con error por encima del umbral respecto al modelo, para reanudar desde un punto de control
+        esperado = (self.probabilidades * self.valores[self.sucesores]).sum(axis=2).T
+        errores = np.abs(self.matriz_recompensas + self.factor_descuento*esperado - self.tabla_q)
+        errores[self.terminales] = 0.0
+        for par in np.flatnonzero(errores > self.umbral_prioridad).tolist():
+            self.cola.inserta(par, errores.flat[par])
+
+    def entrenar(self):
+        if reanuda_entrenamiento(self):
+            self.valores = np.where(self.terminales, 0.0, self.tabla_q.max(axis=1))
+            self.cola.vacia()
+            self.rellena_cola()
+            self.revisados[:] = True
+            self.expandidos[:] = True
+        if self.telemetria is not None:
+            self.telemetria.inicia(self)
+        if self.parada is not None:
+            self.parada.inicia(self)
+        q = self.tabla_q
+        recompensas = self.matriz_recompensas
+
+        while self.episodios < self.max_iteraciones + 1:
+            estado = self.distribucion_inicial.muestrea()
+            pasos, total, suma_td, max_td = 0, 0.0, 0.0, 0.0
+            while True:
+                accion = self.seleccionar_accion(estado)
+                siguiente_estado = self.muestreador.muestrea(estado, accion)
+                td = recompensas[estado, accion] + self.factor_descuento*self.valores[siguiente_estado] - q[estado, accion]
+                q[estado, accion] += self.factor_aprendizaje*td
+                self.actualiza_valor(estado)
+                self.encola_estado(estado)
+                self.planifica(self.pasos_planificacion)
+
+                pasos += 1
+                if self.telemetria is not None:
+                    total += recompensas[estado, accion]
+                    suma_td += abs(td)
+                    max_td = max(max_td, abs(td))
+                estado = siguiente_estado
+                if self.terminales[estado] or pasos >= self.max_pasos_episodio:
+                    break
+
+            self.pasos_reales += pasos
+            self.episodios += 1
+            if self.telemetria is not None:
+                self.telemetria.registra_episodio(self, pasos, not self.terminales[estado], total, suma_td/pasos, max_td)
+            if self.punto_control is not None and self.episodios % self.episodios_punto_control == 0:
+                guarda_punto_control(self, self.punto_control)
+            if self.parada is not None and self.parada.comprueba(self):
+                break
+        if self.punto_control is not None:
+            guarda_punto_control(self, self.punto_control)
+
+    def obtener_politica(self):
+        politica = np.argmax(self.tabla_q, axis=1)
+        acciones = nombres_acciones(self.transiciones)
+        return politica_procesable(politica, acciones)
@@ -0,0 +1,106 @@
+import time
+import numpy as np
+from .util import politica_greedy
+
+
+class CriterioParada:
+
+    """
+    Criterio de parada anticipada para los algoritmos basados en muestras (SARSA, Monte Carlo y Q-Learning).
+    Se pasa al constructor del algoritmo con el parámetro parada y se comprueba al final de cada episodio:
+    el entrenamiento termina en cuanto se cumple cualquiera de los criterios indicados, aunque no se hayan
+    agotado los episodios o las iteraciones.
+
+    Parámetros:
+    -----------
+    episodios_estables: int
+        Número de episodios seguidos sin ningún cambio en la política greedy tras los que se para. Por defecto None.
+
+    tolerancia: float
+        Se para cuando el mayor cambio de un valor de la tabla Q durante un episodio, max |ΔQ|, es menor que la tolerancia.
+        Por defecto None.
+
+    tiempo_maximo: float
+        Tiempo máximo de entrenamiento en segundos. Por defecto None.
+
+    episodios_minimos: int
+        Número de episodios que se completan siempre antes de comprobar los criterios de política estable y de tolerancia.
+        Por defecto es 1.
+
+    Atributos:
+    -----------
+    episodios: int
+        Número de episodios comprobados.
+
+    episodios_sin_cambios: int
+        Número de episodios seguidos sin cambios en la política greedy.
+
+    cambio_q: float
+        Mayor cambio de la tabla Q durante el último episodio.
+
+    motivo: String
+        Criterio por el que se ha parado ('politica_estable', 'tolerancia' o 'tiempo'), o None si no se ha parado.
+
+    Métodos:
+    -----------
+    inicia(modelo) -> None
+        Se llama al empezar a entrenar. Guarda la política y la tabla Q iniciales y el instante de inicio.
+
+    comprueba(modelo) -> bool
+        Se llama al terminar cada episodio. Devuelve True si se debe parar el entrenamiento.
+    """
+
+    def __init__(self, episodios_estables=None, tolerancia=None, tiempo_maximo=None, episodios_minimos=1):
+        self.episodios_estables = episodios_estables
+        assert episodios_estables is None or int(episodios_estables) > 0, "El número de episodios estables debe ser un entero positivo"
+
+        self.tolerancia = tolerancia
+        assert tolerancia is None or tolerancia > 0, "La tolerancia debe ser positiva"
+
+        self.tiempo_maximo = tiempo_maximo
+        assert tiempo_maximo is None or tiempo_maximo > 0, "El tiempo máximo debe ser positivo"
+
+        self.episodios_minimos = int(episodios_minimos)
+
+        self.episodios = 0
+        self.episodios_sin_cambios = 0
+        self.cambio_q = None
+        self.motivo = None
+        self._politica = None
+        self._tabla_q = None
+        self._inicio = None
+
+    def inicia(self, modelo):
+        self.episodios = 0
+        self.episodios_sin_cambios = 0
+        self.cambio_q = None
+        self.motivo = None
+        if self.episodios_estables is not None:
+            self._politica = politica_greedy(modelo)
+        if self.tolerancia is not None:
+            self._tabla_q = modelo.tabla_q.copy()
+        self._inicio = time.perf_counter()
+
+    def comprueba(self, modelo):
+        self.episodios += 1
+
+        if self.episodios_estables is not None:
+            politica = politica_greedy(modelo)
+            if np.array_equal(politica, self._politica):
+                self.episodios_sin_cambios += 1
+            else:
+                self.episodios_sin_cambios = 0
+                self._politica = politica
+            if self.episodios >= self.episodios_minimos and self.episodios_sin_cambios >= self.episodios_estables:
+                self.motivo = 'politica_estable'
+
+        if self.tolerancia is not None:
+            self.cambio_q = float(np.max(np.abs(modelo.tabla_q - self._tabla_q)))
+            self._tabla_q[...] = modelo.tabla_q
+            if self.motivo is None and self.episodios >= self.episodios_minimos and self.cambio_q < self.tolerancia:
+                self.motivo = 'tolerancia'
+
+        if self.motivo is None and self.tiempo_maximo is not None and time.perf_counter() - self._inicio >= self.tiempo_maximo:
+            self.motivo = 'tiempo'
+
+        return self.motivo is not None
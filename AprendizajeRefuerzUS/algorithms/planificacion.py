@@ -0,0 +1,564 @@
+import heapq
+import numpy as np
+from .util import calcula_dimensiones
+from .util import politica_procesable
+from .util import nombres_acciones
+from .util import tabla_sucesores
+from .util import actualiza_tabla_sucesores
+from .util import indices_politica
+from .util import VistaQ
+
+
+def calcula_q(recompensas, sucesores, probabilidades, valores, factor_descuento):
+    """
+    Aplica la ecuación de Bellman a todos los pares (estado, acción) a la vez a partir de la tabla de sucesores:
+    Q(s,a) = R(s,a) + factor_descuento * sum_s' P(s'|s,a) V(s').
+
+    Parámetros:
+    -----------
+    recompensas: Array
+        Matriz de recompensas de tamaño estados x acciones.
+
+    sucesores: Array
+        Índices de los estados sucesores, de tamaño acciones x estados x K.
+
+    probabilidades: Array
+        Probabilidad de cada sucesor, de tamaño acciones x estados x K.
+
+    valores: Array
+        Función de valor actual, de tamaño estados.
+
+    factor_descuento: float
+        Factor de descuento.
+    """
+
+    esperado = (probabilidades * valores[sucesores]).sum(axis=2)
+    return recompensas + factor_descuento * esperado.T
+
+
+def calcula_q_destinos(recompensas, sucesores, probabilidades, valores, factor_descuento):
+    """
+    Igual que calcula_q(), pero para varios problemas que comparten las transiciones y solo se diferencian en las
+    recompensas (por ejemplo, el mismo mapa con distintos destinos).
+
+    Parámetros:
+    -----------
+    recompensas: Array
+        Recompensas de tamaño destinos x estados x acciones.
+
+    sucesores: Array
+        Índices de los estados sucesores, de tamaño acciones x estados x K.
+
+    probabilidades: Array
+        Probabilidad de cada sucesor, de tamaño acciones x estados x K.
+
+    valores: Array
+        Función de valor actual de cada destino, de tamaño destinos x estados.
+
+    factor_descuento: float
+        Factor de descuento.
+    """
+
+    # se suma sucesor a sucesor para no crear un array de destinos x acciones x estados x K
+    esperado = probabilidades[:, :, 0] * valores[:, sucesores[:, :, 0]]
+    for k in range(1, sucesores.shape[2]):
+        esperado += probabilidades[:, :, k] * valores[:, sucesores[:, :, k]]
+    return recompensas + factor_descuento * esperado.transpose(0, 2, 1)
+
+
+def evalua_politica(politica, recompensas, sucesores, probabilidades, factor_descuento, valores0=None, tolerancia=1e-6, max_iteraciones=1000):
+    """
+    Evalúa una política de forma iterativa, V(s) = R(s,pi(s)) + factor_descuento * sum_s' P(s'|s,pi(s)) V(s'),
+    hasta que el mayor cambio de la función de valor sea menor que la tolerancia.
+
+    Parámetros:
+    -----------
+    politica: Array
+        Índice de la acción de cada estado.
+
+    recompensas: Array
+        Matriz de recompensas de tamaño estados x acciones.
+
+    sucesores: Array
+        Índices de los estados sucesores, de tamaño acciones x estados x K.
+
+    probabilidades: Array
+        Probabilidad de cada sucesor, de tamaño acciones x estados x K.
+
+    factor_descuento: float
+        Factor de descuento.
+
+    valores0: Array
+        Función de valor inicial. Si no se especifica se empieza en 0.
+
+    tolerancia: float
+        Tolerancia para el criterio de parada.
+
+    max_iteraciones: int
+        Número máximo de iteraciones.
+    """
+
+    estados = np.arange(len(politica))
+    r = recompensas[estados, politica]
+    suc = sucesores[politica, estados]
+    prob = probabilidades[politica, estados]
+    valores = np.zeros(len(politica)) if valores0 is None else np.array(valores0, dtype=np.float64)
+    for _ in range(max_iteraciones):
+        nuevos = r + factor_descuento * (prob * valores[suc]).sum(axis=1)
+        cambio = np.max(np.abs(nuevos - valores))
+        valores = nuevos
+        if cambio < tolerancia:
+            break
+    return valores
+
+
+def calcula_predecesores(sucesores, probabilidades):
+    """
+    Calcula, para cada estado, los estados desde los que se puede llegar a él con alguna acción. Se devuelve en
+    formato CSR: los predecesores del estado s son predecesores[inicio[s]:inicio[s+1]].
+
+    Parámetros:
+    -----------
+    sucesores: Array
+        Índices de los estados sucesores, de tamaño acciones x estados x K.
+
+    probabilidades: Array
+        Probabilidad de cada sucesor, de tamaño acciones x estados x K.
+    """
+
+    acciones, estados, k = sucesores.shape
+    origen = np.broadcast_to(np.arange(estados)[None, :, None], sucesores.shape)
+    usados = probabilidades > 0
+    pares = np.unique(np.stack([sucesores[usados], origen[usados]], axis=1), axis=0)
+    inicio = np.zeros(estados + 1, dtype=np.int64)
+    inicio[1:] = np.cumsum(np.bincount(pares[:, 0], minlength=estados))
+    return pares[:, 1], inicio
+
+
+class IteracionValor:
+
+    """
+    Clase que implementa el algoritmo de iteración de valores. A diferencia de los algoritmos de aprendizaje, usa directamente
+    el modelo del problema (transiciones y recompensas), por lo que obtiene la política óptima sin necesidad de muestrear.
+
+    Parámetros:
+    -----------
+    transiciones: array o TransicionesDispersas
+        Matriz de probabilidades de transición, densa o en formato disperso.
+
+    recompensas: array
+        Matriz de recompensas. Cada fila representa un estado y cada columna una acción.
+
+    factor_descuento: float
+        Factor de descuento. Por defecto es 0.9.
+
+    tolerancia: float
+        El algoritmo para cuando el mayor cambio de la función de valor es menor que la tolerancia. Por defecto es 1e-6.
+
+    max_iteraciones: int
+        Número máximo de barridos sobre todos los estados. Por defecto es 1000.
+
+    metodo: str
+        Forma de actualizar la función de valor:
+            - 'jacobi' (por defecto): en cada barrido se actualizan todos los estados a la vez, de forma vectorizada.
+            - 'gauss-seidel': los estados se actualizan uno a uno, usando ya los valores nuevos de los estados anteriores.
+            - 'priorizado': barrido priorizado, se actualiza primero el estado con mayor error de Bellman y solo se vuelven
+              a revisar los predecesores de los estados que cambian.
+
+    valores0: Array
+        Función de valor inicial. Si no se especifica se empieza en 0 o en el valor de politica0.
+
+    politica0: List, Dict o Array
+        Política para hacer un arranque en caliente: la función de valor inicial es la evaluación de esta política.
+
+    Atributos:
+    -----------
+
+    estados: int
+        Número de estados del problema.
+
+    acciones: int
+        Número de acciones del problema.
+
+    valores: Array
+        Función de valor de cada estado.
+
+    tabla_q: Array
+        Tabla de tamaño estados x acciones con los valores de la función Q.
+
+    politica: Array
+        Acción óptima de cada estado.
+
+    iteraciones: int
+        Número de barridos (o de actualizaciones, en el método priorizado) realizados.
+
+    Métodos:
+    -----------
+
+    entrenar() -> None
+        Calcula la función de valor óptima con el método elegido y la política greedy asociada.
+
+    barrido_priorizado(estados) -> None
+        Actualiza la función de valor con barrido priorizado empezando por los estados indicados (por defecto todos).
+
+    repara(estados, transiciones, recompensas) -> None
+        Tras cambiar las filas de algunos estados de las transiciones y recompensas (por ejemplo con Problem.cambia_celdas()),
+        actualiza esas filas del modelo y repara la función de valor con barrido priorizado desde esos estados, partiendo
+        de la función de valor actual en lugar de empezar de cero.
+
+    obtener_politica() -> List
+        Devuelve la política óptima.
+    """
+
+    def __init__(self, transiciones, recompensas, factor_descuento=0.9, tolerancia=1e-6, max_iteraciones=1000, metodo='jacobi', valores0=None, politica0=None):
+
+        self.transiciones = transiciones
+        self.recompensas = np.asarray(recompensas, dtype=np.float64)
+
+        self.factor_descuento = factor_descuento
+        assert 0.0 < self.factor_descuento <= 1.0, "El valor del descuento debe estar entre 0 y 1"
+
+        self.tolerancia = tolerancia
+        assert self.tolerancia > 0, "La tolerancia debe ser positiva"
+
+        self.max_iteraciones = int(max_iteraciones)
+        assert self.max_iteraciones > 0, "El número máximo de iteraciones debe ser un entero positivo"
+
+        self.metodo = metodo
+        assert self.metodo in ('jacobi', 'gauss-seidel', 'priorizado'), "El método debe ser 'jacobi', 'gauss-seidel' o 'priorizado'"
+
+        self.estados, self.acciones = calcula_dimensiones(transiciones)
+        self.sucesores, self.probabilidades = tabla_sucesores(transiciones)
+
+        if valores0 is not None:
+            self.valores = np.array(valores0, dtype=np.float64)
+        elif politica0 is not None:
+            acciones = nombres_acciones(self.transiciones)
+            self.valores = evalua_politica(indices_politica(politica0, acciones), self.recompensas, self.sucesores, self.probabilidades,
+                                           self.factor_descuento, tolerancia=self.tolerancia, max_iteraciones=self.max_iteraciones)
+        else:
+            self.valores = np.zeros(self.estados)
+
+        self.iteraciones = 0
+        self.actualiza_politica()
+
+    @property
+    def Q(self):
+        return VistaQ(self.tabla_q)
+
+    def actualiza_politica(self):
+        self.tabla_q = calcula_q(self.recompensas, self.sucesores, self.probabilidades, self.valores, self.factor_descuento)
+        self.politica = np.argmax(self.tabla_q, axis=1)
+
+    def backup(self, estado):
+        # ecuación de Bellman para un único estado
+        esperado = (self.probabilidades[:, estado] * self.valores[self.sucesores[:, estado]]).sum(axis=1)
+        return np.max(self.recompensas[estado] + self.factor_descuento * esperado)
+
+    def entrenar(self):
+        if self.metodo == 'jacobi':
+            for _ in range(self.max_iteraciones):
+                self.iteraciones += 1
+                nuevos = calcula_q(self.recompensas, self.sucesores, self.probabilidades, self.valores, self.factor_descuento).max(axis=1)
+                cambio = np.max(np.abs(nuevos - self.valores))
+                self.valores = nuevos
+                if cambio < self.tolerancia:
+                    break
+        elif self.metodo == 'gauss-seidel':
+            for _ in range(self.max_iteraciones):
+                self.iteraciones += 1
+                cambio = 0.0
+                for estado in range(self.estados):
+                    nuevo = self.backup(estado)
+                    cambio = max(cambio, abs(nuevo - self.valores[estado]))
+                    self.valores[estado] = nuevo
+                if cambio < self.tolerancia:
+                    break
+        else:
+            self.barrido_priorizado()
+        self.actualiza_politica()
+
+    def barrido_priorizado(self, estados=None):
+        if not hasattr(self, 'predecesores'):
+            self.predecesores, self.inicio_predecesores = calcula_predecesores(self.sucesores, self.probabilidades)
+
+        estados = np.arange(self.estados) if estados is None else np.asarray(estados, dtype=np.int64)
+        errores = np.abs(calcula_q(self.recompensas, self.sucesores, self.probabilidades, self.valores, self.factor_descuento).max(axis=1) - self.valores)
+        prioridad = np.zeros(self.estados)
+        prioridad[estados] = errores[estados]
+        cola = [(-prioridad[s], s) for s in estados if prioridad[s] >= self.tolerancia]
+        heapq.heapify(cola)
+
+        max_actualizaciones = self.max_iteraciones * self.estados
+        actualizaciones = 0
+        while cola and actualizaciones < max_actualizaciones:
+            p, estado = heapq.heappop(cola)
+            if -p != prioridad[estado]:
+                continue  # entrada obsoleta, el estado se volvió a añadir con otra prioridad
+            prioridad[estado] = 0.0
+            self.valores[estado] = self.backup(estado)
+            actualizaciones += 1
+            for anterior in self.predecesores[self.inicio_predecesores[estado]:self.inicio_predecesores[estado + 1]]:
+                error = abs(self.backup(anterior) - self.valores[anterior])
+                if error >= self.tolerancia and error > prioridad[anterior]:
+                    prioridad[anterior] = error
+                    heapq.heappush(cola, (-error, anterior))
+        self.iteraciones += actualizaciones
+        self.actualiza_politica()
+
+    def repara(self, estados, transiciones=None, recompensas=None):
+        estados = np.asarray(estados, dtype=np.int64)
+        if recompensas is not None:
+            self.recompensas = np.asarray(recompensas, dtype=np.float64)
+        if transiciones is not None and transiciones is not self.transiciones:
+            self.transiciones = transiciones
+            self.sucesores, self.probabilidades = tabla_sucesores(transiciones)
+        else:
+            self.sucesores, self.probabilidades = actualiza_tabla_sucesores(self.transiciones, self.sucesores, self.probabilidades, estados)
+        # los predecesores de los estados cambiados también cambian
+        self.predecesores, self.inicio_predecesores = calcula_predecesores(self.sucesores, self.probabilidades)
+        self.barrido_priorizado(estados)
+
+    def obtener_politica(self):
+        acciones = nombres_acciones(self.transiciones)
+        return politica_procesable(self.politica, acciones)
+
+
+class IteracionValorMultidestino:
+
+    """
+    Clase que implementa la iteración de valores (Jacobi) para varios destinos a la vez sobre las mismas transiciones.
+    Las funciones de valor de todos los destinos se actualizan juntas en cada barrido, y cada destino deja de actualizarse
+    en cuanto converge. El resultado de cada destino es el mismo que el de IteracionValor con sus recompensas.
+
+    Parámetros:
+    -----------
+    transiciones: array o TransicionesDispersas
+        Matriz de probabilidades de transición, densa o en formato disperso, común a todos los destinos.
+
+    recompensas: array
+        Recompensas de tamaño destinos x estados x acciones (ver problem_utils.crea_recompensas_destinos()).
+
+    factor_descuento: float
+        Factor de descuento. Por defecto es 0.9.
+
+    tolerancia: float
+        Cada destino para cuando el mayor cambio de su función de valor es menor que la tolerancia. Por defecto es 1e-6.
+
+    max_iteraciones: int
+        Número máximo de barridos sobre todos los estados. Por defecto es 1000.
+
+    valores0: Array
+        Función de valor inicial de cada destino, de tamaño destinos x estados. Si no se especifica se empieza en 0.
+
+    Atributos:
+    -----------
+
+    destinos: int
+        Número de destinos.
+
+    estados: int
+        Número de estados del problema.
+
+    acciones: int
+        Número de acciones del problema.
+
+    valores: Array
+        Función de valor de cada destino y estado, de tamaño destinos x estados.
+
+    tabla_q: Array
+        Tabla de tamaño destinos x estados x acciones con los valores de la función Q.
+
+    politica: Array
+        Acción óptima de cada destino y estado, de tamaño destinos x estados.
+
+    iteraciones: Array
+        Número de barridos que ha necesitado cada destino.
+
+    Métodos:
+    -----------
+
+    entrenar() -> None
+        Calcula la función de valor óptima de todos los destinos y sus políticas greedy.
+
+    obtener_politica(destino) -> List
+        Devuelve la política óptima del destino con ese índice.
+    """
+
+    def __init__(self, transiciones, recompensas, factor_descuento=0.9, tolerancia=1e-6, max_iteraciones=1000, valores0=None):
+
+        self.transiciones = transiciones
+        self.recompensas = np.asarray(recompensas, dtype=np.float64)
+        assert self.recompensas.ndim == 3, "Las recompensas deben ser de tamaño destinos x estados x acciones"
+
+        self.factor_descuento = factor_descuento
+        assert 0.0 < self.factor_descuento <= 1.0, "El valor del descuento debe estar entre 0 y 1"
+
+        self.tolerancia = tolerancia
+        assert self.tolerancia > 0, "La tolerancia debe ser positiva"
+
+        self.max_iteraciones = int(max_iteraciones)
+        assert self.max_iteraciones > 0, "El número máximo de iteraciones debe ser un entero positivo"
+
+        self.estados, self.acciones = calcula_dimensiones(transiciones)
+        self.sucesores, self.probabilidades = tabla_sucesores(transiciones)
+        self.destinos = self.recompensas.shape[0]
+        assert self.recompensas.shape[1:] == (self.estados, self.acciones), "Las recompensas no corresponden a las transiciones"
+
+        if valores0 is not None:
+            self.valores = np.array(valores0, dtype=np.float64).reshape(self.destinos, self.estados)
+        else:
+            self.valores = np.zeros((self.destinos, self.estados))
+
+        self.iteraciones = np.zeros(self.destinos, dtype=np.int64)
+        self.actualiza_politica()
+
+    def actualiza_politica(self):
+        self.tabla_q = calcula_q_destinos(self.recompensas, self.sucesores, self.probabilidades, self.valores, self.factor_descuento)
+        self.politica = np.argmax(self.tabla_q, axis=2)
+
+    def entrenar(self):
+        activos = np.arange(self.destinos)
+        for _ in range(self.max_iteraciones):
+            self.iteraciones[activos] += 1
+            nuevos = calcula_q_destinos(self.recompensas[activos], self.sucesores, self.probabilidades, self.valores[activos],
+                                        self.factor_descuento).max(axis=2)
+            cambio = np.max(np.abs(nuevos - self.valores[activos]), axis=1)
+            self.valores[activos] = nuevos
+            # los destinos que ya han convergido no se vuelven a actualizar
+            activos = activos[cambio >= self.tolerancia]
+            if len(activos) == 0:
+                break
+        self.actualiza_politica()
+
+    def obtener_politica(self, destino=0):
+        acciones = nombres_acciones(self.transiciones)
+        return politica_procesable(self.politica[destino], acciones)
+
+
+class IteracionPolitica:
+
+    """
+    Clase que implementa el algoritmo de iteración de políticas: se alterna la evaluación de la política actual con su mejora
+    greedy hasta que la política deja de cambiar. Trabaja directamente sobre el modelo del problema, denso o disperso.
+
+    Parámetros:
+    -----------
+    transiciones: array o TransicionesDispersas
+        Matriz de probabilidades de transición, densa o en formato disperso.
+
+    recompensas: array
+        Matriz de recompensas. Cada fila representa un estado y cada columna una acción.
+
+    factor_descuento: float
+        Factor de descuento. Por defecto es 0.9.
+
+    politica0: List, Dict o Array
+        Política inicial, para hacer un arranque en caliente. Si no se especifica se usa la política greedy respecto a las recompensas.
+
+    evaluacion: str
+        Forma de evaluar cada política. Con 'iterativa' (por defecto) se aplica la ecuación de Bellman de la política hasta converger,
+        partiendo de la evaluación anterior. Con 'exacta' se resuelve el sistema lineal, lo que requiere una matriz estados x estados
+        y solo es recomendable para mapas pequeños.
+
+    tolerancia: float
+        Tolerancia de la evaluación iterativa. Por defecto es 1e-6.
+
+    max_iteraciones: int
+        Número máximo de mejoras de la política. Por defecto es 100.
+
+    max_iteraciones_evaluacion: int
+        Número máximo de iteraciones de cada evaluación iterativa. Por defecto es 1000.
+
+    Atributos:
+    -----------
+
+    estados: int
+        Número de estados del problema.
+
+    acciones: int
+        Número de acciones del problema.
+
+    valores: Array
+        Función de valor de la política actual.
+
+    tabla_q: Array
+        Tabla de tamaño estados x acciones con los valores de la función Q.
+
+    politica: Array
+        Acción de cada estado en la política actual.
+
+    iteraciones: int
+        Número de mejoras de la política realizadas.
+
+    Métodos:
+    -----------
+
+    entrenar() -> None
+        Evalúa y mejora la política hasta que deja de cambiar o se alcanza el número máximo de iteraciones.
+
+    obtener_politica() -> List
+        Devuelve la política óptima.
+    """
+
+    def __init__(self, transiciones, recompensas, factor_descuento=0.9, politica0=None, evaluacion='iterativa', tolerancia=1e-6,
+                 max_iteraciones=100, max_iteraciones_evaluacion=1000):
+
+        self.transiciones = transiciones
+        self.recompensas = np.asarray(recompensas, dtype=np.float64)
+
+        self.factor_descuento = factor_descuento
+        assert 0.0 < self.factor_descuento <= 1.0, "El valor del descuento debe estar entre 0 y 1"
+
+        self.evaluacion = evaluacion
+        assert self.evaluacion in ('iterativa', 'exacta'), "La evaluación debe ser 'iterativa' o 'exacta'"
+        assert self.evaluacion == 'iterativa' or self.factor_descuento < 1.0, "La evaluación exacta necesita un descuento menor que 1"
+
+        self.tolerancia = tolerancia
+        self.max_iteraciones = int(max_iteraciones)
+        self.max_iteraciones_evaluacion = int(max_iteraciones_evaluacion)
+
+        self.estados, self.acciones = calcula_dimensiones(transiciones)
+        self.sucesores, self.probabilidades = tabla_sucesores(transiciones)
+
+        if politica0 is None:
+            self.politica = np.argmax(self.recompensas, axis=1)
+        else:
+            acciones = nombres_acciones(self.transiciones)
+            self.politica = indices_politica(politica0, acciones)
+
+        self.valores = np.zeros(self.estados)
+        self.tabla_q = np.zeros((self.estados, self.acciones))
+        self.iteraciones = 0
+
+    @property
+    def Q(self):
+        return VistaQ(self.tabla_q)
+
+    def evalua(self):
+        if self.evaluacion == 'iterativa':
+            return evalua_politica(self.politica, self.recompensas, self.sucesores, self.probabilidades, self.factor_descuento,
+                                   valores0=self.valores, tolerancia=self.tolerancia, max_iteraciones=self.max_iteraciones_evaluacion)
+        estados = np.arange(self.estados)
+        matriz = np.eye(self.estados)
+        np.add.at(matriz, (estados[:, None], self.sucesores[self.politica, estados]),
+                  -self.factor_descuento * self.probabilidades[self.politica, estados])
+        return np.linalg.solve(matriz, self.recompensas[estados, self.politica])
+
+    def entrenar(self):
+        estados = np.arange(self.estados)
+        for _ in range(self.max_iteraciones):
+            self.iteraciones += 1
+            self.valores = self.evalua()
+            self.tabla_q = calcula_q(self.recompensas, self.sucesores, self.probabilidades, self.valores, self.factor_descuento)
+            nueva = np.argmax(self.tabla_q, axis=1)
+            # en caso de empate se mantiene la acción actual para no alternar entre políticas equivalentes
+            empate = self.tabla_q[estados, self.politica] >= self.tabla_q[estados, nueva] - 1e-12
+            nueva[empate] = self.politica[empate]
+            if np.array_equal(nueva, self.politica):
+                break
+            self.politica = nueva
+
+    def obtener_politica(self):
+        acciones = nombres_acciones(self.transiciones)
+        return politica_procesable(self.politica, acciones)
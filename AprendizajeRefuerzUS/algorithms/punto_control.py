@@ -0,0 +1,136 @@
+import json
+import os
+import numpy as np
+from .util import FlujoUniformes
+
+
+# estado de entrenamiento que se guarda de cada algoritmo, si lo tiene
+ARRAYS_ENTRENAMIENTO = ('tabla_q', 'racum', 'visitas', 'politica')
+CONTADORES_ENTRENAMIENTO = ('episodios', 'iteraciones')
+
+
+def estado_generador(generador):
+    """
+    Devuelve el estado de un generador de números aleatorios como texto JSON. Admite un Generator de NumPy,
+    un FlujoUniformes (se guarda el estado del generador antes del bloque actual y la posición dentro del bloque)
+    y el generador global np.random.
+
+    Parámetros:
+    -----------
+    generador: Generator, FlujoUniformes o np.random
+        Generador de números aleatorios.
+    """
+
+    if isinstance(generador, FlujoUniformes):
+        return json.dumps({'flujo': [generador.estado, generador.posicion]})
+    if generador is np.random:
+        nombre, claves, posicion, tiene_gauss, gauss = np.random.get_state()
+        return json.dumps({'global': [nombre, claves.tolist(), int(posicion), int(tiene_gauss), float(gauss)]})
+    return json.dumps(generador.bit_generator.state)
+
+
+def restaura_generador(generador, estado):
+    """
+    Restaura el estado de un generador de números aleatorios guardado con estado_generador().
+
+    Parámetros:
+    -----------
+    generador: Generator, FlujoUniformes o np.random
+        Generador de números aleatorios.
+
+    estado: String
+        Estado del generador como texto JSON.
+    """
+
+    estado = json.loads(estado)
+    if isinstance(generador, FlujoUniformes):
+        assert 'flujo' in estado, "El punto de control no es de un flujo de uniformes"
+        # se vuelve a generar el mismo bloque y se continúa por la misma posición
+        generador.generador.bit_generator.state, posicion = estado['flujo']
+        generador.rellena()
+        generador.posicion = posicion
+    elif generador is np.random:
+        assert 'global' in estado, "El punto de control no es del generador global np.random"
+        nombre, claves, posicion, tiene_gauss, gauss = estado['global']
+        np.random.set_state((nombre, np.array(claves, dtype=np.uint32), posicion, tiene_gauss, gauss))
+    else:
+        assert 'global' not in estado and 'flujo' not in estado, "El punto de control no es de un Generator de NumPy"
+        generador.bit_generator.state = estado
+
+
+def fuente_aleatoria(modelo):
+    # de dónde saca un algoritmo sus números aleatorios: su flujo de uniformes, su generador o el generador global
+    return getattr(modelo, 'uniformes', getattr(modelo, 'generador', np.random))
+
+
+def guarda_punto_control(modelo, fichero):
+    """
+    Guarda el estado de entrenamiento de un algoritmo (tabla Q, sumas y número de visitas, política, contadores de
+    episodios e iteraciones, que marcan también la posición en los calendarios de epsilon y del factor de aprendizaje,
+    y estado del generador de números aleatorios) en un fichero binario .npz sin comprimir. El fichero se escribe
+    primero con otro nombre y después se renombra, de forma que una interrupción nunca deja un punto de control a medias.
+
+    Parámetros:
+    -----------
+    modelo: Objeto
+        Algoritmo (SARSA, MonteCarlo o Q_Learning).
+
+    fichero: String
+        Ruta del punto de control.
+    """
+
+    arrays = {nombre: getattr(modelo, nombre) for nombre in ARRAYS_ENTRENAMIENTO if isinstance(getattr(modelo, nombre, None), np.ndarray)}
+    arrays.update({nombre: np.array(getattr(modelo, nombre)) for nombre in CONTADORES_ENTRENAMIENTO if hasattr(modelo, nombre)})
+    arrays['generador'] = np.array(estado_generador(fuente_aleatoria(modelo)))
+    temporal = fichero + '.tmp'
+    with open(temporal, 'wb') as salida:
+        np.savez(salida, **arrays)
+    os.replace(temporal, fichero)
+
+
+def carga_punto_control(modelo, fichero):
+    """
+    Restaura en un algoritmo el estado de entrenamiento guardado con guarda_punto_control(). El algoritmo debe haberse
+    creado con el mismo problema y los mismos parámetros; al seguir entrenando se obtiene exactamente el mismo resultado
+    que si el entrenamiento no se hubiera interrumpido.
+
+    Parámetros:
+    -----------
+    modelo: Objeto
+        Algoritmo (SARSA, MonteCarlo o Q_Learning).
+
+    fichero: String
+        Ruta del punto de control.
+    """
+
+    with np.load(fichero) as datos:
+        for nombre in ARRAYS_ENTRENAMIENTO:
+            if nombre in datos.files:
+                actual = getattr(modelo, nombre)
+                assert actual.shape == datos[nombre].shape, f"El punto de control no corresponde a este problema ({nombre})"
+                actual[...] = datos[nombre]
+        for nombre in CONTADORES_ENTRENAMIENTO:
+            if nombre in datos.files:
+                setattr(modelo, nombre, int(datos[nombre]))
+        restaura_generador(fuente_aleatoria(modelo), str(datos['generador']))
+
+
+def reanuda_entrenamiento(modelo):
+    """
+    Prepara un algoritmo para empezar a entrenar. Si tiene punto de control y el fichero existe, restaura de él el estado
+    de entrenamiento y devuelve True. Si no, pone a cero los contadores de episodios e iteraciones, de forma que cada
+    llamada a entrenar() completa de nuevo todos sus episodios partiendo de la tabla Q actual, y devuelve False.
+
+    Parámetros:
+    -----------
+    modelo: Objeto
+        Algoritmo (SARSA, MonteCarlo, Q_Learning, SARSALambda, QLambda o DynaQ).
+    """
+
+    if modelo.punto_control is not None and os.path.exists(modelo.punto_control):
+        carga_punto_control(modelo, modelo.punto_control)
+        return True
+    for nombre in CONTADORES_ENTRENAMIENTO:
+        if hasattr(modelo, nombre):
+            setattr(modelo, nombre, 0)
+    return False
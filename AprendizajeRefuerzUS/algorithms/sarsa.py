@@ -1,17 +1,118 @@
+import time
 import numpy as np
 import math as math
 from .util import calcula_dimensiones
 from .util import politica_procesable
+from .util import nombres_acciones
+from .util import crea_muestreador
+from .util import VistaQ
+from .util import DistribucionInicial
+from .util import FlujoUniformes
+from .punto_control import guarda_punto_control
+from .punto_control import reanuda_entrenamiento
 
-class SARSA(object):
+class AprendizajeTD(object):
+
+    """
+    Base común de los algoritmos de diferencias temporales con tabla Q (SARSA, SARSALambda y QLambda): el constructor,
+    la selección de acciones epsilon-greedy, el muestreo del siguiente estado y la política aprendida. No entrena;
+    cada subclase implementa su propio entrenar(). Los parámetros, atributos y métodos son los descritos en SARSA.
+    """
+
+    def __init__(self, transiciones, recompensas, factor_descuento=0.9, factor_aprendizaje=0.5, max_iteraciones=1000, epsilon=0.1, estado_inicial=None, semilla=None, max_pasos_episodio=None, parada=None, punto_control=None, episodios_punto_control=100, telemetria=None):
+
+        self.transiciones = transiciones
+        self.recompensas = recompensas
+
+    
+        self.factor_descuento = factor_descuento
+        assert 0.0 < self.factor_descuento <= 1.0, "El valor del descuento debe estar entre 0 y 1"
+
+        self.factor_aprendizaje = factor_aprendizaje
+        assert 0.0 < self.factor_aprendizaje <= 1.0, "El valor del factor de aprendizaje debe estar entre 0 y 1"
+
+        self.max_iteraciones = int(max_iteraciones)
+        assert self.max_iteraciones > 0, "El número máximo de iteraciones debe ser un entero positivo"
+
+        self.epsilon = epsilon
+        assert 0.0 < self.epsilon <= 1.0, "El valor de epsilon debe estar entre 0 y 1"
+
+        self.max_pasos_episodio = max(1, int(self.max_iteraciones*0.1)) if max_pasos_episodio is None else int(max_pasos_episodio)
+        assert self.max_pasos_episodio > 0, "El número máximo de pasos por episodio debe ser un entero positivo"
+
+        self.generador = np.random.default_rng(semilla)
+        self.uniformes = FlujoUniformes(self.generador)
+
+        self.estados,self.acciones = calcula_dimensiones(transiciones)
+        self.sucesores,self.probabilidades,self.muestreador = crea_muestreador(transiciones,self.uniformes)
+
+        self.terminales = np.asarray(self.recompensas).sum(axis=1) == 0
+        self.distribucion_inicial = DistribucionInicial(self.terminales,estado_inicial,self.uniformes)
+
+        self.tabla_q = np.zeros((self.estados,self.acciones))
+        self.parada = parada
+        self.punto_control = punto_control
+        self.episodios_punto_control = int(episodios_punto_control)
+        assert self.episodios_punto_control > 0, "El número de episodios entre puntos de control debe ser un entero positivo"
+        self.telemetria = telemetria
+        self.episodios = 0
+
+    @property
+    def Q(self):
+        return VistaQ(self.tabla_q)
+
+
+    def es_terminal(self, estado):
+        # el estado es un índice, de 0 a 756, la máscara self.terminales indica si la suma de las recompensas
+        # de ese estado es 0, es decir, si es terminal
+
+        return self.terminales[estado]
+    
+
+    def seleccionar_accion(self,estado):
+        # con probabilidad 1 - self.epsilon eligo la accion con mayor Q en la tabla
+        # es decir la columna con mayor valor de la fila self.tabla_q[estado]
+        # con probabilidad epsilon, una accion aleatoria de las accione posibles self.acciones
+        # si u < epsilon, u/epsilon es uniforme en [0, 1), asi que con un solo numero se decide si explorar y que accion tomar
+
+        u = self.uniformes.random()
+        if u < self.epsilon:
+            return int(u/self.epsilon*self.acciones)
+        else:
+            return int(np.argmax(self.tabla_q[estado]))
+        
+    def siguiente_estado(self,estado,accion):
+
+        # en lugar de muestrear sobre la fila completa de la matriz de transicion (con tantos elementos como estados)
+        # usamos las tablas alias de los posibles sucesores del par (accion, estado), precalculadas en el constructor
+        '''
+        un ejemplo sería el siguiente, yo he hecho la accion 1 y estoy en el estado 35
+        entonces self.sucesores[1][35] es algo como [36, 65, 7] y self.probabilidades[1][35] es [0.8, 0.1, 0.1]
+        y quiero que me devuelva el indice del estado al que voy, con un solo numero aleatorio y sin recorrer la fila
+        '''
+
+        return self.muestreador.muestrea(estado, accion)
+    
+    def recompensa_accion(self,estado,accion):
+        return self.recompensas[estado][accion]
+
+    def obtener_politica(self):
+        politica = np.argmax(self.tabla_q, axis=1)
+        acciones = nombres_acciones(self.transiciones)
+        return politica_procesable(politica,acciones)
+
+
+class SARSA(AprendizajeTD):
 
     """
     Clase que implementa el algoritmo de SARSA para la resolución de problemas de aprendizaje por refuerzo.
 
     Parámetros:
     -----------
-    transiciones: List
+    transiciones: List, TransicionesDispersas o ModeloGenerativo
         Matriz de probabilidades de transición. Cada fila representa un estado y cada columna una acción.
+        También se acepta el formato disperso generado por Problem(..., dispersa=True) y el modelo generativo
+        de Problem.modelo_generativo(), que no construye ninguna matriz de transiciones.
     
     recompensas: List
         Matriz de recompensas. Cada fila representa un estado y cada columna una acción.
@@ -27,6 +128,32 @@ class SARSA(object):
     
     epsilon: float
         Probabilidad de exploración. Por defecto es 0.1.
+
+    estado_inicial: None, int o array
+        Distribución de los estados iniciales de los episodios. Si es None (por defecto) se elige un estado no terminal de forma uniforme,
+        si es un entero se empieza siempre en ese estado y si es un array de pesos (uno por estado) se elige con probabilidad proporcional al peso.
+
+    semilla: int o Generator
+        Semilla o generador de números aleatorios de NumPy propio de la instancia, de forma que varios entrenamientos
+        en paralelo no se interfieren y cada uno se puede reproducir. Por defecto es None (semilla aleatoria).
+
+    max_pasos_episodio: int
+        Número máximo de pasos de cada episodio. Si no se especifica es el 10% de max_iteraciones (como mínimo 1).
+
+    parada: CriterioParada
+        Criterio de parada anticipada (política estable, cambio de Q por debajo de una tolerancia o tiempo máximo),
+        que se comprueba al final de cada episodio. Por defecto es None, y se completan siempre max_iteraciones + 1 episodios.
+
+    punto_control: String
+        Ruta de un punto de control (.npz). Si se indica, al empezar a entrenar se reanuda desde él si ya existe, y se
+        guarda cada episodios_punto_control episodios y al terminar. Por defecto es None, sin puntos de control.
+
+    episodios_punto_control: int
+        Número de episodios entre dos puntos de control. Por defecto es 100.
+
+    telemetria: Telemetria
+        Instrumentación del entrenamiento (registro de cada episodio y, opcionalmente, tiempo de cada fase de un paso).
+        Por defecto es None, sin instrumentación.
     
     Atributos:
     -----------
@@ -37,14 +164,42 @@ class SARSA(object):
     acciones: int
         Número de acciones del problema.
 
-    Q: Dict
-        Diccionario que almacena los valores de la función Q para cada par (estado, acción).
+    sucesores: Array
+        Índices de los posibles estados sucesores de cada par (acción, estado). Es None con un modelo generativo.
+
+    probabilidades: Array
+        Probabilidad de cada uno de los sucesores.
+
+    muestreador: MuestreadorSucesores o ModeloGenerativo
+        Tablas alias precalculadas para muestrear el siguiente estado en tiempo constante, o el propio modelo generativo.
+
+    terminales: Array
+        Máscara booleana con los estados terminales, calculada una sola vez en el constructor.
+
+    distribucion_inicial: DistribucionInicial
+        Distribución precalculada de los estados iniciales de los episodios.
+
+    tabla_q: Array
+        Tabla de tamaño estados x acciones que almacena los valores de la función Q para cada par (estado, acción).
+
+    Q: VistaQ
+        Vista de solo lectura de tabla_q con forma de diccionario, Q[estado][accion].
+
+    generador: Generator
+        Generador de números aleatorios de la instancia.
+
+    uniformes: FlujoUniformes
+        Flujo de uniformes generados por bloques a partir de generador, del que salen todos los números aleatorios del entrenamiento.
+
+    episodios: int
+        Número de episodios completados durante el entrenamiento.
     
     Métodos:
     -----------
 
     es_terminal(estado) -> bool
         Comprueba si un estado es terminal. Consideramos que un estado es terminal si la suma de las recompensas asociadas a cada acción es 0.
+        La comprobación se hace sobre la máscara terminales, precalculada en el constructor.
 
     seleccionar_accion(estado) -> int
         Selecciona una acción en un estado dado siguiendo una política epsilon-greedy, es decir, 
@@ -58,106 +213,149 @@ class SARSA(object):
         Devuelve la recompensa asociada a una acción en un estado dado.
     
     entrenar() -> Dict
-        Entrena el algoritmo de SARSA y devuelve la función Q aprendida. Con un criterio de parada basado en el número de iteraciones o 
-        cuando el contador de iteraciones sea múltiplo del 10% del número máximo de iteraciones.
+        Entrena el algoritmo de SARSA y devuelve la función Q aprendida. Se completan max_iteraciones + 1 episodios, cada uno
+        hasta llegar a un estado terminal o como mucho max_pasos_episodio pasos, salvo que antes se cumpla el criterio de parada.
+        Si hay un punto de control se reanuda desde él; si no, el contador episodios vuelve a cero, por lo que cada llamada
+        entrena de nuevo todos los episodios partiendo de la tabla Q actual.
+
+    entrenar_vectorizado(n_entornos) -> None
+        Entrena el algoritmo de SARSA avanzando n_entornos episodios independientes a la vez con operaciones de NumPy
+        sobre la misma tabla Q. Igual que entrenar(), se completan max_iteraciones + 1 episodios contando desde el contador
+        episodios, y cada episodio se corta como mucho a los max_pasos_episodio pasos. El criterio de parada se comprueba
+        cada vez que termina algún episodio. Los puntos de control se guardan cuando el contador pasa por un múltiplo de
+        episodios_punto_control y al terminar; como no guardan los episodios en curso, al reanudar se empiezan otros nuevos
+        y el resultado no es idéntico al de un entrenamiento sin interrumpir. En la telemetría, el tiempo de cada episodio
+        es el que ha estado en curso su entorno, compartido con los demás entornos.
     
     obtener_politica() -> List
         Devuelve la política óptima aprendida a partir de la función Q.
     """
 
-    def __init__(self, transiciones, recompensas, factor_descuento=0.9, factor_aprendizaje=0.5, max_iteraciones=1000, epsilon=0.1):
-
-        self.transiciones = transiciones
-        self.recompensas = recompensas
-
-    
-        self.factor_descuento = factor_descuento
-        assert 0.0 < self.factor_descuento <= 1.0, "El valor del descuento debe estar entre 0 y 1"
-
-        self.factor_aprendizaje = factor_aprendizaje
-        assert 0.0 < self.factor_aprendizaje <= 1.0, "El valor del factor de aprendizaje debe estar entre 0 y 1"
-
-        self.max_iteraciones = int(max_iteraciones)
-        assert self.max_iteraciones > 0, "El número máximo de iteraciones debe ser un entero positivo"
-
-        self.epsilon = epsilon
-        assert 0.0 < self.epsilon <= 1.0, "El valor de epsilon debe estar entre 0 y 1"
-
-        self.estados,self.acciones = calcula_dimensiones(transiciones)
-
-        self.Q = {s: {a: 0.0 for a in range(self.acciones)} for s in range(self.estados)}
-
-
-    def es_terminal(self, estado):
-        # el estado es un índice, de 0 a 756, entonces yo miro las recompensas en el indice de estado self.recompensas[estado]
-        # que es una lista de recompensas por accion, si la suma de 0, es terminal:
-
-        return sum(self.recompensas[estado]) == 0
-    
-
-    def seleccionar_accion(self,estado):
-        # con probabilidad 1 - self.epsilon eligo la accion con mayor Q en el diccionario
-        # es decir Q[estado][accion] para accion en acciones, y cojo el maximo
-        # con probabilidad epsilon, una accion aleatoria de las accione posibles self.acciones
-
-        if np.random.rand() < self.epsilon:
-            return np.random.choice(self.acciones)
-        else:
-            return max(self.Q[estado], key=self.Q[estado].get)
-        
-    def siguiente_estado(self,estado,accion):
-
-        matriz_accion_elegida = self.transiciones[accion]
-
-        # ahora me quiero quedar con la fila del estado elegido, y quiero muestrear de ella
-        # para obtener el siguiente estado
-        # matriz_accion_elegida[estado] es la fila de la matriz de transicion que me interesa
-        # y quiero muestrear de ella, en ella tenemos una distribucion de probabilidades, con valoes de 0 a 1 en
-        # cada columna, que representan la probabilidad de ir a cada estado dado que estoy en el estado actual
-        '''
-        un ejemplo sería el siguiente, yo he hecho la accion 1 y estoy en el estado 35
-        entonces haria matriz_accion_elegida = self.transiciones[1]
-        y en la fila 35 tengo algo así
-
-        [0,0,0,0.2,0,0,0,0,0,0,0.5,0,0,0,0,0.3] pero con 765 elementos
-
-        entonces lo que hay dentro es una posibilidad y quiero que me devuelva el indice del estado al que voy
-
-        '''
-
-        posibles_siguientes_estados = matriz_accion_elegida[estado]
-        return np.random.choice(range(self.estados), p=posibles_siguientes_estados)
-    
-    def recompensa_accion(self,estado,accion):
-        return self.recompensas[estado][accion]
-
     def entrenar(self):
-        entero = 0
-        for _ in range(self.max_iteraciones+1):
-            estado = np.random.choice(range(self.estados))
-            while(self.es_terminal(estado)):
-                estado = np.random.choice(range(self.estados))
+        reanuda_entrenamiento(self)
+        telemetria = self.telemetria
+        fases = telemetria is not None and telemetria.fases
+        if telemetria is not None:
+            telemetria.inicia(self)
+        if self.parada is not None:
+            self.parada.inicia(self)
+        while self.episodios < self.max_iteraciones+1:
+            estado = self.distribucion_inicial.muestrea()
+            pasos, truncado, total, suma_td, max_td = 0, False, 0.0, 0.0, 0.0
             while not self.es_terminal(estado):
+                if fases:
+                    t0 = time.perf_counter()
                 accion = self.seleccionar_accion(estado)
+                if fases:
+                    t1 = time.perf_counter()
                 siguiente_estado = self.siguiente_estado(estado,accion)  
+                if fases:
+                    t2 = time.perf_counter()
                 recompensa = self.recompensa_accion(estado,accion)
                 accion_prima = self.seleccionar_accion(siguiente_estado)
-                self.Q[estado][accion] = self.Q[estado][accion] + self.factor_aprendizaje*(recompensa + self.factor_descuento*self.Q[siguiente_estado][accion_prima] - self.Q[estado][accion])
+                if fases:
+                    t3 = time.perf_counter()
+                q = self.tabla_q
+                td = recompensa + self.factor_descuento*q[siguiente_estado,accion_prima] - q[estado,accion]
+                q[estado,accion] = q[estado,accion] + self.factor_aprendizaje*td
+                pasos += 1
+                if telemetria is not None:
+                    total += recompensa
+                    suma_td += abs(td)
+                    max_td = max(max_td, abs(td))
+                    if fases:
+                        telemetria.acumula_fases(t1 - t0 + t3 - t2, t2 - t1, time.perf_counter() - t3)
                 estado = siguiente_estado
                 accion = accion_prima
-                entero += 1
-                if(entero % self.max_iteraciones*0.1 == 0):
+                if pasos >= self.max_pasos_episodio:
+                    truncado = not self.es_terminal(estado)
                     break
-
-            
-    
-    def obtener_politica(self):
-        politica = {s: max(self.Q[s], key=self.Q[s].get) for s in range(self.estados)}
-        acciones = ['esperar','N','NE','E','SE','S','SO','O','NO']
-        return politica_procesable(politica,acciones)
-
-
-                
-            
-
+            self.episodios += 1
+            if telemetria is not None:
+                telemetria.registra_episodio(self, pasos, truncado, total, suma_td/pasos if pasos else 0.0, max_td)
+            if self.punto_control is not None and self.episodios % self.episodios_punto_control == 0:
+                guarda_punto_control(self, self.punto_control)
+            if self.parada is not None and self.parada.comprueba(self):
+                break
+        if self.punto_control is not None:
+            guarda_punto_control(self, self.punto_control)
+
+    def entrenar_vectorizado(self, n_entornos=64):
+        assert n_entornos > 0, "El número de entornos debe ser un entero positivo"
+        reanuda_entrenamiento(self)
+        telemetria = self.telemetria
+        fases = telemetria is not None and telemetria.fases
+        if telemetria is not None:
+            telemetria.inicia(self)
+            total = np.zeros(n_entornos)
+            suma_td = np.zeros(n_entornos)
+            max_td = np.zeros(n_entornos)
+            inicio = np.full(n_entornos, time.perf_counter())
+        if self.parada is not None:
+            self.parada.inicia(self)
+        q = self.tabla_q
+        recompensas = np.asarray(self.recompensas)
+        entornos = np.arange(n_entornos)
+
+        # cada entorno tiene su estado, su accion (elegida de forma epsilon-greedy) y los pasos que lleva en el episodio
+        estados = self.distribucion_inicial.muestrea_lote(n_entornos)
+        acciones = self.seleccionar_acciones(estados)
+        pasos = np.zeros(n_entornos, dtype=np.int64)
+
+        while self.episodios < self.max_iteraciones + 1:
+            if fases:
+                t0 = time.perf_counter()
+            siguientes = self.muestreador.muestrea_lote(estados, acciones)
+            if fases:
+                t1 = time.perf_counter()
+            acciones_prima = self.seleccionar_acciones(siguientes)
+            if fases:
+                t2 = time.perf_counter()
+            td = recompensas[estados, acciones] + self.factor_descuento*q[siguientes, acciones_prima] - q[estados, acciones]
+
+            # si varios entornos actualizan el mismo par (estado, accion) en el mismo paso, se aplica la media de sus errores
+            indices = estados*self.acciones + acciones
+            _, inversa, repeticiones = np.unique(indices, return_inverse=True, return_counts=True)
+            np.add.at(q.reshape(-1), indices, self.factor_aprendizaje*td/repeticiones[inversa])
+            if telemetria is not None:
+                total += recompensas[estados, acciones]
+                suma_td += np.abs(td)
+                np.maximum(max_td, np.abs(td), out=max_td)
+                if fases:
+                    telemetria.acumula_fases(t2 - t1, t1 - t0, time.perf_counter() - t2)
+
+            pasos += 1
+            llegados = self.terminales[siguientes]
+            terminados = llegados | (pasos >= self.max_pasos_episodio)
+            estados = siguientes
+            acciones = acciones_prima
+            if terminados.any():
+                # no se cuentan más episodios de los que faltan, aunque terminen varios entornos en el mismo paso
+                reinicio = entornos[terminados][:self.max_iteraciones + 1 - self.episodios]
+                anteriores = self.episodios
+                self.episodios += len(reinicio)
+                if telemetria is not None:
+                    ahora = time.perf_counter()
+                    for i in reinicio:
+                        telemetria.registra_episodio(self, pasos[i], not llegados[i], total[i], suma_td[i]/pasos[i], max_td[i],
+                                                     tiempo=ahora - inicio[i])
+                    total[reinicio] = suma_td[reinicio] = max_td[reinicio] = 0.0
+                    inicio[reinicio] = ahora
+                estados[reinicio] = self.distribucion_inicial.muestrea_lote(len(reinicio))
+                acciones[reinicio] = self.seleccionar_acciones(estados[reinicio])
+                pasos[reinicio] = 0
+                if self.punto_control is not None and self.episodios // self.episodios_punto_control > anteriores // self.episodios_punto_control:
+                    guarda_punto_control(self, self.punto_control)
+                if self.parada is not None and self.parada.comprueba(self):
+                    break
+        if self.punto_control is not None:
+            guarda_punto_control(self, self.punto_control)
+
+    def seleccionar_acciones(self, estados):
+        # version de seleccionar_accion() para un array de estados
+        acciones = np.argmax(self.tabla_q[estados], axis=1)
+        u = self.uniformes.random(len(estados))
+        explorar = u < self.epsilon
+        acciones[explorar] = (u[explorar]/self.epsilon*self.acciones).astype(np.int64)
+        return acciones
 
@@ -0,0 +1,154 @@
+import csv
+import json
+import time
+import numpy as np
+from .util import politica_greedy
+
+
+class Telemetria:
+
+    """
+    Instrumentación opcional del entrenamiento de los algoritmos basados en muestras (SARSA, Monte Carlo y Q-Learning).
+    Se pasa al constructor del algoritmo con el parámetro telemetria; si no se pasa, los bucles de entrenamiento
+    no hacen ningún trabajo adicional aparte de comprobar una variable local.
+
+    Al final de cada episodio se guarda un registro con su número de pasos, si se cortó antes de llegar a un estado
+    terminal (truncado), la recompensa acumulada, el error TD medio y máximo (solo SARSA y Q-Learning), el número de
+    estados en los que ha cambiado la política greedy y el tiempo y los pasos por segundo del episodio.
+
+    Parámetros:
+    -----------
+    callbacks: List o función
+        Funciones que se llaman al final de cada episodio con el registro del episodio (un diccionario).
+
+    fases: bool
+        Si es True, además se mide el tiempo de cada fase de un paso: selección de la acción, muestreo del siguiente
+        estado y actualización de la función Q. Medir las fases añade varias llamadas al reloj por paso, por lo que
+        por defecto es False.
+
+    cambios_politica: bool
+        Si es True (por defecto), se cuenta en cada episodio el número de estados en los que ha cambiado la política
+        greedy, lo que cuesta O(estados x acciones) por episodio.
+
+    guarda_episodios: bool
+        Si es True (por defecto), se guardan los registros de todos los episodios en la lista episodios.
+
+    Atributos:
+    -----------
+    pasos: int
+        Número total de pasos.
+
+    episodios_completados: int
+        Número total de episodios.
+
+    truncados: int
+        Número de episodios que se cortaron antes de llegar a un estado terminal.
+
+    tiempos: Dict
+        Tiempo total en segundos de cada fase ('seleccion', 'muestreo', 'actualizacion'), solo si fases es True.
+
+    episodios: List
+        Registro de cada episodio.
+
+    Métodos:
+    -----------
+    inicia(modelo) -> None
+        Se llama al empezar a entrenar. Guarda la política inicial y el instante de inicio.
+
+    registra_episodio(modelo, pasos, truncado, recompensa, error_td=None, error_td_max=None, tiempo=None) -> Dict
+        Se llama al terminar cada episodio. Calcula el registro del episodio, lo guarda y llama a los callbacks. El tiempo
+        del episodio es por defecto el transcurrido desde el episodio anterior; el entrenamiento vectorizado, que termina
+        varios episodios a la vez, pasa el que ha estado en curso cada uno. El tiempo total es siempre el transcurrido.
+
+    acumula_fases(seleccion, muestreo, actualizacion) -> None
+        Suma el tiempo de cada fase de un paso.
+
+    resumen() -> Dict
+        Devuelve los contadores y tiempos totales del entrenamiento.
+
+    exporta_csv(fichero) -> None
+        Guarda los registros de los episodios en CSV.
+
+    exporta_json(fichero) -> None
+        Guarda el resumen y los registros de los episodios en JSON.
+    """
+
+    def __init__(self, callbacks=None, fases=False, cambios_politica=True, guarda_episodios=True):
+        if callbacks is None:
+            callbacks = []
+        elif callable(callbacks):
+            callbacks = [callbacks]
+        self.callbacks = list(callbacks)
+        self.fases = fases
+        self.cambios_politica = cambios_politica
+        self.guarda_episodios = guarda_episodios
+
+        self.pasos = 0
+        self.episodios_completados = 0
+        self.truncados = 0
+        self.tiempo_total = 0.0
+        self.tiempos = {'seleccion': 0.0, 'muestreo': 0.0, 'actualizacion': 0.0}
+        self.episodios = []
+
+        self._politica = None
+        self._instante = None
+
+    def inicia(self, modelo):
+        if self.cambios_politica:
+            self._politica = politica_greedy(modelo)
+        self._instante = time.perf_counter()
+
+    def registra_episodio(self, modelo, pasos, truncado, recompensa, error_td=None, error_td_max=None, tiempo=None):
+        ahora = time.perf_counter()
+        transcurrido = ahora - self._instante
+        self._instante = ahora
+        if tiempo is None:
+            tiempo = transcurrido
+
+        self.pasos += int(pasos)
+        self.episodios_completados += 1
+        self.truncados += bool(truncado)
+        self.tiempo_total += transcurrido
+
+        registro = {'episodio': self.episodios_completados, 'pasos': int(pasos), 'truncado': bool(truncado),
+                    'recompensa': float(recompensa),
+                    'error_td_medio': None if error_td is None else float(error_td),
+                    'error_td_max': None if error_td_max is None else float(error_td_max),
+                    'cambios_politica': None, 'tiempo': tiempo,
+                    'pasos_por_segundo': pasos / tiempo if tiempo > 0 else None}
+        if self.cambios_politica:
+            politica = politica_greedy(modelo)
+            registro['cambios_politica'] = int(np.count_nonzero(politica != self._politica))
+            self._politica = politica
+
+        if self.guarda_episodios:
+            self.episodios.append(registro)
+        for callback in self.callbacks:
+            callback(registro)
+        return registro
+
+    def acumula_fases(self, seleccion, muestreo, actualizacion):
+        self.tiempos['seleccion'] += seleccion
+        self.tiempos['muestreo'] += muestreo
+        self.tiempos['actualizacion'] += actualizacion
+
+    def resumen(self):
+        resumen = {'pasos': self.pasos, 'episodios': self.episodios_completados, 'truncados': self.truncados,
+                   'tiempo_total': self.tiempo_total,
+                   'pasos_por_segundo': self.pasos / self.tiempo_total if self.tiempo_total > 0 else None,
+                   'pasos_por_episodio': self.pasos / self.episodios_completados if self.episodios_completados > 0 else None}
+        if self.fases:
+            resumen['tiempos'] = dict(self.tiempos)
+        return resumen
+
+    def exporta_csv(self, fichero):
+        columnas = ['episodio', 'pasos', 'truncado', 'recompensa', 'error_td_medio', 'error_td_max',
+                    'cambios_politica', 'tiempo', 'pasos_por_segundo']
+        with open(fichero, 'w', newline='') as salida:
+            escritor = csv.DictWriter(salida, fieldnames=columnas)
+            escritor.writeheader()
+            escritor.writerows(self.episodios)
+
+    def exporta_json(self, fichero):
+        with open(fichero, 'w') as salida:
+            json.dump({'resumen': self.resumen(), 'episodios': self.episodios}, salida, indent=2)
@@ -0,0 +1,244 @@
+import numpy as np
+from .sarsa import AprendizajeTD
+from .punto_control import guarda_punto_control
+from .punto_control import reanuda_entrenamiento
+
+
+class TrazasElegibilidad:
+
+    """
+    Trazas de elegibilidad guardadas como un conjunto activo: solo se guardan los pares (estado, acción) visitados
+    recientemente, con su índice en la tabla Q aplanada y el valor de su traza. Cada paso solo toca esos pares,
+    en lugar de toda la tabla de estados x acciones, y los pares cuya traza baja del umbral se eliminan. La posición
+    de cada par en el conjunto activo se guarda en un array con una entrada por par, de forma que visitar un par
+    cuesta un tiempo constante.
+
+    Parámetros:
+    -----------
+    claves: int
+        Número de pares (estado, acción), es decir, estados x acciones.
+
+    reemplazo: bool
+        Si es True, las trazas son de reemplazo (al visitar un par su traza pasa a valer 1). Si es False (por defecto),
+        son acumulativas (al visitar un par su traza aumenta en 1).
+
+    umbral: float
+        Valor por debajo del cual una traza se considera nula y se elimina. Por defecto es 1e-3.
+
+    capacidad: int
+        Número de pares que se reservan al principio. Se duplica cuando hace falta. Por defecto es 64.
+
+    Atributos:
+    -----------
+    indices: Array
+        Índice en la tabla Q aplanada (estado*acciones + accion) de cada par activo. Solo son válidos los n primeros.
+
+    valores: Array
+        Valor de la traza de cada par activo.
+
+    posicion: Array
+        Posición de cada par en indices y valores, -1 si no está activo.
+
+    n: int
+        Número de pares activos.
+
+    Métodos:
+    -----------
+    visita(indice) -> None
+        Incrementa (o pone a 1, con reemplazo) la traza del par con ese índice.
+
+    actualiza(q, incremento) -> None
+        Suma incremento*traza a los valores de la tabla Q aplanada de todos los pares activos.
+
+    decae(factor) -> None
+        Multiplica todas las trazas por factor y elimina las que quedan por debajo del umbral.
+
+    vacia() -> None
+        Pone todas las trazas a 0.
+    """
+
+    def __init__(self, claves, reemplazo=False, umbral=1e-3, capacidad=64):
+        self.reemplazo = reemplazo
+        self.umbral = umbral
+        self.indices = np.zeros(capacidad, dtype=np.int64)
+        self.valores = np.zeros(capacidad)
+        self.posicion = np.full(claves, -1, dtype=np.int64)
+        self.n = 0
+
+    def visita(self, indice):
+        i = self.posicion[indice]
+        if i < 0:
+            if self.n == len(self.indices):
+                self.indices = np.concatenate([self.indices, np.zeros_like(self.indices)])
+                self.valores = np.concatenate([self.valores, np.zeros_like(self.valores)])
+            i = self.n
+            self.n += 1
+            self.indices[i] = indice
+            self.valores[i] = 0.0
+            self.posicion[indice] = i
+        if self.reemplazo:
+            self.valores[i] = 1.0
+        else:
+            self.valores[i] += 1.0
+
+    def actualiza(self, q, incremento):
+        # los índices activos son distintos, así que se pueden sumar todos a la vez
+        q[self.indices[:self.n]] += incremento*self.valores[:self.n]
+
+    def decae(self, factor):
+        valores = self.valores[:self.n]
+        valores *= factor
+        if self.n > 0 and valores.min() < self.umbral:
+            activos = valores >= self.umbral
+            indices = self.indices[:self.n]
+            self.posicion[indices[~activos]] = -1
+            n = int(activos.sum())
+            self.indices[:n] = indices[activos]
+            self.valores[:n] = valores[activos]
+            self.n = n
+            self.posicion[self.indices[:n]] = np.arange(n)
+
+    def vacia(self):
+        self.posicion[self.indices[:self.n]] = -1
+        self.n = 0
+
+
+class SARSALambda(AprendizajeTD):
+
+    """
+    Clase que implementa el algoritmo SARSA(λ), SARSA con trazas de elegibilidad. En cada paso el error TD se aplica
+    a todos los pares (estado, acción) visitados recientemente, con un peso que decae con factor_descuento*lambda_traza
+    por cada paso transcurrido, de forma que la recompensa se propaga hacia atrás por todo el camino recorrido
+    en lugar de un solo paso. Comparte con SARSA (a través de AprendizajeTD) el constructor, la selección de acciones
+    y la política aprendida; solo cambia el episodio de entrenamiento.
+
+    Parámetros:
+    -----------
+    Los mismos que SARSA, más:
+
+    lambda_traza: float
+        Parámetro λ de las trazas, entre 0 y 1. Con 0 es equivalente a SARSA de un paso. Por defecto es 0.9.
+
+    tipo_traza: str
+        'reemplazo' (por defecto) o 'acumulativa'. Las trazas acumulativas pueden crecer por encima de 1 cuando un par
+        se repite dentro del mismo episodio, por lo que con factores de aprendizaje altos conviene usar las de reemplazo.
+
+    umbral_traza: float
+        Valor por debajo del cual una traza se elimina del conjunto activo. Por defecto es 1e-3.
+
+    La telemetría registra cada episodio, sin medir las fases de cada paso.
+
+    Atributos:
+    -----------
+    Los mismos que SARSA, más:
+
+    trazas: TrazasElegibilidad
+        Trazas de elegibilidad del episodio en curso.
+
+    Métodos:
+    -----------
+    objetivo(siguiente_estado, accion_prima) -> Tuple
+        Devuelve el valor del siguiente par con el que se calcula el error TD, Q(s',a'), y si las trazas se conservan (siempre).
+
+    entrenar() -> None
+        Entrena el algoritmo. Las trazas se vacían al empezar cada episodio.
+    """
+
+    def __init__(self, transiciones, recompensas, factor_descuento=0.9, factor_aprendizaje=0.5, max_iteraciones=1000, epsilon=0.1,
+                 lambda_traza=0.9, tipo_traza='reemplazo', umbral_traza=1e-3, estado_inicial=None, semilla=None, max_pasos_episodio=None,
+                 parada=None, punto_control=None, episodios_punto_control=100, telemetria=None):
+
+        super().__init__(transiciones, recompensas, factor_descuento=factor_descuento, factor_aprendizaje=factor_aprendizaje,
+                         max_iteraciones=max_iteraciones, epsilon=epsilon, estado_inicial=estado_inicial, semilla=semilla,
+                         max_pasos_episodio=max_pasos_episodio, parada=parada, punto_control=punto_control,
+                         episodios_punto_control=episodios_punto_control, telemetria=telemetria)
+
+        self.lambda_traza = lambda_traza
+        assert 0.0 <= self.lambda_traza <= 1.0, "El valor de lambda debe estar entre 0 y 1"
+
+        self.tipo_traza = tipo_traza
+        assert self.tipo_traza in ('acumulativa', 'reemplazo'), "El tipo de traza debe ser 'acumulativa' o 'reemplazo'"
+        self.trazas = TrazasElegibilidad(self.estados*self.acciones, self.tipo_traza == 'reemplazo', umbral_traza)
+
+    def objetivo(self, siguiente_estado, accion_prima):
+        return self.tabla_q[siguiente_estado, accion_prima], True
+
+    def entrenar(self):
+        reanuda_entrenamiento(self)
+        if self.telemetria is not None:
+            self.telemetria.inicia(self)
+        if self.parada is not None:
+            self.parada.inicia(self)
+        q = self.tabla_q
+        plana = q.reshape(-1)
+        recompensas = np.asarray(self.recompensas)
+        decaimiento = self.factor_descuento*self.lambda_traza
+
+        while self.episodios < self.max_iteraciones + 1:
+            self.trazas.vacia()
+            estado = self.distribucion_inicial.muestrea()
+            accion = self.seleccionar_accion(estado)
+            pasos, total, suma_td, max_td = 0, 0.0, 0.0, 0.0
+            while True:
+                siguiente_estado = self.muestreador.muestrea(estado, accion)
+                accion_prima = self.seleccionar_accion(siguiente_estado)
+                valor, conserva = self.objetivo(siguiente_estado, accion_prima)
+                td = recompensas[estado, accion] + self.factor_descuento*valor - q[estado, accion]
+
+                self.trazas.visita(estado*self.acciones + accion)
+                self.trazas.actualiza(plana, self.factor_aprendizaje*td)
+                if conserva:
+                    self.trazas.decae(decaimiento)
+                else:
+                    self.trazas.vacia()
+
+                pasos += 1
+                if self.telemetria is not None:
+                    total += recompensas[estado, accion]
+                    suma_td += abs(td)
+                    max_td = max(max_td, abs(td))
+                estado, accion = siguiente_estado, accion_prima
+                if self.terminales[estado] or pasos >= self.max_pasos_episodio:
+                    break
+
+            self.episodios += 1
+            if self.telemetria is not None:
+                self.telemetria.registra_episodio(self, pasos, not self.terminales[estado], total, suma_td/pasos, max_td)
+            if self.punto_control is not None and self.episodios % self.episodios_punto_control == 0:
+                guarda_punto_control(self, self.punto_control)
+            if self.parada is not None and self.parada.comprueba(self):
+                break
+        if self.punto_control is not None:
+            guarda_punto_control(self, self.punto_control)
+
+
+class QLambda(SARSALambda):
+
+    """
+    Clase que implementa el algoritmo Q(λ) de Watkins, Q-Learning con trazas de elegibilidad. El error TD usa el valor
+    de la acción greedy del siguiente estado, igual que Q-Learning, y se aplica a todos los pares visitados recientemente
+    mientras se sigan eligiendo acciones greedy: en cuanto se toma una acción de exploración las trazas se vacían,
+    porque el camino recorrido ya no es el de la política greedy. Solo cambia objetivo() respecto a SARSALambda.
+
+    Parámetros:
+    -----------
+    Los mismos que SARSALambda.
+
+    Atributos:
+    -----------
+    Los mismos que SARSALambda.
+
+    Métodos:
+    -----------
+    objetivo(siguiente_estado, accion_prima) -> Tuple
+        Devuelve el mayor valor Q del siguiente estado y si la acción elegida es greedy, en cuyo caso se conservan las trazas.
+
+    entrenar() -> None
+        Entrena el algoritmo. Las trazas se vacían al empezar cada episodio y después de cada acción de exploración.
+    """
+
+    def objetivo(self, siguiente_estado, accion_prima):
+        q = self.tabla_q[siguiente_estado]
+        mejor = q.max()
+        # si la acción elegida empata con la mejor, se considera greedy y no se cortan las trazas
+        return mejor, q[accion_prima] == mejor
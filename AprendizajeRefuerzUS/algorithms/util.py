@@ -1,5 +1,7 @@
 import numpy as np
 import math as math
+from collections.abc import Mapping
+from AprendizajeRefuerzUS.problem_utils import ACCIONES, ACCIONES_4
 
 
 def calcula_dimensiones(transiciones):
@@ -23,6 +25,523 @@ def calcula_dimensiones(transiciones):
         estados = transiciones[0].shape[0]
     return estados, acciones
 
+def tabla_sucesores(transiciones):
+    """
+    Obtiene la tabla de sucesores de las transiciones, es decir, para cada par (accion, estado) los
+    indices de los estados a los que se puede llegar y sus probabilidades.
+
+    Parametros
+    ----------
+
+    transiciones : Array o TransicionesDispersas
+        Matriz de transiciones
+
+    Si las transiciones ya estan en formato disperso se devuelven directamente sus tablas. Si es una
+    matriz densa, se extraen los elementos no nulos de cada fila, rellenando las posiciones sobrantes
+    con el propio estado y probabilidad 0.
+    """
+    if hasattr(transiciones, 'sucesores'):
+        return transiciones.sucesores, transiciones.probabilidades
+    matriz = np.asarray(transiciones, dtype=np.float64)
+    acciones, estados, _ = matriz.shape
+    a, s, destino = np.nonzero(matriz)
+    fila = a*estados + s
+    posicion = np.arange(len(fila)) - np.searchsorted(fila, fila)
+    k = int(posicion.max()) + 1
+    sucesores = np.broadcast_to(np.arange(estados)[None, :, None], (acciones, estados, k)).copy()
+    probabilidades = np.zeros((acciones, estados, k))
+    sucesores[a, s, posicion] = destino
+    probabilidades[a, s, posicion] = matriz[a, s, destino]
+    return sucesores, probabilidades
+
+class FlujoUniformes:
+    """
+    Flujo de numeros aleatorios uniformes en [0, 1) generados por bloques. En lugar de pedir al generador un
+    numero en cada paso, se genera un bloque de tamano numeros de una vez y se van devolviendo de uno en uno,
+    lo que reduce mucho el coste de cada numero. Tiene el mismo metodo random() que un Generator de NumPy, por lo
+    que se puede pasar como generador a MuestreadorSucesores, DistribucionInicial y ModeloGenerativo.
+
+    Parametros
+    ----------
+
+    generador : Generator
+        Generador de numeros aleatorios de NumPy del que se sacan los bloques.
+
+    tamano : int
+        Numero de uniformes de cada bloque. Por defecto 4096.
+
+    Atributos
+    ---------
+
+    estado : Dict
+        Estado del generador justo antes de generar el bloque actual. Junto con posicion permite guardar
+        y restaurar el flujo exactamente (ver punto_control).
+
+    posicion : int
+        Numero de uniformes ya usados del bloque actual.
+    """
+
+    def __init__(self, generador, tamano=4096):
+        self.generador = generador
+        self.tamano = int(tamano)
+        assert self.tamano > 0, "El tamano del bloque debe ser un entero positivo"
+        self.rellena()
+
+    def rellena(self):
+        """
+        Genera un nuevo bloque de uniformes.
+        """
+        self.estado = self.generador.bit_generator.state
+        self.bloque = self.generador.random(self.tamano)
+        self.lista = self.bloque.tolist()
+        self.posicion = 0
+
+    def random(self, n=None):
+        """
+        Devuelve un uniforme o, si se indica n, un array con n uniformes.
+        """
+        if n is None:
+            if self.posicion == self.tamano:
+                self.rellena()
+            u = self.lista[self.posicion]
+            self.posicion += 1
+            return u
+        resultado = np.empty(n)
+        hechos = 0
+        while hechos < n:
+            if self.posicion == self.tamano:
+                self.rellena()
+            k = min(n - hechos, self.tamano - self.posicion)
+            resultado[hechos:hechos + k] = self.bloque[self.posicion:self.posicion + k]
+            self.posicion += k
+            hechos += k
+        return resultado
+
+def tablas_alias_filas(principal, probabilidades):
+    """
+    Calcula a la vez la tabla alias (metodo de Vose) de cada fila de una tabla de sucesores. Devuelve el umbral
+    y el alias de cada posicion, con la misma forma que la tabla.
+
+    Parametros
+    ----------
+
+    principal : Array
+        Tabla de tamaño filas x K con los sucesores de cada fila.
+
+    probabilidades : Array
+        Tabla de tamaño filas x K con la probabilidad de cada sucesor.
+    """
+    k = principal.shape[1]
+    escaladas = probabilidades / probabilidades.sum(axis=1, keepdims=True) * k
+    umbral = np.ones_like(escaladas)
+    alias = principal.copy()
+    pendientes = np.ones(escaladas.shape, dtype=bool)
+    filas = np.arange(len(escaladas))
+    # Metodo de Vose: en cada paso se empareja la columna mas pequeña que queda con la mas grande,
+    # que le cede la probabilidad que le falta para llegar a 1
+    for _ in range(k - 1):
+        pequena = np.argmin(np.where(pendientes, escaladas, np.inf), axis=1)
+        grande = np.argmax(np.where(pendientes, escaladas, -np.inf), axis=1)
+        umbral[filas, pequena] = escaladas[filas, pequena]
+        alias[filas, pequena] = principal[filas, grande]
+        escaladas[filas, grande] -= 1 - escaladas[filas, pequena]
+        pendientes[filas, pequena] = False
+    return umbral, alias
+
+class MuestreadorSucesores:
+    """
+    Muestreador del siguiente estado basado en tablas alias. Las tablas se calculan una sola vez a partir
+    de la tabla de sucesores, de forma que muestrear el siguiente estado de un par (estado, accion) cuesta
+    O(1): un numero aleatorio, una comparacion y dos accesos a memoria, sin importar el numero de estados.
+
+    Parametros
+    ----------
+
+    sucesores : Array
+        Matriz de tamaño acciones x estados x K con los indices de los estados sucesores.
+
+    probabilidades : Array
+        Matriz de tamaño acciones x estados x K con la probabilidad de cada sucesor.
+
+    generador : Generator o FlujoUniformes
+        Generador de numeros aleatorios de NumPy. Si no se especifica se crea uno propio con la semilla indicada.
+
+    semilla : int
+        Semilla del generador propio cuando no se pasa ninguno. Por defecto es None (semilla aleatoria).
+
+    Atributos
+    ---------
+
+    umbral : Array
+        Probabilidad de quedarse con el sucesor principal de cada columna de la tabla alias.
+
+    principal : Array
+        Sucesor principal de cada columna de la tabla alias.
+
+    alias : Array
+        Sucesor alternativo de cada columna de la tabla alias.
+
+    Las tres tablas se guardan aplanadas, de tamaño acciones*estados*K.
+    """
+
+    def __init__(self, sucesores, probabilidades, generador=None, semilla=None):
+        self.generador = np.random.default_rng(semilla) if generador is None else generador
+        acciones, estados, k = sucesores.shape
+        self.estados = estados
+        self.k = k
+
+        umbral, alias = tablas_alias_filas(sucesores.reshape(-1, k), probabilidades.reshape(-1, k))
+        self.umbral = umbral.ravel()
+        self.principal = np.ascontiguousarray(sucesores.reshape(-1, k)).ravel()
+        self.alias = alias.ravel()
+
+    def actualiza(self, sucesores, probabilidades, estados):
+        """
+        Vuelve a calcular las tablas alias de los estados indicados, para todas las acciones, a partir de sus filas
+        de la tabla de sucesores, que deben tener el mismo K.
+        """
+        estados = np.asarray(estados, dtype=np.int64)
+        acciones = sucesores.shape[0]
+        principal = sucesores[:, estados].reshape(-1, self.k)
+        umbral, alias = tablas_alias_filas(principal, probabilidades[:, estados].reshape(-1, self.k))
+        posiciones = ((np.arange(acciones)[:, None]*self.estados + estados[None, :])[:, :, None]*self.k + np.arange(self.k)).ravel()
+        self.umbral[posiciones] = umbral.ravel()
+        self.principal[posiciones] = principal.ravel()
+        self.alias[posiciones] = alias.ravel()
+
+    def muestrea(self, estado, accion):
+        """
+        Devuelve el siguiente estado tras ejecutar una accion en un estado dado.
+        """
+        x = self.generador.random() * self.k
+        columna = int(x)
+        i = (accion*self.estados + estado)*self.k + columna
+        if x - columna < self.umbral[i]:
+            return self.principal[i]
+        return self.alias[i]
+
+    def muestrea_lote(self, estados, acciones):
+        """
+        Devuelve el siguiente estado de varios pares (estado, accion) a la vez, con operaciones de NumPy.
+        """
+        x = self.generador.random(len(estados)) * self.k
+        columnas = x.astype(np.int64)
+        i = (acciones*self.estados + estados)*self.k + columnas
+        return np.where(x - columnas < self.umbral[i], self.principal[i], self.alias[i])
+
+def tabla_alias(pesos):
+    """
+    Calcula la tabla alias (metodo de Vose) de una distribucion discreta, para poder muestrearla en O(1).
+    Devuelve el umbral y el alias de cada posicion.
+
+    Parametros
+    ----------
+
+    pesos : Array
+        Pesos no negativos de cada posicion. No hace falta que sumen 1.
+    """
+    n = len(pesos)
+    escaladas = (np.asarray(pesos, dtype=np.float64) * n / np.sum(pesos)).tolist()
+    umbral = np.ones(n)
+    alias = np.arange(n)
+    pequenos = [i for i, p in enumerate(escaladas) if p < 1]
+    grandes = [i for i, p in enumerate(escaladas) if p >= 1]
+    while pequenos and grandes:
+        pequeno, grande = pequenos.pop(), grandes.pop()
+        umbral[pequeno] = escaladas[pequeno]
+        alias[pequeno] = grande
+        escaladas[grande] -= 1 - escaladas[pequeno]
+        (pequenos if escaladas[grande] < 1 else grandes).append(grande)
+    return umbral, alias
+
+class DistribucionInicial:
+    """
+    Distribucion de los estados iniciales de los episodios. Se calcula una sola vez a partir de la mascara de
+    estados terminales, de forma que cada estado inicial se obtiene en O(1) sin tener que repetir el sorteo
+    hasta encontrar un estado no terminal.
+
+    Parametros
+    ----------
+
+    terminales : Array
+        Mascara booleana con los estados terminales.
+
+    inicio : None, int o Array
+        Si es None, los episodios empiezan en un estado no terminal elegido de forma uniforme. Si es un entero,
+        siempre empiezan en ese estado. Si es un array de pesos (uno por estado), el estado inicial se elige con
+        probabilidad proporcional a su peso; los pesos de los estados terminales se ignoran.
+
+    generador : Generator o FlujoUniformes
+        Generador de numeros aleatorios de NumPy. Si no se especifica se crea uno propio con la semilla indicada.
+
+    semilla : int
+        Semilla del generador propio cuando no se pasa ninguno. Por defecto es None (semilla aleatoria).
+
+    Atributos
+    ---------
+
+    validos : Array
+        Indices de los estados en los que puede empezar un episodio.
+    """
+
+    def __init__(self, terminales, inicio=None, generador=None, semilla=None):
+        self.generador = np.random.default_rng(semilla) if generador is None else generador
+        self.inicio = inicio
+        self.validos = np.flatnonzero(~terminales)
+        self.fijo = None
+        self.umbral = None
+        if inicio is None:
+            assert len(self.validos) > 0, "Todos los estados son terminales"
+        elif np.ndim(inicio) == 0:
+            assert 0 <= inicio < len(terminales) and not terminales[inicio], "El estado inicial debe ser un estado no terminal"
+            self.fijo = int(inicio)
+        else:
+            pesos = np.asarray(inicio, dtype=np.float64)
+            assert pesos.shape == terminales.shape and (pesos >= 0).all(), "Debe haber un peso no negativo por cada estado"
+            self.validos = self.validos[pesos[self.validos] > 0]
+            assert len(self.validos) > 0, "Algun estado no terminal debe tener peso positivo"
+            self.umbral, self.alias = tabla_alias(pesos[self.validos])
+
+    def muestrea(self):
+        """
+        Devuelve un estado inicial.
+        """
+        if self.fijo is not None:
+            return self.fijo
+        x = self.generador.random() * len(self.validos)
+        i = int(x)
+        if self.umbral is None or x - i < self.umbral[i]:
+            return self.validos[i]
+        return self.validos[self.alias[i]]
+
+    def muestrea_lote(self, n):
+        """
+        Devuelve n estados iniciales a la vez.
+        """
+        if self.fijo is not None:
+            return np.full(n, self.fijo, dtype=np.int64)
+        x = self.generador.random(n) * len(self.validos)
+        i = x.astype(np.int64)
+        if self.umbral is None:
+            return self.validos[i]
+        return self.validos[np.where(x - i < self.umbral[i], i, self.alias[i])]
+
+class VistaQ(Mapping):
+    """
+    Vista de solo lectura con forma de diccionario sobre una tabla Q de NumPy. Permite seguir accediendo
+    a los valores como Q[estado][accion] y recorrerlos como si fueran diccionarios anidados, sin copiar
+    la tabla: los cambios en la tabla se ven reflejados en la vista.
+
+    Parametros
+    ----------
+
+    tabla : Array
+        Tabla Q de tamaño estados x acciones (o una fila de ella, de tamaño acciones).
+    """
+
+    def __init__(self, tabla):
+        self._tabla = tabla
+
+    def __getitem__(self, clave):
+        if isinstance(clave, (bool, np.bool_)) or not isinstance(clave, (int, np.integer)) or not 0 <= clave < len(self._tabla):
+            raise KeyError(clave)
+        if self._tabla.ndim == 1:
+            return float(self._tabla[clave])
+        return VistaQ(self._tabla[clave])
+
+    def __iter__(self):
+        return iter(range(len(self._tabla)))
+
+    def __len__(self):
+        return len(self._tabla)
+
+    def __repr__(self):
+        return repr({clave: valor for clave, valor in self.items()})
+
+def retornos_descontados(recompensas, factor_descuento):
+    """
+    Calcula el retorno descontado de cada paso de un episodio, G_t = r_t + factor_descuento*G_{t+1},
+    con una unica pasada hacia atras, por lo que el coste es lineal en la longitud del episodio. La pasada se hace
+    con floats de Python sobre una lista, que es mas rapido que indexar un array de NumPy elemento a elemento.
+
+    A diferencia de la version original de MonteCarlo, que sumaba factor_descuento**(i-t)*r_t para i >= t, es decir,
+    repetia la recompensa del paso t en lugar de usar las recompensas posteriores, aqui G_t es el retorno
+    r_t + factor_descuento*r_{t+1} + factor_descuento**2*r_{t+2} + ... Por ejemplo, con recompensas [1, 0, 10]
+    y factor_descuento 0.5 los retornos son [3.5, 5, 10], y no [1.75, 0, 10].
+
+    Parametros
+    ----------
+
+    recompensas : List o Array
+        Recompensas obtenidas en cada paso del episodio, en orden.
+
+    factor_descuento : float
+        Factor de descuento.
+    """
+    retornos = [0.0]*len(recompensas)
+    acumulado = 0.0
+    for t, recompensa in zip(range(len(retornos) - 1, -1, -1), reversed(list(recompensas))):
+        acumulado = float(recompensa) + factor_descuento*acumulado
+        retornos[t] = acumulado
+    return np.array(retornos, dtype=np.float64)
+
+def crea_muestreador(transiciones, generador=None):
+    """
+    Prepara el muestreo del siguiente estado para los algoritmos basados en muestras. Devuelve la tabla de
+    sucesores, sus probabilidades y el muestreador.
+
+    Parametros
+    ----------
+
+    transiciones : Array, TransicionesDispersas o ModeloGenerativo
+        Matriz de transiciones. Si es un modelo generativo (tiene un metodo muestrea) no se construye ninguna
+        tabla: la tabla de sucesores y las probabilidades son None y el propio modelo hace de muestreador.
+
+    generador : Generator o FlujoUniformes
+        Generador de numeros aleatorios de NumPy. Si no se especifica, el muestreador crea uno propio con semilla
+        aleatoria y el modelo generativo conserva el suyo.
+    """
+    if hasattr(transiciones, 'muestrea'):
+        muestreador = transiciones if generador is None else transiciones.con_generador(generador)
+        return None, None, muestreador
+    sucesores, probabilidades = tabla_sucesores(transiciones)
+    return sucesores, probabilidades, MuestreadorSucesores(sucesores, probabilidades, generador)
+
+def actualiza_tabla_sucesores(transiciones, sucesores, probabilidades, estados):
+    """
+    Actualiza las filas de los estados indicados de una tabla de sucesores obtenida con tabla_sucesores(), despues
+    de cambiar esas filas en las transiciones. Devuelve la tabla de sucesores y sus probabilidades: las mismas si
+    las transiciones son dispersas (comparten los arrays) o si las filas nuevas caben en la tabla, y una tabla nueva
+    si alguna fila tiene ahora mas sucesores que K.
+
+    Parametros
+    ----------
+
+    transiciones : Array o TransicionesDispersas
+        Transiciones ya actualizadas.
+
+    sucesores : Array
+        Tabla de sucesores de tamaño acciones x estados x K.
+
+    probabilidades : Array
+        Probabilidad de cada sucesor, de tamaño acciones x estados x K.
+
+    estados : Array
+        Indices de los estados que han cambiado.
+    """
+    if hasattr(transiciones, 'sucesores'):
+        if transiciones.sucesores is not sucesores:
+            sucesores[:, estados] = transiciones.sucesores[:, estados]
+            probabilidades[:, estados] = transiciones.probabilidades[:, estados]
+        return sucesores, probabilidades
+    estados = np.asarray(estados, dtype=np.int64)
+    filas, probabilidades_filas = tabla_sucesores(np.asarray(transiciones)[:, estados])
+    k = filas.shape[2]
+    if k > sucesores.shape[2]:
+        return tabla_sucesores(transiciones)
+    # tabla_sucesores() rellena con el indice de la fila dentro de estados; se cambia por el del propio estado
+    filas = np.where(probabilidades_filas > 0, filas, estados[None, :, None])
+    sucesores[:, estados] = estados[None, :, None]
+    probabilidades[:, estados] = 0.0
+    sucesores[:, estados, :k] = filas
+    probabilidades[:, estados, :k] = probabilidades_filas
+    return sucesores, probabilidades
+
+def actualiza_modelo(modelo, estados, transiciones=None, recompensas=None):
+    """
+    Prepara un algoritmo basado en muestras (SARSA, Monte Carlo, Q-Learning, SARSA(λ) o Q(λ)) para seguir entrenando
+    despues de cambiar las filas de algunos estados de sus transiciones y recompensas, por ejemplo con
+    Problem.cambia_celdas(), sin volver a empezar. Se actualizan solo esas filas de la tabla de sucesores y de las
+    tablas alias, y se recalculan los estados terminales. La tabla Q se conserva como arranque en caliente, salvo en
+    los estados indicados, a los que se aplica una actualizacion de Bellman con el nuevo modelo y la tabla Q actual.
+
+    Parametros
+    ----------
+
+    modelo : Objeto
+        Algoritmo basado en muestras ya creado (y posiblemente entrenado).
+
+    estados : Array
+        Indices de los estados que han cambiado.
+
+    transiciones : Array, TransicionesDispersas o ModeloGenerativo
+        Nuevas transiciones, si no son el mismo objeto que ya tiene el algoritmo.
+
+    recompensas : Array
+        Nueva matriz de recompensas, si no es el mismo objeto que ya tiene el algoritmo.
+    """
+    assert getattr(modelo, 'motor', 'nativo') == 'nativo', "Solo se pueden actualizar los algoritmos con el motor nativo"
+    estados = np.asarray(estados, dtype=np.int64)
+    if recompensas is not None:
+        modelo.recompensas = recompensas
+    if transiciones is not None:
+        modelo.transiciones = transiciones
+        if hasattr(transiciones, 'muestrea'):
+            modelo.muestreador = transiciones.con_generador(modelo.uniformes)
+        elif hasattr(transiciones, 'sucesores') and modelo.sucesores is not transiciones.sucesores:
+            modelo.sucesores, modelo.probabilidades, modelo.muestreador = crea_muestreador(transiciones, modelo.uniformes)
+
+    if modelo.sucesores is not None:
+        sucesores, probabilidades = actualiza_tabla_sucesores(modelo.transiciones, modelo.sucesores, modelo.probabilidades, estados)
+        if sucesores is modelo.sucesores:
+            modelo.muestreador.actualiza(sucesores, probabilidades, estados)
+        else:
+            modelo.muestreador = MuestreadorSucesores(sucesores, probabilidades, modelo.uniformes)
+        modelo.sucesores, modelo.probabilidades = sucesores, probabilidades
+
+    recompensas = np.asarray(modelo.recompensas)
+    modelo.terminales = recompensas.sum(axis=1) == 0
+    anterior = modelo.distribucion_inicial
+    modelo.distribucion_inicial = DistribucionInicial(modelo.terminales, anterior.inicio, anterior.generador)
+
+    q = modelo.tabla_q
+    estados = estados[~modelo.terminales[estados]]
+    if modelo.sucesores is not None and len(estados) > 0:
+        valores = q.max(axis=1)
+        valores[modelo.terminales] = 0.0
+        esperado = (modelo.probabilidades[:, estados] * valores[modelo.sucesores[:, estados]]).sum(axis=2)
+        q[estados] = recompensas[estados] + modelo.factor_descuento * esperado.T
+    if hasattr(modelo, 'visitas'):
+        # en Monte Carlo los retornos acumulados de estos estados ya no valen
+        modelo.racum[estados] = 0.0
+        modelo.visitas[estados] = 0
+        modelo.politica[estados] = np.argmax(q[estados], axis=1)
+
+def politica_greedy(modelo):
+    """
+    Devuelve un array con el indice de la accion de cada estado en la politica actual de un modelo:
+    la politica guardada si el modelo la tiene (Monte Carlo) y si no la accion de mayor valor en su tabla Q.
+
+    Parametros
+    ----------
+
+    modelo : Objeto
+        Algoritmo con un atributo tabla_q y, opcionalmente, un array politica.
+    """
+    politica = getattr(modelo, 'politica', None)
+    if isinstance(politica, np.ndarray):
+        return politica.copy()
+    return np.argmax(modelo.tabla_q, axis=1)
+
+def nombres_acciones(transiciones):
+    """
+    Devuelve los nombres de las acciones de unas transiciones: los que guardan las TransicionesDispersas y el
+    ModeloGenerativo construidos por Problem o, si no los tienen, los de las acciones en 8 o en 4 direcciones
+    según el numero de acciones
+
+    Parametros
+    ----------
+
+    transiciones : Array, TransicionesDispersas o ModeloGenerativo
+        Matriz de transiciones
+    """
+    nombres = getattr(transiciones, 'acciones', None)
+    if nombres is not None:
+        return list(nombres)
+    acciones = len(transiciones)
+    assert acciones in (len(ACCIONES), len(ACCIONES_4)), "No se conocen los nombres de las acciones de estas transiciones"
+    return ACCIONES if acciones == len(ACCIONES) else ACCIONES_4
+
 def politica_procesable(politica,acciones):
     """
     Comprueba si la politica es procesable
@@ -40,7 +559,28 @@ def politica_procesable(politica,acciones):
     else:
         return [acciones[i] for i in politica]
     
-def obtener_politica_final(politica):
+def indices_politica(politica, acciones):
+    """
+    Convierte una politica en un array con el indice de la accion de cada estado
+
+    Parametros
+    ----------
+
+    politica : List, Dict o Array
+        Politica como lista de nombres de acciones (por ejemplo Problem.politica), como diccionario
+        estado -> indice de accion (por ejemplo el de obtener_politica_final()) o como array de indices.
+
+    acciones : List
+        Lista con los nombres de las acciones posibles
+    """
+    if isinstance(politica, dict):
+        politica = [politica[s] for s in range(len(politica))]
+    politica = list(politica)
+    if len(politica) > 0 and isinstance(politica[0], str):
+        politica = [acciones.index(a) for a in politica]
+    return np.array(politica, dtype=np.int64)
+
+def obtener_politica_final(politica, acciones=None):
     """
     Obtiene la politica final
 
@@ -49,9 +589,12 @@ def obtener_politica_final(politica):
 
     politica : Array
         Array con la politica
+
+    acciones : List
+        Lista con los nombres de las acciones posibles. Por defecto son las acciones en 8 direcciones
     """
     
-    indices_nav_acciones = {'esperar': 0, 'N': 1, 'NE': 2, 'E': 3, 'SE': 4, 'S': 5, 'SO': 6, 'O': 7, 'NO': 8}
+    indices_nav_acciones = {a: i for i, a in enumerate(ACCIONES if acciones is None else acciones)}
     politica_greedy_indices = [indices_nav_acciones[a] for a in politica]
     politica = enumerate(politica_greedy_indices)
     politica_final = [(i, a) for i,a in politica]
@@ -0,0 +1,277 @@
+"""
+Ejecución en paralelo de barridos de hiperparámetros.
+
+Cada configuración del barrido es una combinación de (mapa, prob_error, algoritmo, hiperparámetros, semilla). Los problemas
+se construyen una sola vez en el proceso principal y sus arrays (transiciones en formato disperso, recompensas y política
+óptima de referencia) se comparten con los procesos de trabajo mediante memoria compartida, en lugar de enviarse con cada tarea.
+
+Uso desde la línea de comandos:
+
+    python -m AprendizajeRefuerzUS.barrido --mapas map1.txt map2.txt --prob-error 0.2 --algoritmos sarsa montecarlo_primera_visita \\
+        --param epsilon=0.1,0.5,0.9 --param factor_aprendizaje=0.2,0.8 --semillas 0 1 2 --procesos 4 --salida resultados.csv
+"""
+
+import argparse
+import ast
+import csv
+import functools
+import inspect
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.problem_utils import TransicionesDispersas
+from AprendizajeRefuerzUS.algorithms.sarsa import SARSA
+from AprendizajeRefuerzUS.algorithms.Montecarlo import MonteCarlo
+from AprendizajeRefuerzUS.algorithms.Q_Learning import Q_Learning
+from AprendizajeRefuerzUS.algorithms.trazas import SARSALambda, QLambda
+from AprendizajeRefuerzUS.algorithms.dyna import DynaQ
+from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValor, IteracionPolitica, evalua_politica
+from AprendizajeRefuerzUS.algorithms.util import nombres_acciones
+
+
+# nombre del algoritmo -> (clase, método de entrenamiento); Q-Learning usa el motor nativo, que admite transiciones dispersas y semillas
+ALGORITMOS = {
+    'sarsa': (SARSA, 'entrenar'),
+    'sarsa_vectorizado': (SARSA, 'entrenar_vectorizado'),
+    'montecarlo_primera_visita': (MonteCarlo, 'entrenar_primera_visita'),
+    'montecarlo_cada_visita': (MonteCarlo, 'entrenar_cada_visita'),
+    'q_learning': (functools.partial(Q_Learning, motor='nativo'), 'entrenar'),
+    'sarsa_lambda': (SARSALambda, 'entrenar'),
+    'q_lambda': (QLambda, 'entrenar'),
+    'dyna_q': (DynaQ, 'entrenar'),
+    'iteracion_valor': (IteracionValor, 'entrenar'),
+    'iteracion_politica': (IteracionPolitica, 'entrenar'),
+}
+
+# las métricas de calidad (acierto y valor medio de la política) se calculan siempre con este descuento,
+# el valor por defecto de todos los algoritmos, para que sean comparables entre configuraciones
+FACTOR_DESCUENTO_REFERENCIA = 0.9
+
+_COMPARTIDOS = {}
+
+
+def ruta_mapa(mapa):
+    """
+    Devuelve la ruta de un mapa. Si no existe como fichero, se busca entre los mapas incluidos en la biblioteca.
+
+    Parámetros:
+    -----------
+    mapa: String
+        Ruta o nombre del mapa (por ejemplo 'map1.txt').
+    """
+
+    if os.path.exists(mapa):
+        return mapa
+    return os.path.join(os.path.dirname(__file__), 'maps', mapa)
+
+
+def genera_configuraciones(mapas, prob_errores, algoritmos, hiperparametros=None, semillas=(0,)):
+    """
+    Genera todas las combinaciones de un barrido. Cada algoritmo recibe solo los hiperparámetros que acepta su constructor,
+    y las combinaciones repetidas al descartar hiperparámetros se eliminan.
+
+    Parámetros:
+    -----------
+    mapas: List
+        Mapas del barrido.
+
+    prob_errores: List
+        Probabilidades de error del barrido.
+
+    algoritmos: List
+        Nombres de los algoritmos, claves de ALGORITMOS.
+
+    hiperparametros: Dict
+        Diccionario nombre -> lista de valores.
+
+    semillas: List
+        Semillas de cada repetición.
+    """
+
+    hiperparametros = hiperparametros or {}
+    configuraciones = []
+    vistas = set()
+    for mapa, prob_error, algoritmo, semilla in itertools.product(mapas, prob_errores, algoritmos, semillas):
+        assert algoritmo in ALGORITMOS, f"Algoritmo desconocido: {algoritmo}"
+        aceptados = inspect.signature(ALGORITMOS[algoritmo][0]).parameters
+        nombres = [n for n in hiperparametros if n in aceptados]
+        for valores in itertools.product(*(hiperparametros[n] for n in nombres)):
+            parametros = dict(zip(nombres, valores))
+            clave = (mapa, prob_error, algoritmo, semilla, tuple(sorted(parametros.items())))
+            if clave not in vistas:
+                vistas.add(clave)
+                configuraciones.append({'mapa': mapa, 'prob_error': prob_error, 'algoritmo': algoritmo,
+                                        'semilla': semilla, 'hiperparametros': parametros})
+    return configuraciones
+
+
+def _comparte(arrays):
+    # copia cada array en un bloque de memoria compartida y devuelve los bloques y su descripción
+    bloques, descripcion = [], {}
+    for nombre, array in arrays.items():
+        bloque = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=bloque.buf)[...] = array
+        bloques.append(bloque)
+        descripcion[nombre] = (bloque.name, array.shape, array.dtype.str)
+    return bloques, descripcion
+
+
+def _inicializa_proceso(descripciones):
+    # se ejecuta una vez en cada proceso de trabajo: se conecta a la memoria compartida sin copiar los arrays
+    for clave, descripcion in descripciones.items():
+        arrays, bloques = {}, []
+        for nombre, (bloque, forma, tipo) in descripcion.items():
+            bloque = shared_memory.SharedMemory(name=bloque)
+            bloques.append(bloque)
+            arrays[nombre] = np.ndarray(forma, dtype=np.dtype(tipo), buffer=bloque.buf)
+        _COMPARTIDOS[clave] = (arrays, bloques)
+
+
+def ejecuta_configuracion(configuracion):
+    """
+    Entrena un algoritmo con una configuración del barrido usando el problema compartido por el proceso principal
+    y devuelve una fila de resultados: tiempo de entrenamiento, política, porcentaje de estados libres en los que
+    coincide con la política óptima (acierto) y valor medio de la política frente al óptimo.
+
+    Parámetros:
+    -----------
+    configuracion: Dict
+        Configuración generada por genera_configuraciones(), con los nombres de las acciones del problema ('acciones')
+        que añade ejecuta_barrido().
+    """
+
+    arrays, _ = _COMPARTIDOS[(configuracion['mapa'], configuracion['prob_error'])]
+    transiciones = TransicionesDispersas(arrays['sucesores'], arrays['probabilidades'], configuracion['acciones'])
+    recompensas = arrays['recompensas']
+
+    clase, metodo = ALGORITMOS[configuracion['algoritmo']]
+    parametros = dict(configuracion['hiperparametros'])
+    if 'semilla' in inspect.signature(clase).parameters:
+        parametros['semilla'] = configuracion['semilla']
+
+    inicio = time.perf_counter()
+    modelo = clase(transiciones, recompensas, **parametros)
+    getattr(modelo, metodo)()
+    tiempo = time.perf_counter() - inicio
+
+    acciones = nombres_acciones(transiciones)
+    politica = modelo.obtener_politica()
+    indices = np.array([acciones.index(a) for a in politica])
+    optima = arrays['politica_optima']
+    libres = arrays['libres']
+    valores = evalua_politica(indices, recompensas, transiciones.sucesores, transiciones.probabilidades, FACTOR_DESCUENTO_REFERENCIA)
+
+    fila = {'mapa': configuracion['mapa'], 'prob_error': configuracion['prob_error'], 'algoritmo': configuracion['algoritmo'],
+            'semilla': configuracion['semilla']}
+    fila.update(configuracion['hiperparametros'])
+    fila.update({'tiempo_entrenamiento': tiempo,
+                 'acierto': float(np.mean(indices[libres] == optima[libres])),
+                 'valor_medio': float(np.mean(valores[libres])),
+                 'valor_optimo': float(np.mean(arrays['valores_optimos'][libres])),
+                 'politica': ' '.join(politica)})
+    return fila
+
+
+def ejecuta_barrido(configuraciones, procesos=None):
+    """
+    Ejecuta todas las configuraciones de un barrido repartiéndolas entre varios procesos y devuelve una tabla
+    (lista de diccionarios) con una fila por configuración, en el mismo orden.
+
+    Parámetros:
+    -----------
+    configuraciones: List
+        Configuraciones generadas por genera_configuraciones().
+
+    procesos: int
+        Número de procesos de trabajo. Por defecto, el número de CPUs.
+    """
+
+    bloques, descripciones, construccion, acciones = [], {}, {}, {}
+    try:
+        for clave in dict.fromkeys((c['mapa'], c['prob_error']) for c in configuraciones):
+            inicio = time.perf_counter()
+            problema = Problem(ruta_mapa(clave[0]), clave[1], dispersa=True)
+            construccion[clave] = time.perf_counter() - inicio
+            acciones[clave] = list(problema.acciones)
+            referencia = IteracionValor(problema.transiciones, problema.recompensas, FACTOR_DESCUENTO_REFERENCIA)
+            referencia.entrenar()
+            nuevos, descripciones[clave] = _comparte({
+                'sucesores': problema.transiciones.sucesores,
+                'probabilidades': problema.transiciones.probabilidades,
+                'recompensas': np.asarray(problema.recompensas, dtype=np.float64),
+                'politica_optima': referencia.politica,
+                'valores_optimos': referencia.valores,
+                'libres': (problema.mapa.T.ravel() == 0) & (problema.recompensas.sum(axis=1) != 0),
+            })
+            bloques.extend(nuevos)
+
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializa_proceso, initargs=(descripciones,)) as ejecutor:
+            # los procesos reconstruyen las transiciones a partir de la memoria compartida, que no guarda los nombres de las acciones
+            configuraciones = [dict(c, acciones=acciones[(c['mapa'], c['prob_error'])]) for c in configuraciones]
+            resultados = list(ejecutor.map(ejecuta_configuracion, configuraciones))
+    finally:
+        for bloque in bloques:
+            bloque.close()
+            bloque.unlink()
+
+    for fila in resultados:
+        fila['tiempo_construccion'] = construccion[(fila['mapa'], fila['prob_error'])]
+    return resultados
+
+
+def guarda_resultados(resultados, fichero):
+    """
+    Guarda la tabla de resultados de un barrido en CSV o, si el fichero termina en .json, en JSON.
+
+    Parámetros:
+    -----------
+    resultados: List
+        Tabla devuelta por ejecuta_barrido().
+
+    fichero: String
+        Ruta del fichero de salida.
+    """
+
+    if fichero.endswith('.json'):
+        with open(fichero, 'w') as salida:
+            json.dump(resultados, salida, indent=2)
+        return
+    columnas = list(dict.fromkeys(c for fila in resultados for c in fila))
+    with open(fichero, 'w', newline='') as salida:
+        escritor = csv.DictWriter(salida, fieldnames=columnas)
+        escritor.writeheader()
+        escritor.writerows(resultados)
+
+
+def _lee_parametro(texto):
+    nombre, valores = texto.split('=', 1)
+    return nombre, [ast.literal_eval(v) for v in valores.split(',')]
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Barrido de hiperparámetros en paralelo.')
+    parser.add_argument('--mapas', nargs='+', default=['map1.txt'])
+    parser.add_argument('--prob-error', nargs='+', type=float, default=[0.2])
+    parser.add_argument('--algoritmos', nargs='+', default=['sarsa'], choices=sorted(ALGORITMOS))
+    parser.add_argument('--param', action='append', default=[], type=_lee_parametro,
+                        help="Hiperparámetro y sus valores separados por comas, por ejemplo epsilon=0.1,0.5")
+    parser.add_argument('--semillas', nargs='+', type=int, default=[0])
+    parser.add_argument('--procesos', type=int, default=None)
+    parser.add_argument('--salida', default='resultados_barrido.csv')
+    args = parser.parse_args(argumentos)
+
+    configuraciones = genera_configuraciones(args.mapas, args.prob_error, args.algoritmos, dict(args.param), args.semillas)
+    resultados = ejecuta_barrido(configuraciones, args.procesos)
+    guarda_resultados(resultados, args.salida)
+    print(f"{len(resultados)} configuraciones guardadas en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
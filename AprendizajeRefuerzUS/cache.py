@@ -0,0 +1,154 @@
+"""
+Caché en disco de los problemas ya construidos.
+
+Cada problema se identifica con un hash del contenido del fichero del mapa, la probabilidad de error, la lista de acciones,
+el formato de las transiciones, si el espacio de estados es compacto y la versión de la biblioteca. Los arrays del problema
+se guardan como ficheros .npy en un directorio por problema y se cargan con memoria mapeada, de forma que solo se leen de
+disco las partes que se usan.
+Cuando la caché supera su tamaño máximo se eliminan los problemas usados hace más tiempo (LRU).
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import AprendizajeRefuerzUS
+
+
+DIRECTORIO_POR_DEFECTO = os.environ.get('APRENDIZAJEREFUERZUS_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'AprendizajeRefuerzUS'))
+
+
+class CacheProblemas:
+
+    """
+    Caché en disco de los arrays de un problema.
+
+    Parámetros:
+    -----------
+    directorio: String
+        Directorio donde se guarda la caché. Por defecto ~/.cache/AprendizajeRefuerzUS o la variable de entorno
+        APRENDIZAJEREFUERZUS_CACHE.
+
+    tamano_maximo: int
+        Tamaño máximo de la caché en bytes. Por defecto 1 GiB.
+
+    Métodos:
+    -----------
+    clave(fichero, prob_error, acciones, dispersa, compacto=False) -> String
+        Calcula la clave de un problema a partir del contenido del mapa y de sus parámetros.
+
+    carga(clave) -> Dict
+        Devuelve los arrays guardados con esa clave, con memoria mapeada, o None si no están en la caché (también si otro
+        proceso la elimina mientras se carga).
+
+    guarda(clave, arrays) -> None
+        Guarda un diccionario de arrays con esa clave y elimina los problemas más antiguos si se supera el tamaño máximo.
+
+    tamano() -> int
+        Tamaño total de la caché en bytes.
+
+    vacia() -> None
+        Elimina todos los problemas de la caché.
+    """
+
+    def __init__(self, directorio=None, tamano_maximo=2**30):
+        self.directorio = DIRECTORIO_POR_DEFECTO if directorio is None else directorio
+        self.tamano_maximo = tamano_maximo
+        assert self.tamano_maximo > 0, "El tamaño máximo de la caché debe ser positivo"
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def clave(self, fichero, prob_error, acciones, dispersa, compacto=False):
+        resumen = hashlib.sha256()
+        with open(fichero, 'rb') as mapa:
+            resumen.update(mapa.read())
+        resumen.update(repr((float(prob_error), list(acciones), bool(dispersa), bool(compacto), AprendizajeRefuerzUS.__version__)).encode())
+        return resumen.hexdigest()
+
+    def carga(self, clave):
+        ruta = os.path.join(self.directorio, clave)
+        if not os.path.isdir(ruta):
+            return None
+        # otro proceso puede eliminar el problema entre la comprobación y la carga: entonces es un fallo de la caché
+        try:
+            os.utime(ruta)  # marca el problema como usado recientemente
+            return {nombre[:-4]: np.load(os.path.join(ruta, nombre), mmap_mode='r')
+                    for nombre in os.listdir(ruta) if nombre.endswith('.npy')}
+        except OSError:
+            return None
+
+    def guarda(self, clave, arrays):
+        ruta = os.path.join(self.directorio, clave)
+        if os.path.isdir(ruta):
+            return
+        # se escribe en un directorio temporal y se renombra, para que otro proceso nunca vea un problema a medias
+        temporal = tempfile.mkdtemp(dir=self.directorio, prefix='.tmp-')
+        try:
+            for nombre, array in arrays.items():
+                np.save(os.path.join(temporal, nombre + '.npy'), np.asarray(array))
+            os.rename(temporal, ruta)
+        except OSError:
+            shutil.rmtree(temporal, ignore_errors=True)
+            if not os.path.isdir(ruta):
+                raise
+        self.libera_espacio()
+
+    def entradas(self):
+        # (última vez usado, tamaño, ruta) de cada problema de la caché
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            if nombre.startswith('.') or not os.path.isdir(ruta):
+                continue
+            try:
+                tamano = sum(os.path.getsize(os.path.join(ruta, f)) for f in os.listdir(ruta))
+                entradas.append((os.path.getmtime(ruta), tamano, ruta))
+            except OSError:
+                continue  # lo ha eliminado otro proceso
+        return sorted(entradas)
+
+    def tamano(self):
+        return sum(tamano for _, tamano, _ in self.entradas())
+
+    def libera_espacio(self):
+        entradas = self.entradas()
+        total = sum(tamano for _, tamano, _ in entradas)
+        # siempre se conserva el problema más reciente, aunque por sí solo supere el tamaño máximo
+        for _, tamano, ruta in entradas[:-1]:
+            if total <= self.tamano_maximo:
+                break
+            self.elimina(ruta)
+            total -= tamano
+
+    def elimina(self, ruta):
+        # se renombra antes de borrar, para que otro proceso vea el problema completo o no lo vea, nunca a medio borrar
+        temporal = os.path.join(self.directorio, '.borrar-' + os.path.basename(ruta) + '-' + os.urandom(4).hex())
+        try:
+            os.rename(ruta, temporal)
+        except OSError:
+            return  # ya lo ha eliminado otro proceso
+        shutil.rmtree(temporal, ignore_errors=True)
+
+    def vacia(self):
+        for _, _, ruta in self.entradas():
+            self.elimina(ruta)
+
+
+def obtiene_cache(cache):
+    """
+    Devuelve la caché a usar a partir del parámetro cache de Problem: True para la caché por defecto, una ruta
+    para una caché en ese directorio o directamente un objeto CacheProblemas.
+
+    Parámetros:
+    -----------
+    cache: bool, String o CacheProblemas
+        Caché a usar.
+    """
+
+    if isinstance(cache, CacheProblemas):
+        return cache
+    if cache is True:
+        return CacheProblemas()
+    return CacheProblemas(cache)
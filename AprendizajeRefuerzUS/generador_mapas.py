@@ -0,0 +1,241 @@
+"""
+Generación procedural de mapas grandes para pruebas de escalado.
+
+Hay tres tipos de mapa, todos con un borde de obstáculos y reproducibles a partir de una semilla:
+
+    - aleatorio: obstáculos independientes en cada celda con una densidad dada.
+    - laberinto: laberinto perfecto generado con búsqueda en profundidad aleatoria, al que se le pueden abrir
+      huecos extra en las paredes para que haya varios caminos.
+    - habitaciones: habitaciones rectangulares unidas por pasillos en L, como la planta de un almacén.
+
+Los mapas se guardan con problem_utils.guarda_mapa(), en el formato de texto de siempre o, si el fichero termina
+en .mapa, en formato binario, que lee_mapa() carga con memoria mapeada.
+
+Uso desde la línea de comandos:
+
+    python -m AprendizajeRefuerzUS.generador_mapas --tipo laberinto --alto 1001 --ancho 1001 --semilla 0 --salida almacen.mapa
+"""
+
+import argparse
+
+import numpy as np
+
+from AprendizajeRefuerzUS.problem_utils import guarda_mapa
+from AprendizajeRefuerzUS.algorithms.util import FlujoUniformes
+
+
+def mapa_aleatorio(alto, ancho, densidad=0.2, semilla=None):
+    """
+    Genera un mapa con obstáculos aleatorios independientes. Puede haber zonas libres aisladas del resto.
+
+    Parámetros:
+    -----------
+    alto: int
+        Número de filas del mapa.
+
+    ancho: int
+        Número de columnas del mapa.
+
+    densidad: float
+        Probabilidad de que cada celda interior sea un obstáculo. Por defecto es 0.2.
+
+    semilla: int o Generator
+        Semilla o generador de números aleatorios de NumPy.
+    """
+
+    assert 0.0 <= densidad < 1.0, "La densidad debe estar entre 0 y 1"
+    generador = np.random.default_rng(semilla)
+    mapa = (generador.random((alto, ancho)) < densidad).astype(np.uint8)
+    mapa[0, :] = mapa[-1, :] = mapa[:, 0] = mapa[:, -1] = 1
+    return mapa
+
+
+def mapa_laberinto(alto, ancho, aberturas=0.0, semilla=None):
+    """
+    Genera un laberinto con búsqueda en profundidad aleatoria. Las celdas del laberinto son las de fila y columna
+    impares y las paredes entre ellas se van abriendo, de forma que todas las celdas libres quedan conectadas.
+
+    Parámetros:
+    -----------
+    alto: int
+        Número de filas del mapa (si es par, la última fila queda como obstáculo).
+
+    ancho: int
+        Número de columnas del mapa (si es par, la última columna queda como obstáculo).
+
+    aberturas: float
+        Fracción de las paredes interiores restantes que se abren al final para crear ciclos. Por defecto es 0,
+        un laberinto perfecto con un único camino entre cada par de celdas.
+
+    semilla: int o Generator
+        Semilla o generador de números aleatorios de NumPy.
+    """
+
+    assert alto >= 3 and ancho >= 3, "El laberinto debe tener al menos 3 filas y 3 columnas"
+    generador = np.random.default_rng(semilla)
+    uniforme = FlujoUniformes(generador).random
+    filas, columnas = (alto - 1) // 2, (ancho - 1) // 2
+    mapa = np.ones((alto, ancho), dtype=np.uint8)
+    mapa[1:2*filas:2, 1:2*columnas:2] = 0
+
+    # paredes abiertas entre cada celda y su vecina de la derecha y de arriba
+    derecha = np.zeros((filas, columnas), dtype=bool)
+    arriba = np.zeros((filas, columnas), dtype=bool)
+    visitado = bytearray(filas*columnas)
+    visitado[0] = 1
+    pila = [0]
+    while pila:
+        celda = pila[-1]
+        i, j = divmod(celda, columnas)
+        vecinos = []
+        if j + 1 < columnas and not visitado[celda + 1]:
+            vecinos.append(celda + 1)
+        if j > 0 and not visitado[celda - 1]:
+            vecinos.append(celda - 1)
+        if i + 1 < filas and not visitado[celda + columnas]:
+            vecinos.append(celda + columnas)
+        if i > 0 and not visitado[celda - columnas]:
+            vecinos.append(celda - columnas)
+        if not vecinos:
+            pila.pop()
+            continue
+        vecino = vecinos[int(uniforme()*len(vecinos))]
+        visitado[vecino] = 1
+        pila.append(vecino)
+        if vecino == celda + 1:
+            derecha[i, j] = True
+        elif vecino == celda - 1:
+            derecha[i, j - 1] = True
+        elif vecino == celda + columnas:
+            arriba[i, j] = True
+        else:
+            arriba[i - 1, j] = True
+
+    if aberturas > 0:
+        derecha[:, :-1] |= generador.random((filas, columnas - 1)) < aberturas
+        arriba[:-1, :] |= generador.random((filas - 1, columnas)) < aberturas
+    mapa[1:2*filas:2, 2:2*columnas:2][derecha[:, :-1]] = 0
+    mapa[2:2*filas:2, 1:2*columnas:2][arriba[:-1, :]] = 0
+    return mapa
+
+
+def mapa_habitaciones(alto, ancho, habitaciones=10, tamano_minimo=3, tamano_maximo=10, semilla=None):
+    """
+    Genera un mapa de habitaciones rectangulares unidas por pasillos. Cada habitación se une con la siguiente
+    mediante un pasillo en L, de forma que todas quedan conectadas.
+
+    Parámetros:
+    -----------
+    alto: int
+        Número de filas del mapa.
+
+    ancho: int
+        Número de columnas del mapa.
+
+    habitaciones: int
+        Número de habitaciones. Por defecto es 10.
+
+    tamano_minimo: int
+        Tamaño mínimo del lado de una habitación. Por defecto es 3.
+
+    tamano_maximo: int
+        Tamaño máximo del lado de una habitación. Por defecto es 10.
+
+    semilla: int o Generator
+        Semilla o generador de números aleatorios de NumPy.
+    """
+
+    assert habitaciones > 0, "Debe haber al menos una habitación"
+    assert 1 <= tamano_minimo <= tamano_maximo, "Los tamaños de las habitaciones no son válidos"
+    assert alto >= 3 and ancho >= 3, "El mapa debe tener al menos 3 filas y 3 columnas"
+    generador = np.random.default_rng(semilla)
+    mapa = np.ones((alto, ancho), dtype=np.uint8)
+    lados = generador.integers(tamano_minimo, tamano_maximo + 1, size=(habitaciones, 2))
+    lados = np.minimum(lados, [alto - 2, ancho - 2])
+    y0 = 1 + (generador.random(habitaciones) * (alto - 1 - lados[:, 0])).astype(int)
+    x0 = 1 + (generador.random(habitaciones) * (ancho - 1 - lados[:, 1])).astype(int)
+    centros = np.stack([y0 + lados[:, 0] // 2, x0 + lados[:, 1] // 2], axis=1)
+    for n in range(habitaciones):
+        mapa[y0[n]:y0[n] + lados[n, 0], x0[n]:x0[n] + lados[n, 1]] = 0
+        if n > 0:
+            (ya, xa), (yb, xb) = centros[n - 1], centros[n]
+            mapa[ya, min(xa, xb):max(xa, xb) + 1] = 0
+            mapa[min(ya, yb):max(ya, yb) + 1, xb] = 0
+    return mapa
+
+
+TIPOS = {
+    'aleatorio': mapa_aleatorio,
+    'laberinto': mapa_laberinto,
+    'habitaciones': mapa_habitaciones,
+}
+
+
+def elige_destino(mapa, semilla=None):
+    """
+    Elige al azar una celda libre del mapa como destino y devuelve sus coordenadas (x, y).
+
+    Parámetros:
+    -----------
+    mapa: Array
+        Matriz que representa el mapa.
+
+    semilla: int o Generator
+        Semilla o generador de números aleatorios de NumPy.
+    """
+
+    libres = np.flatnonzero(np.asarray(mapa).ravel() == 0)
+    assert len(libres) > 0, "El mapa no tiene celdas libres"
+    y, x = divmod(int(libres[np.random.default_rng(semilla).integers(len(libres))]), mapa.shape[1])
+    return x, y
+
+
+def genera_mapa(tipo, alto, ancho, semilla=None, **opciones):
+    """
+    Genera un mapa del tipo indicado y elige su destino. Devuelve el mapa, con la fila 0 abajo como en lee_mapa(),
+    y el destino. Con la misma semilla se obtiene siempre el mismo mapa y el mismo destino.
+
+    Parámetros:
+    -----------
+    tipo: String
+        Tipo de mapa: 'aleatorio', 'laberinto' o 'habitaciones'.
+
+    alto: int
+        Número de filas del mapa.
+
+    ancho: int
+        Número de columnas del mapa.
+
+    semilla: int
+        Semilla de los números aleatorios.
+
+    opciones: Dict
+        Parámetros propios del tipo de mapa (densidad, aberturas, habitaciones, ...).
+    """
+
+    assert tipo in TIPOS, f"Tipo de mapa desconocido: {tipo}"
+    generador = np.random.default_rng(semilla)
+    mapa = TIPOS[tipo](alto, ancho, semilla=generador, **opciones)
+    return mapa, elige_destino(mapa, generador)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Genera un mapa procedural y lo guarda en texto o en binario (.mapa).')
+    parser.add_argument('--tipo', choices=sorted(TIPOS), default='aleatorio')
+    parser.add_argument('--alto', type=int, required=True)
+    parser.add_argument('--ancho', type=int, required=True)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--densidad', type=float, default=None, help="Densidad de obstáculos (aleatorio)")
+    parser.add_argument('--aberturas', type=float, default=None, help="Fracción de paredes abiertas (laberinto)")
+    parser.add_argument('--habitaciones', type=int, default=None, help="Número de habitaciones (habitaciones)")
+    parser.add_argument('--salida', required=True)
+    args = parser.parse_args(argumentos)
+
+    opciones = {nombre: getattr(args, nombre) for nombre in ('densidad', 'aberturas', 'habitaciones') if getattr(args, nombre) is not None}
+    mapa, destino = genera_mapa(args.tipo, args.alto, args.ancho, args.semilla, **opciones)
+    guarda_mapa(args.salida, mapa, destino)
+    print(f"Mapa {args.tipo} de {args.alto}x{args.ancho} con destino {destino} guardado en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
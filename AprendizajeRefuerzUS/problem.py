@@ -1,5 +1,7 @@
+import copy
 import numpy as np
 import AprendizajeRefuerzUS.problem_utils as problem_utils
+from AprendizajeRefuerzUS.cache import obtiene_cache
 import matplotlib.pyplot as plt
 
 class Problem:
@@ -16,26 +18,66 @@ class Problem:
     prob_error: float
         Probabilidad de error en el movimiento.
 
+    dispersa: bool
+        Si es True, las transiciones se guardan en formato disperso (TransicionesDispersas) en lugar de
+        como una matriz densa de acciones x estados x estados. Por defecto es False.
+
+    cache: bool, String o CacheProblemas
+        Caché en disco de problemas ya construidos. Si se indica (True para la caché por defecto, una ruta o un objeto
+        CacheProblemas), el mapa, las recompensas, las transiciones y la política se cargan de la caché con memoria mapeada
+        si ya se construyó antes el mismo problema, y si no se construyen y se guardan en ella. Por defecto es None (sin caché).
+
+    conectividad: int
+        Movimientos en 8 direcciones (por defecto) o en 4 direcciones (esperar, N, E, S y O).
+
+    deslizamiento: Dict o Array
+        Distribución de los movimientos que se producen por error, en cualquiera de los formatos de ModeloAcciones
+        (por ejemplo {'N': {'NE': 0.8, 'NO': 0.2}}). Por defecto, con 8 direcciones se desliza a una de las dos direcciones
+        a 45 grados y con 4 a una de las dos perpendiculares, con la misma probabilidad.
+
+    compacto: bool
+        Si es True, los estados son solo las celdas libres del mapa más un estado sumidero, el último, que agrupa todos los
+        obstáculos (son absorbentes y tienen la misma recompensa). Las transiciones, las recompensas, la política y las tablas
+        de los algoritmos son más pequeñas en la misma proporción que los obstáculos del mapa. Por defecto es False.
+
+    semilla: int
+        Semilla del generador de números aleatorios propio del modelo generativo, que usa paso(). Por defecto es None
+        (semilla aleatoria).
+
     Atributos:
     -----------
 
     acciones: List
-        Lista de acciones.
+        Lista con los nombres de las acciones.
+
+    modelo_acciones: ModeloAcciones
+        Modelo de las acciones (desplazamientos y tabla de errores indexados por el índice de cada acción).
+
+    familia: ProblemaMultidestino
+        Familia a la que pertenece el problema si se obtuvo con ProblemaMultidestino.problema(), None si no.
+
+    libres: Array
+        En un problema compacto, índice de la celda (x*alto + y) de cada estado libre. None si no es compacto.
+
+    compactos: Array
+        En un problema compacto, índice del estado de cada celda (el del sumidero para los obstáculos). None si no es compacto.
     
     destino: Tuple
         Coordenadas del destino.
     
     estados: List
-        Lista de estados.
+        Lista de estados, con las coordenadas de cada celda y el mismo orden que las filas de las recompensas. En un problema
+        compacto son las celdas libres y, al final, None para el estado sumidero. Se genera la primera vez que se usa.
  
     politica: Dict
-        Política óptima.
+        Política óptima. Se calcula la primera vez que se usa.
 
     recompensas: Array
-        Matriz de recompensas.
+        Matriz de recompensas. Se calcula la primera vez que se usa.
     
-    transiciones: Array
-        Matriz de probabilidades de transición.
+    transiciones: Array o TransicionesDispersas
+        Matriz de probabilidades de transición. Se construye la primera vez que se usa, de forma que un problema
+        que solo se entrena con modelo_generativo() nunca llega a construirla.
     
     Métodos:
     -----------
@@ -44,7 +86,8 @@ class Problem:
         Muestra el mapa del problema a partir de un mapa y un destino.
     
     crea_recompensas_sistema()
-        Crea una matriz de recompensas para un sistema a partir de una lista de estados, un destino, un mapa y una lista de acciones.
+        Crea una matriz de recompensas para un sistema a partir de un destino, un mapa y una lista de acciones.
+        Se calcula sobre todo el mapa a la vez con operaciones de NumPy.
     
     crea_transiciones_sistema(prob_error)
         Crea una matriz de transiciones para un sistema a partir de una probabilidad de error.
@@ -53,7 +96,27 @@ class Problem:
             - Una probabilidad de error
             - Una lista de estados
             - Un mapa.
+        Los sucesores de todos los estados se calculan a la vez con operaciones de NumPy.
+        Si el problema es disperso, se devuelve un objeto TransicionesDispersas.
     
+    modelo_generativo() -> ModeloGenerativo
+        Devuelve un modelo generativo de las transiciones, que calcula el siguiente estado en el momento a partir del mapa
+        sin construir la matriz de transiciones. Se puede pasar a SARSA, MonteCarlo y Q_Learning en lugar de las transiciones.
+
+    paso(estado, accion) -> Tuple
+        Simula un paso desde un estado (índice) con una acción (índice o nombre) y devuelve (siguiente_estado, recompensa),
+        sin construir las matrices de transiciones ni de recompensas. Los pasos de dos problemas con la misma semilla son iguales.
+
+    es_terminal(estado) -> bool
+        Indica si un estado (índice) es el destino.
+
+    cambia_celdas(celdas, valores) -> Array
+        Cambia algunas celdas del mapa (por defecto, las convierte de libres en obstáculos y al revés) y actualiza solo las
+        filas afectadas de las recompensas y las transiciones ya construidas: las de esas celdas y las de las celdas desde
+        las que se llega a ellas (su vecindario 3x3). Devuelve los índices de esos estados, para pasárselos a
+        IteracionValor.repara() o a algorithms.util.actualiza_modelo(). No se puede usar en problemas compactos ni en los
+        de una familia de ProblemaMultidestino, que comparten el mapa y las transiciones.
+
     actualiza_politica(politica)
         Actualiza la política del problema.
     
@@ -62,40 +125,297 @@ class Problem:
 
 
     """
-    def __init__(self, mapa, prob_error):
+    def __init__(self, mapa, prob_error, dispersa=False, cache=None, conectividad=8, deslizamiento=None, compacto=False, semilla=None):
         self.mapa = mapa
         self.prob_error = prob_error
+        self.dispersa = dispersa
+        self.compacto = compacto
+        self.semilla = semilla
+        self.modelo_acciones = problem_utils.crea_modelo_acciones(conectividad, deslizamiento)
+        self.acciones = self.modelo_acciones.nombres
+
+        self._estados = None
+        self._recompensas = None
+        self._transiciones = None
+        self._politica = None
+        self._modelo_generativo = None
+        self.familia = None
+
+        datos = None
+        if cache is not None and cache is not False:
+            cache = obtiene_cache(cache)
+            clave = cache.clave(mapa, prob_error, self.modelo_acciones.firma(), dispersa, compacto)
+            datos = cache.carga(clave)
+
+        if datos is not None:
+            self.mapa, self.destino = datos['mapa'], tuple(datos['destino'].tolist())
+            self.libres, self.compactos = problem_utils.compacta_estados(self.mapa) if compacto else (None, None)
+            self.recompensas = datos['recompensas']
+            if self.dispersa:
+                self.transiciones = problem_utils.TransicionesDispersas(datos['sucesores'], datos['probabilidades'], self.acciones)
+            else:
+                self.transiciones = datos['transiciones']
+            self.politica = [self.acciones[i] for i in datos['politica'].tolist()]
+            return
 
         self.mapa,self.destino = problem_utils.lee_mapa(mapa)
-        self.estados = problem_utils.genera_estados(self.mapa)
-        self.acciones = ['esperar','N','NE','E','SE','S','SO','O','NO']
+        self.libres, self.compactos = problem_utils.compacta_estados(self.mapa) if compacto else (None, None)
 
-        self.recompensas = self.crea_recompensas_sistema()
-        self.transiciones = self.crea_transiciones_sistema(prob_error)
+        # las recompensas, las transiciones y la política se construyen la primera vez que se usan,
+        # salvo que haya que guardarlas en la caché
+        if cache is not None and cache is not False:
+            arrays = {'mapa': self.mapa, 'destino': np.array(self.destino), 'recompensas': self.recompensas,
+                      'politica': np.array([self.acciones.index(a) for a in self.politica])}
+            if self.dispersa:
+                arrays.update(sucesores=self.transiciones.sucesores, probabilidades=self.transiciones.probabilidades)
+            else:
+                arrays['transiciones'] = self.transiciones
+            cache.guarda(clave, arrays)
 
-        self.politica = problem_utils.crea_politica_greedy(self.estados,self.acciones,self.mapa,self.destino)
-    
+    @property
+    def estados(self):
+        if self._estados is None:
+            if self.compacto:
+                alto = self.mapa.shape[0]
+                # el sumidero no tiene coordenadas, pero ocupa el último índice como en las transiciones y las recompensas
+                self._estados = [(int(celda) // alto, int(celda) % alto) for celda in self.libres] + [None]
+            else:
+                self._estados = problem_utils.genera_estados(self.mapa)
+        return self._estados
+
+    @property
+    def recompensas(self):
+        if self._recompensas is None:
+            self._recompensas = self.crea_recompensas_sistema()
+        return self._recompensas
+
+    @recompensas.setter
+    def recompensas(self, recompensas):
+        self._recompensas = recompensas
+
+    @property
+    def transiciones(self):
+        if self._transiciones is None:
+            self._transiciones = self.crea_transiciones_sistema(self.prob_error)
+        return self._transiciones
+
+    @transiciones.setter
+    def transiciones(self, transiciones):
+        self._transiciones = transiciones
+
+    @property
+    def politica(self):
+        if self._politica is None:
+            self._politica = problem_utils.crea_politica_greedy_vectorizada(self.modelo_acciones,self.mapa,self.destino,self.compacto)
+        return self._politica
+
+    @politica.setter
+    def politica(self, politica):
+        self._politica = politica
+
+    def modelo_generativo(self):
+        if self._modelo_generativo is None:
+            self._modelo_generativo = problem_utils.ModeloGenerativo(self.mapa, self.prob_error, self.modelo_acciones, compacto=self.compacto,
+                                                                     semilla=self.semilla)
+        return self._modelo_generativo
+
+    def paso(self, estado, accion):
+        accion = self.modelo_acciones.indice(accion)
+        alto = self.mapa.shape[0]
+        celda = int(estado)
+        if self.compacto:
+            if celda == len(self.libres):
+                # el sumidero tiene la recompensa de un obstáculo
+                return celda, -100 if accion == self.modelo_acciones.espera else -1000
+            celda = int(self.libres[celda])
+        coordenadas = (celda // alto, celda % alto)
+        if accion == self.modelo_acciones.espera and coordenadas != self.destino:
+            recompensa = -100
+        else:
+            recompensa = problem_utils.obtiene_recompensa(coordenadas, self.destino, self.mapa)
+        return self.modelo_generativo().muestrea(estado, accion), recompensa
+
+    def es_terminal(self, estado):
+        destino = problem_utils.obtiene_indice_estado(self.destino, self.mapa)
+        if self.compacto:
+            destino = int(self.compactos[destino])
+        return destino == int(estado)
 
     def visualiza_mapa(self):
         problem_utils.visualiza_mapa(self.mapa,self.destino)
 
     def crea_recompensas_sistema(self):
-        return problem_utils.crea_recompensas_sistema(self.estados,self.destino,self.mapa,self.acciones)
+        return problem_utils.crea_recompensas_vectorizado(self.destino,self.mapa,self.modelo_acciones,self.compacto)
     
     def crea_transiciones_sistema(self, prob_error):
-        return np.array([problem_utils.crea_transiciones_movimiento('esperar',prob_error,self.estados,self.mapa), 
-                     problem_utils.crea_transiciones_movimiento('N',prob_error,self.estados,self.mapa),
-                     problem_utils.crea_transiciones_movimiento('NE',prob_error,self.estados,self.mapa),
-                     problem_utils.crea_transiciones_movimiento('E',prob_error,self.estados,self.mapa),
-                     problem_utils.crea_transiciones_movimiento('SE',prob_error,self.estados,self.mapa),
-                     problem_utils.crea_transiciones_movimiento('S',prob_error,self.estados,self.mapa),
-                     problem_utils.crea_transiciones_movimiento('SO',prob_error,self.estados,self.mapa),
-                     problem_utils.crea_transiciones_movimiento('O',prob_error,self.estados,self.mapa),
-                     problem_utils.crea_transiciones_movimiento('NO',prob_error,self.estados,self.mapa)])
+        return problem_utils.crea_transiciones_vectorizado(self.modelo_acciones,prob_error,self.mapa,dispersa=self.dispersa,compacto=self.compacto)
+
+    def cambia_celdas(self, celdas, valores=None):
+        assert not self.compacto, "En un problema compacto cambiar una celda cambia los estados; hay que volver a crearlo"
+        assert self.familia is None, "El problema comparte el mapa y las transiciones con los demás destinos de su familia"
+        celdas = np.asarray(celdas, dtype=np.int64).reshape(-1, 2)
+        xs, ys = celdas[:, 0], celdas[:, 1]
+        alto, ancho = self.mapa.shape
+        assert ((0 <= xs) & (xs < ancho) & (0 <= ys) & (ys < alto)).all(), "Hay celdas fuera del mapa"
+        if not self.mapa.flags.writeable:
+            # mapa binario con memoria mapeada o cargado de la caché
+            self.mapa = np.array(self.mapa)
+            if self._modelo_generativo is not None:
+                self._modelo_generativo.mapa = self.mapa
+        self.mapa[ys, xs] = 1 - self.mapa[ys, xs] if valores is None else valores
+        estados = problem_utils.vecindario(xs*alto + ys, self.mapa, self.modelo_acciones)
+
+        if self._recompensas is not None:
+            if not self._recompensas.flags.writeable:
+                self._recompensas = np.array(self._recompensas)
+            problem_utils.actualiza_recompensas(self._recompensas, self.destino, self.mapa, self.modelo_acciones, estados)
+        if self._transiciones is not None:
+            if self.dispersa and not self._transiciones.sucesores.flags.writeable:
+                self._transiciones = problem_utils.TransicionesDispersas(np.array(self._transiciones.sucesores),
+                                                                         np.array(self._transiciones.probabilidades), self.acciones)
+            elif not self.dispersa and not self._transiciones.flags.writeable:
+                self._transiciones = np.array(self._transiciones)
+            problem_utils.actualiza_transiciones(self._transiciones, self.modelo_acciones, self.prob_error, self.mapa, estados)
+        # la política greedy depende del mapa; se vuelve a calcular la próxima vez que se use
+        self._politica = None
+        return estados
 
     def actualiza_politica(self, politica):
         self.politica = politica
     
     def visualiza_politica(self):
-        problem_utils.visualiza_politica(self.politica,self.mapa,self.destino,self.estados)
-        
\ No newline at end of file
+        problem_utils.visualiza_politica(self.politica,self.mapa,self.destino,self.estados,self.modelo_acciones)
+        
+
+class ProblemaMultidestino:
+
+    """
+    Familia de problemas sobre el mismo mapa que solo se diferencian en el destino. Las transiciones no dependen del
+    destino, así que se construyen una sola vez y las comparten todos; las recompensas de todos los destinos se generan
+    juntas en un único array de destinos x estados x acciones.
+
+    Parámetros:
+    -----------
+
+    mapa: Array o String
+        Mapa del problema, como en Problem. El destino que traiga el fichero se ignora si se indican destinos.
+
+    prob_error: float
+        Probabilidad de error en el movimiento.
+
+    destinos: List
+        Coordenadas (x, y) de cada destino. Por defecto solo el destino del mapa.
+
+    dispersa, cache, conectividad, deslizamiento, compacto:
+        Igual que en Problem. Afectan a las transiciones compartidas.
+
+    Atributos:
+    -----------
+
+    base: Problem
+        Problema del mapa con su propio destino, del que se toman las transiciones y el modelo de acciones. Tampoco se
+        puede cambiar con cambia_celdas().
+
+    destinos: List
+        Lista con las coordenadas de los destinos.
+
+    recompensas: Array
+        Recompensas de todos los destinos, de tamaño destinos x estados x acciones. Se calculan la primera vez que se usan.
+
+    transiciones: Array o TransicionesDispersas
+        Transiciones comunes a todos los destinos (las de base).
+
+    planificador: IteracionValorMultidestino
+        Iteración de valores de todos los destinos a la vez. None hasta que se llama a planifica().
+
+    Métodos:
+    -----------
+
+    indice(destino) -> int
+        Índice de un destino, dado por su índice o por sus coordenadas.
+
+    problema(destino) -> Problem
+        Problema de un solo destino que comparte el mapa, las transiciones y el modelo generativo con los demás. Como los
+        comparte, no se puede cambiar con cambia_celdas().
+
+    planifica(factor_descuento, tolerancia, max_iteraciones) -> IteracionValorMultidestino
+        Resuelve todos los destinos a la vez con iteración de valores por lotes.
+
+    entrena(clase, metodo, destinos, **parametros) -> List
+        Entrena un algoritmo por cada destino (por defecto todos) sobre las transiciones compartidas y devuelve los modelos.
+
+    politica(destino) -> List
+        Política óptima de un destino. Si aún no se ha planificado, se planifica con los parámetros por defecto.
+    """
+    def __init__(self, mapa, prob_error, destinos=None, dispersa=False, cache=None, conectividad=8, deslizamiento=None, compacto=False):
+        self.base = Problem(mapa, prob_error, dispersa=dispersa, cache=cache, conectividad=conectividad,
+                            deslizamiento=deslizamiento, compacto=compacto)
+        # el mapa y las transiciones son de toda la familia, así que ni base ni sus copias se pueden cambiar por separado
+        self.base.familia = self
+        if destinos is None:
+            destinos = [self.base.destino]
+        alto, ancho = self.base.mapa.shape
+        self.destinos = [tuple(int(c) for c in destino) for destino in destinos]
+        assert len(self.destinos) > 0, "Debe haber al menos un destino"
+        assert all(0 <= x < ancho and 0 <= y < alto for x, y in self.destinos), "Hay destinos fuera del mapa"
+        assert all(self.base.mapa[y, x] != 1 for x, y in self.destinos), "Hay destinos sobre obstáculos"
+        self.acciones = self.base.acciones
+        self.modelo_acciones = self.base.modelo_acciones
+
+        self._indices = {destino: i for i, destino in enumerate(self.destinos)}
+        self._recompensas = None
+        self._problemas = {}
+        self.planificador = None
+
+    @property
+    def recompensas(self):
+        if self._recompensas is None:
+            self._recompensas = problem_utils.crea_recompensas_destinos(self.destinos, self.base.mapa, self.modelo_acciones,
+                                                                         self.base.compacto)
+        return self._recompensas
+
+    @property
+    def transiciones(self):
+        return self.base.transiciones
+
+    def indice(self, destino):
+        if isinstance(destino, (int, np.integer)):
+            assert 0 <= destino < len(self.destinos), "Índice de destino fuera de rango"
+            return int(destino)
+        destino = tuple(int(c) for c in destino)
+        assert destino in self._indices, f"El destino {destino} no pertenece a la familia"
+        return self._indices[destino]
+
+    def problema(self, destino):
+        indice = self.indice(destino)
+        if indice not in self._problemas:
+            # se construyen antes de copiar para que todos los problemas compartan las mismas tablas
+            self.base.transiciones
+            self.base.modelo_generativo()
+            problema = copy.copy(self.base)
+            problema.destino = self.destinos[indice]
+            problema.recompensas = self.recompensas[indice]
+            problema.politica = None
+            self._problemas[indice] = problema
+        return self._problemas[indice]
+
+    def planifica(self, factor_descuento=0.9, tolerancia=1e-6, max_iteraciones=1000):
+        # los algoritmos usan Problem, así que el problema solo importa el planificador cuando se usa
+        from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValorMultidestino
+        self.planificador = IteracionValorMultidestino(self.transiciones, self.recompensas, factor_descuento, tolerancia, max_iteraciones)
+        self.planificador.entrenar()
+        return self.planificador
+
+    def entrena(self, clase, metodo='entrenar', destinos=None, **parametros):
+        indices = range(len(self.destinos)) if destinos is None else [self.indice(d) for d in destinos]
+        modelos = []
+        for indice in indices:
+            modelo = clase(self.transiciones, self.recompensas[indice], **parametros)
+            getattr(modelo, metodo)()
+            modelos.append(modelo)
+        return modelos
+
+    def politica(self, destino):
+        if self.planificador is None:
+            self.planifica()
+        return self.planificador.obtener_politica(self.indice(destino))
@@ -1,7 +1,27 @@
+import bisect
+import copy
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 
 
+# nombres de las acciones con movimientos en 8 y en 4 direcciones, en el orden de sus índices
+ACCIONES = ['esperar','N','NE','E','SE','S','SO','O','NO']
+ACCIONES_4 = ['esperar','N','E','S','O']
+
+# desplazamiento (dx, dy) de cada acción
+DESPLAZAMIENTOS = {'esperar': (0, 0), 'N': (0, 1), 'NE': (1, 1), 'E': (1, 0), 'SE': (1, -1),
+                   'S': (0, -1), 'SO': (-1, -1), 'O': (-1, 0), 'NO': (-1, 1)}
+
+# movimientos que se pueden producir por error al aplicar cada acción, todos con la misma probabilidad: con movimientos
+# en 8 direcciones, las dos direcciones a 45 grados, y con movimientos en 4 direcciones, las dos perpendiculares
+ERRORES = {'N': ['NE','NO'], 'S': ['SE','SO'], 'E': ['NE','SE'], 'O': ['NO','SO'],
+           'NE': ['N','E'], 'NO': ['N','O'], 'SE': ['S','E'], 'SO': ['S','O']}
+ERRORES_4 = {'N': ['E','O'], 'S': ['E','O'], 'E': ['N','S'], 'O': ['N','S']}
+
+# los mapas binarios empiezan por esta marca, seguida del alto y el ancho (int64) y del destino (float64)
+MARCA_MAPA_BINARIO = b'ARUSMAPA'
+TAMANO_CABECERA_BINARIO = 40
 
 def lee_mapa(fichero):
     """
@@ -9,8 +29,8 @@ def lee_mapa(fichero):
 
     Parámetros:
     -----------
-    fichero: String
-        Nombre del archivo de texto.
+    fichero: String o Path
+        Nombre del archivo de texto, o de un mapa binario con extensión .mapa (ver guarda_mapa()).
 
     El archivo debe tener el siguiente formato:
     - La primera línea contiene dos números separados por un espacio.
@@ -19,18 +39,75 @@ def lee_mapa(fichero):
     La función devuelve dos elementos:
     - Una matriz de NumPy que representa el mapa.
     - Una tupla con los dos números de la primera línea.
+
+    Las filas se convierten todas a la vez con NumPy en lugar de caracter a caracter. Los mapas binarios no se leen
+    enteros: se devuelve una matriz de solo lectura con memoria mapeada, de forma que solo se cargan de disco las
+    partes del mapa que se usan.
     
     """
-    with open(fichero,'r') as archivo:
-        lineas = archivo.readlines()
+    fichero = os.fspath(fichero)
+    if fichero.endswith('.mapa'):
+        return lee_mapa_binario(fichero)
+    with open(fichero,'rb') as archivo:
+        lineas = archivo.read().splitlines()
     numeros = [float(numero) for numero in lineas[0].split()]
-    lineas.pop(0)
-    lineas.reverse()
-    matriz = []
-    for linea in lineas:
-        fila = [int(caracter) for caracter in linea.strip()]
-        matriz.append(fila)
-    return np.array(matriz),(numeros[0],numeros[1])
+    filas = [linea.strip() for linea in lineas[1:] if linea.strip()]
+    matriz = (np.frombuffer(b''.join(filas), dtype=np.uint8) - ord('0')).reshape(len(filas), -1)
+    return matriz[::-1].astype(int),(numeros[0],numeros[1])
+
+def lee_mapa_binario(fichero):
+    """
+    Esta función lee un mapa guardado en formato binario por guarda_mapa() y lo devuelve como una matriz de NumPy
+    de solo lectura con memoria mapeada y una tupla con el destino.
+
+    Parámetros:
+    -----------
+    fichero: String o Path
+        Nombre del archivo.
+    """
+
+    fichero = os.fspath(fichero)
+    with open(fichero,'rb') as archivo:
+        cabecera = archivo.read(TAMANO_CABECERA_BINARIO)
+    assert cabecera[:8] == MARCA_MAPA_BINARIO, "El fichero no es un mapa binario"
+    alto, ancho = np.frombuffer(cabecera, dtype=np.int64, count=2, offset=8)
+    x, y = np.frombuffer(cabecera, dtype=np.float64, count=2, offset=24)
+    mapa = np.memmap(fichero, dtype=np.uint8, mode='r', offset=TAMANO_CABECERA_BINARIO, shape=(int(alto), int(ancho)))
+    return mapa,(float(x),float(y))
+
+def guarda_mapa(fichero, mapa, destino):
+    """
+    Esta función guarda un mapa y su destino. Si el nombre del archivo termina en .mapa se guarda en formato binario:
+    una cabecera de 40 bytes seguida de un byte por celda, en el mismo orden que la matriz, que lee_mapa() carga con
+    memoria mapeada. Si no, se guarda en el formato de texto de lee_mapa().
+
+    Parámetros:
+    -----------
+    fichero: String o Path
+        Nombre del archivo.
+
+    mapa: Array
+        Matriz que representa el mapa, con la fila 0 abajo (como la devuelve lee_mapa()).
+
+    destino: Tuple
+        Coordenadas del destino.
+    """
+
+    fichero = os.fspath(fichero)
+    mapa = np.asarray(mapa, dtype=np.uint8)
+    if fichero.endswith('.mapa'):
+        with open(fichero,'wb') as archivo:
+            archivo.write(MARCA_MAPA_BINARIO)
+            archivo.write(np.array(mapa.shape, dtype=np.int64).tobytes())
+            archivo.write(np.array(destino, dtype=np.float64).tobytes())
+            archivo.write(np.ascontiguousarray(mapa).tobytes())
+        return
+    numero = lambda v: str(int(v)) if float(v).is_integer() else str(v)
+    with open(fichero,'wb') as archivo:
+        archivo.write(f'{numero(destino[0])} {numero(destino[1])}\n'.encode())
+        # las filas del fichero van de arriba abajo
+        for fila in mapa[::-1]:
+            archivo.write((fila + ord('0')).tobytes() + b'\n')
 
 def visualiza_mapa(mapa,destino):
     """
@@ -100,30 +177,8 @@ def aplica_accion(estado,accion,mapa):
 
     if es_obstaculo(estado,mapa):
         return estado
-    x = estado[0]
-    y = estado[1]
-    
-    if accion == 'N':
-        y += 1
-    elif accion == 'S':
-        y -= 1
-    elif accion == 'E':
-        x += 1
-    elif accion == 'O':
-        x -= 1
-    elif accion == 'NE':
-        y += 1
-        x += 1
-    elif accion == 'SE':
-        y -= 1
-        x += 1
-    elif accion == 'SO':
-        y -= 1
-        x -= 1
-    elif accion == 'NO':
-        y += 1
-        x -= 1
-    return x,y
+    dx, dy = DESPLAZAMIENTOS.get(accion, (0, 0))
+    return estado[0] + dx, estado[1] + dy
 
 def obtiene_posibles_errores(accion):
     """
@@ -135,25 +190,7 @@ def obtiene_posibles_errores(accion):
         Acción a aplicar.
     """
 
-    if accion=='N':
-        errores = ['NE','NO']
-    elif accion=='S':
-        errores = ['SE','SO']
-    elif accion=='E':
-        errores = ['NE','SE']
-    elif accion=='O':
-        errores = ['NO', 'SO']
-    elif accion=='NE':
-        errores = ['N','E']
-    elif accion=='NO':
-        errores = ['N','O']
-    elif accion=='SE':
-        errores = ['S','E']
-    elif accion == 'SO':
-        errores = ['S','O']
-    else:
-        errores = []
-    return errores
+    return list(ERRORES.get(accion, []))
 
 
 def obtiene_recompensa(estado,destino,mapa):
@@ -259,7 +296,7 @@ def crea_transiciones_movimiento(accion, prob_error,estados,mapa):
         matriz.append(fila)
     return np.array(matriz)
 
-def visualiza_politica(politica,mapa,destino,estados):
+def visualiza_politica(politica,mapa,destino,estados,acciones=None):
     """
     Esta función muestra una política en un mapa, es decir, muestra las flechas que indican las acciones de la política.
 
@@ -275,22 +312,21 @@ def visualiza_politica(politica,mapa,destino,estados):
         Coordenadas del destino.
     
     estados: List
-        Lista de estados.
+        Lista de estados. Los estados None (el sumidero de un problema compacto) no se dibujan.
+
+    acciones: ModeloAcciones
+        Modelo de las acciones de la política. Por defecto es el de las 9 acciones del problema.
     """
 
     visualiza_mapa(mapa,destino)
-    for p in zip(estados,politica):
-        accion = p[1]
-        if accion=='esperar':
+    modelo = modelo_acciones(ACCIONES if acciones is None else acciones)
+    for estado, accion in zip(estados,politica):
+        a = modelo.indice(accion)
+        if a == modelo.espera or estado is None:
             continue
-        estado = p[0]
-        e1 = aplica_accion(estado,accion,mapa)
-        x0 = estado[0]
-        y0 = estado[1]
-        x1 = e1[0]
-        y1 = e1[1]
-        
-        plt.gca().arrow(x0, y0, (x1 - x0)*0.6, (y1 - y0)*0.6,
+        # los obstáculos no se mueven
+        libre = not es_obstaculo(estado,mapa)
+        plt.gca().arrow(estado[0], estado[1], modelo.dx[a]*libre*0.6, modelo.dy[a]*libre*0.6,
          head_width=0.3, head_length=0.3, fc='black', ec='black')
         
 def crea_politica_greedy(estados,acciones,mapa,destino):
@@ -321,3 +357,734 @@ def crea_politica_greedy(estados,acciones,mapa,destino):
         accion = acciones[np.argmax(valores)]
         p.append(accion)
     return p
+
+class TransicionesDispersas:
+    """
+    Representación dispersa de las transiciones de un sistema. En lugar de guardar una matriz densa de
+    tamaño acciones x estados x estados, para cada par (acción, estado) se guardan únicamente los posibles
+    estados sucesores (como mucho 3 en nuestro problema) y sus probabilidades.
+
+    Parámetros:
+    -----------
+    sucesores: Array
+        Matriz de enteros de tamaño acciones x estados x K con los índices de los estados sucesores.
+
+    probabilidades: Array
+        Matriz de tamaño acciones x estados x K con la probabilidad de cada sucesor. Las posiciones
+        que no se usan tienen probabilidad 0 y como sucesor el propio estado.
+
+    acciones: List
+        Nombres de las acciones, en el orden de la primera dimensión. Por defecto es None.
+
+    Atributos:
+    -----------
+    shape: Tuple
+        Dimensiones de la matriz densa equivalente (acciones, estados, estados).
+
+    ndim: int
+        Número de dimensiones de la matriz densa equivalente, siempre 3.
+
+    Métodos:
+    -----------
+    a_densa() -> Array
+        Devuelve la matriz densa equivalente.
+    """
+
+    ndim = 3
+
+    def __init__(self, sucesores, probabilidades, acciones=None):
+        self.acciones = None if acciones is None else list(acciones)
+        self.sucesores = np.asarray(sucesores, dtype=np.int64)
+        self.probabilidades = np.asarray(probabilidades, dtype=np.float64)
+        assert self.sucesores.shape == self.probabilidades.shape, "Los sucesores y las probabilidades deben tener la misma forma"
+        acciones, estados, _ = self.sucesores.shape
+        self.shape = (acciones, estados, estados)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def a_densa(self):
+        acciones, estados, _ = self.shape
+        matriz = np.zeros(self.shape)
+        a = np.arange(acciones)[:, None, None]
+        s = np.arange(estados)[None, :, None]
+        np.add.at(matriz, (a, s, self.sucesores), self.probabilidades)
+        return matriz
+
+
+def crea_transiciones_dispersas(acciones, prob_error, estados, mapa):
+    """
+    Esta función crea las transiciones de un sistema en formato disperso. Para cada acción y cada estado
+    se guardan solo los estados a los que se puede llegar (el movimiento deseado y los posibles errores)
+    junto con su probabilidad, siguiendo las mismas reglas que crea_transiciones_movimiento().
+
+    Parámetros:
+    -----------
+    acciones: List
+        Lista de acciones.
+
+    prob_error: Float
+        Probabilidad de error.
+
+    estados: List
+        Lista de estados.
+
+    mapa: Array
+        Matriz que representa el mapa.
+    """
+
+    k = 1 + max(len(obtiene_posibles_errores(accion)) for accion in acciones)
+    sucesores = np.zeros((len(acciones), len(estados), k), dtype=np.int64)
+    probabilidades = np.zeros((len(acciones), len(estados), k))
+    for i, accion in enumerate(acciones):
+        errores = obtiene_posibles_errores(accion)
+        for j, e0 in enumerate(estados):
+            indice = obtiene_indice_estado(e0, mapa)
+            sucesores[i, j, :] = indice
+            if es_obstaculo(e0, mapa):
+                probabilidades[i, j, 0] = 1
+            elif len(errores) == 0:
+                sucesores[i, j, 0] = obtiene_indice_estado(aplica_accion(e0, accion, mapa), mapa)
+                probabilidades[i, j, 0] = 1
+            else:
+                sucesores[i, j, 0] = obtiene_indice_estado(aplica_accion(e0, accion, mapa), mapa)
+                probabilidades[i, j, 0] = 1 - prob_error
+                for n, error in enumerate(errores):
+                    sucesores[i, j, n + 1] = obtiene_indice_estado(aplica_accion(e0, error, mapa), mapa)
+                    probabilidades[i, j, n + 1] = prob_error/len(errores)
+    return TransicionesDispersas(sucesores, probabilidades)
+
+
+class ModeloAcciones:
+    """
+    Modelo de las acciones de un sistema. Cada acción se identifica con un entero, su posición en la lista de nombres,
+    y se describe con arrays indexados por ese entero: el desplazamiento (dx, dy) que produce y una tabla con los movimientos
+    que se pueden aplicar por error en su lugar y su probabilidad. La construcción de las transiciones y el muestreo de los
+    sucesores se hacen indexando estos arrays; los nombres solo se usan en la interfaz (políticas como listas de nombres
+    y visualización).
+
+    Parámetros:
+    -----------
+    nombres: List
+        Nombres de las acciones.
+
+    desplazamientos: List o Array
+        Desplazamiento (dx, dy) de cada acción.
+
+    errores: Dict o Array
+        Movimientos que se pueden producir por error al aplicar cada acción. Puede ser un diccionario acción -> lista
+        de acciones (todas con la misma probabilidad) o acción -> diccionario acción -> probabilidad, con las acciones
+        como nombres o índices, o una matriz de acciones x acciones cuya fila a es la distribución del movimiento que
+        se aplica cuando hay un error al aplicar a. Las acciones que no aparecen, o con la fila a 0, no tienen errores.
+        Por defecto es None (ninguna acción tiene errores).
+
+    Atributos:
+    -----------
+    dx, dy: Array
+        Desplazamiento de cada acción.
+
+    movimientos: Array
+        Matriz de acciones x K. La columna 0 es la propia acción y las demás los movimientos que se pueden producir
+        por error. Las posiciones sin usar repiten la propia acción con probabilidad 0.
+
+    pesos_error: Array
+        Matriz de acciones x K con la probabilidad de cada movimiento cuando se produce un error (la columna 0 es 0).
+
+    numero_errores: Array
+        Número de movimientos de error de cada acción.
+
+    espera: int
+        Índice de la acción sin desplazamiento (esperar), que se penaliza fuera del destino, o None si no hay ninguna.
+
+    Métodos:
+    -----------
+    indice(accion) -> int
+        Devuelve el índice de una acción dada por su nombre o por su índice.
+
+    probabilidades(prob_error) -> Array
+        Devuelve la matriz de acciones x K con la probabilidad de cada movimiento para una probabilidad de error.
+
+    elige_movimiento(accion, u) -> int
+        Devuelve la columna de movimientos de la acción que corresponde a un número uniforme entre 0 y 1, dado que hay error.
+
+    firma() -> List
+        Descripción del modelo con tipos básicos de Python, que lo identifica en la caché de problemas.
+    """
+
+    def __init__(self, nombres, desplazamientos, errores=None):
+        self.nombres = list(nombres)
+        self.indices = {nombre: i for i, nombre in enumerate(self.nombres)}
+        n = len(self.nombres)
+        desplazamientos = np.asarray(desplazamientos, dtype=np.int64).reshape(n, 2)
+        self.dx, self.dy = desplazamientos[:, 0].copy(), desplazamientos[:, 1].copy()
+
+        filas = [[] for _ in range(n)]
+        if isinstance(errores, dict):
+            for accion, fila in errores.items():
+                if isinstance(fila, dict):
+                    filas[self.indice(accion)] = [(self.indice(b), float(p)) for b, p in fila.items()]
+                else:
+                    filas[self.indice(accion)] = [(self.indice(b), 1.0/len(fila)) for b in fila]
+        elif errores is not None:
+            matriz = np.asarray(errores, dtype=np.float64)
+            assert matriz.shape == (n, n), "La matriz de errores debe ser de acciones x acciones"
+            filas = [[(int(b), float(matriz[a, b])) for b in np.flatnonzero(matriz[a] > 0)] for a in range(n)]
+        for fila in filas:
+            assert len(fila) == 0 or abs(sum(p for _, p in fila) - 1) < 1e-9, "Las probabilidades de los errores de una acción deben sumar 1"
+
+        k = 1 + max(len(fila) for fila in filas)
+        self.movimientos = np.repeat(np.arange(n)[:, None], k, axis=1)
+        self.pesos_error = np.zeros((n, k))
+        for a, fila in enumerate(filas):
+            for j, (b, p) in enumerate(fila):
+                self.movimientos[a, j + 1] = b
+                self.pesos_error[a, j + 1] = p
+        self.numero_errores = np.array([len(fila) for fila in filas])
+        # probabilidad acumulada de los errores de cada acción, para elegir uno a partir de un uniforme
+        self.acumulados = [np.cumsum(self.pesos_error[a, 1:1 + len(fila)]).tolist() for a, fila in enumerate(filas)]
+        self.equiprobables = [len(set(p for _, p in fila)) <= 1 for fila in filas]
+        quietas = np.flatnonzero((self.dx == 0) & (self.dy == 0))
+        self.espera = int(quietas[0]) if len(quietas) > 0 else None
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def indice(self, accion):
+        if isinstance(accion, str):
+            return self.indices[accion]
+        return int(accion)
+
+    def probabilidades(self, prob_error):
+        probabilidades = prob_error*self.pesos_error
+        probabilidades[:, 0] = np.where(self.numero_errores > 0, 1 - prob_error, 1)
+        return probabilidades
+
+    def elige_movimiento(self, accion, u):
+        n = len(self.acumulados[accion])
+        if self.equiprobables[accion]:
+            return 1 + int(u*n)
+        return 1 + min(bisect.bisect_right(self.acumulados[accion], u), n - 1)
+
+    def firma(self):
+        return [(nombre, int(self.dx[a]), int(self.dy[a]),
+                 [(int(self.movimientos[a, j]), float(self.pesos_error[a, j])) for j in range(1, 1 + self.numero_errores[a])])
+                for a, nombre in enumerate(self.nombres)]
+
+
+def crea_modelo_acciones(conectividad=8, deslizamiento=None):
+    """
+    Esta función crea el modelo de acciones de un problema: esperar y los movimientos en 8 direcciones
+    (['esperar','N','NE','E','SE','S','SO','O','NO']) o en 4 direcciones (['esperar','N','E','S','O']).
+
+    Parámetros:
+    -----------
+    conectividad: int
+        4 u 8. Por defecto es 8.
+
+    deslizamiento: Dict o Array
+        Distribución de los movimientos que se producen por error, en cualquiera de los formatos de ModeloAcciones.
+        Por defecto, con 8 direcciones se desliza a una de las dos direcciones a 45 grados y con 4 a una de las dos
+        perpendiculares, con la misma probabilidad.
+    """
+
+    assert conectividad in (4, 8), "La conectividad debe ser 4 u 8"
+    nombres = ACCIONES if conectividad == 8 else ACCIONES_4
+    if deslizamiento is None:
+        deslizamiento = ERRORES if conectividad == 8 else ERRORES_4
+    return ModeloAcciones(nombres, [DESPLAZAMIENTOS[a] for a in nombres], deslizamiento)
+
+
+def modelo_acciones(acciones):
+    """
+    Esta función devuelve el modelo de acciones que corresponde a una lista de nombres de acciones, con los desplazamientos
+    de DESPLAZAMIENTOS y los errores de ERRORES que están en la lista, o el propio modelo si ya es un ModeloAcciones.
+
+    Parámetros:
+    -----------
+    acciones: List o ModeloAcciones
+        Lista de acciones.
+    """
+
+    if isinstance(acciones, ModeloAcciones):
+        return acciones
+    acciones = list(acciones)
+    errores = {a: [e for e in ERRORES.get(a, []) if e in acciones] for a in acciones}
+    return ModeloAcciones(acciones, [DESPLAZAMIENTOS.get(a, (0, 0)) for a in acciones], {a: e for a, e in errores.items() if e})
+
+
+def coordenadas_estados(mapa):
+    """
+    Esta función devuelve las coordenadas de todos los estados de un mapa como dos arrays (x, y),
+    en el mismo orden que genera_estados().
+
+    Parámetros:
+    -----------
+    mapa: Array
+        Matriz que representa el mapa.
+    """
+
+    alto, ancho = mapa.shape
+    return np.repeat(np.arange(ancho), alto), np.tile(np.arange(alto), ancho)
+
+def compacta_estados(mapa):
+    """
+    Esta función numera solo las celdas libres de un mapa, para el espacio de estados compacto. Devuelve dos arrays:
+    el índice de cada celda libre en la numeración de todas las celdas (compacto -> malla) y el índice compacto de
+    cada celda (malla -> compacto). Todos los obstáculos comparten el índice len(libres), el del estado sumidero que
+    los representa: son absorbentes y tienen la misma recompensa, así que se pueden agrupar en un solo estado.
+
+    Parámetros:
+    -----------
+    mapa: Array
+        Matriz que representa el mapa.
+    """
+
+    xs, ys = coordenadas_estados(mapa)
+    libres = np.flatnonzero(mapa[ys, xs] != 1)
+    compactos = np.full(mapa.size, len(libres), dtype=np.int64)
+    compactos[libres] = np.arange(len(libres))
+    return libres, compactos
+
+def obtiene_indices_vectorizado(xs, ys, mapa):
+    """
+    Esta función devuelve el índice de un conjunto de estados, igual que obtiene_indice_estado().
+    Los índices negativos se ajustan igual que al indexar una lista de Python.
+
+    Parámetros:
+    -----------
+    xs: Array
+        Coordenada x de los estados.
+
+    ys: Array
+        Coordenada y de los estados.
+
+    mapa: Array
+        Matriz que representa el mapa.
+    """
+
+    return np.mod(xs*mapa.shape[0] + ys, mapa.size)
+
+def obtiene_recompensas_vectorizado(xs, ys, destino, mapa):
+    """
+    Esta función devuelve la recompensa de un conjunto de estados, igual que obtiene_recompensa().
+
+    Parámetros:
+    -----------
+    xs: Array
+        Coordenada x de los estados.
+
+    ys: Array
+        Coordenada y de los estados.
+
+    destino: Tuple
+        Coordenadas del destino.
+
+    mapa: Array
+        Matriz que representa el mapa.
+    """
+
+    K = 1000
+    obstaculos = mapa[np.mod(ys, mapa.shape[0]), np.mod(xs, mapa.shape[1])] == 1
+    distancias = - np.sqrt((xs-destino[0])**2 + (ys-destino[1])**2)
+    return np.where(obstaculos, -K, distancias)
+
+def crea_recompensas_vectorizado(destino, mapa, acciones, compacto=False):
+    """
+    Esta función crea la matriz de recompensas de un sistema con operaciones sobre todo el mapa a la vez.
+    Devuelve el mismo resultado que crea_recompensas_sistema().
+
+    Parámetros:
+    -----------
+    destino: Tuple
+        Coordenadas del destino.
+
+    mapa: Array
+        Matriz que representa el mapa.
+
+    acciones: List o ModeloAcciones
+        Lista de acciones o modelo de acciones. La acción sin desplazamiento (esperar) se penaliza fuera del destino.
+
+    compacto: bool
+        Si es True, las filas son las de las celdas libres y la del estado sumidero de los obstáculos (ver compacta_estados()).
+    """
+
+    modelo = modelo_acciones(acciones)
+    xs, ys = coordenadas_estados(mapa)
+    if compacto:
+        libres, _ = compacta_estados(mapa)
+        xs, ys = xs[libres], ys[libres]
+    r = obtiene_recompensas_vectorizado(xs, ys, destino, mapa)
+    no_destino = (xs != destino[0]) | (ys != destino[1])
+    if compacto:
+        # el estado sumidero va al final, con la recompensa de un obstáculo
+        r, no_destino = np.append(r, -1000.0), np.append(no_destino, True)
+    matriz = np.repeat(r[:, None], len(modelo), axis=1)
+    if modelo.espera is not None:
+        matriz[no_destino, modelo.espera] = -100
+    return matriz
+
+def crea_recompensas_destinos(destinos, mapa, acciones, compacto=False):
+    """
+    Esta función crea las matrices de recompensas de un mismo mapa para varios destinos a la vez. Devuelve un array
+    de destinos x estados x acciones en el que cada matriz es la que devuelve crea_recompensas_vectorizado() para
+    ese destino.
+
+    Parámetros:
+    -----------
+    destinos: List o Array
+        Coordenadas (x, y) de cada destino.
+
+    mapa: Array
+        Matriz que representa el mapa.
+
+    acciones: List o ModeloAcciones
+        Lista de acciones o modelo de acciones. La acción sin desplazamiento (esperar) se penaliza fuera del destino.
+
+    compacto: bool
+        Si es True, las filas son las de las celdas libres y la del estado sumidero de los obstáculos (ver compacta_estados()).
+    """
+
+    modelo = modelo_acciones(acciones)
+    destinos = np.asarray(destinos).reshape(-1, 2)
+    xs, ys = coordenadas_estados(mapa)
+    if compacto:
+        libres, _ = compacta_estados(mapa)
+        xs, ys = xs[libres], ys[libres]
+    dx, dy = destinos[:, 0:1], destinos[:, 1:2]
+    r = obtiene_recompensas_vectorizado(xs, ys, (dx, dy), mapa)
+    no_destino = (xs != dx) | (ys != dy)
+    if compacto:
+        # el estado sumidero va al final, con la recompensa de un obstáculo
+        sumidero = np.ones((len(destinos), 1))
+        r, no_destino = np.hstack([r, -1000.0*sumidero]), np.hstack([no_destino, sumidero.astype(bool)])
+    matrices = np.repeat(r[:, :, None], len(modelo), axis=2)
+    if modelo.espera is not None:
+        matrices[:, :, modelo.espera][no_destino] = -100
+    return matrices
+
+def calcula_sucesores(acciones, prob_error, mapa, celdas):
+    """
+    Esta función calcula los sucesores de un conjunto de celdas del mapa y sus probabilidades para cada acción,
+    como dos arrays de tamaño acciones x celdas x K. Las posiciones sin usar apuntan a la propia celda con probabilidad 0.
+
+    Parámetros:
+    -----------
+    acciones: List o ModeloAcciones
+        Lista de acciones o modelo de acciones.
+
+    prob_error: Float
+        Probabilidad de error.
+
+    mapa: Array
+        Matriz que representa el mapa.
+
+    celdas: Array
+        Índices (x*alto + y) de las celdas.
+    """
+
+    modelo = modelo_acciones(acciones)
+    celdas = np.asarray(celdas, dtype=np.int64)
+    alto = mapa.shape[0]
+    libres = mapa[celdas % alto, celdas // alto] != 1
+    # sucesor de cada (acción, celda, movimiento): moverse (dx, dy) suma dx*alto + dy al índice de la celda;
+    # los obstáculos no se mueven y las posiciones sin usar apuntan a la propia celda
+    saltos = modelo.dx[modelo.movimientos]*alto + modelo.dy[modelo.movimientos]
+    sucesores = np.mod(celdas[None, :, None] + saltos[:, None, :]*libres[None, :, None], mapa.size)
+    usados = modelo.pesos_error > 0
+    usados[:, 0] = True
+    sucesores = np.where(usados[:, None, :], sucesores, celdas[None, :, None])
+    k = sucesores.shape[2]
+    probabilidades = np.where(libres[None, :, None], modelo.probabilidades(prob_error)[:, None, :], (np.arange(k) == 0)[None, None, :])
+    return sucesores, probabilidades
+
+def crea_transiciones_vectorizado(acciones, prob_error, mapa, dispersa=False, compacto=False):
+    """
+    Esta función crea las transiciones de un sistema calculando los sucesores de todos los estados a la vez.
+    Devuelve el mismo resultado que crear una matriz con crea_transiciones_movimiento() para cada acción o,
+    si dispersa es True, que crea_transiciones_dispersas().
+
+    Parámetros:
+    -----------
+    acciones: List o ModeloAcciones
+        Lista de acciones o modelo de acciones.
+
+    prob_error: Float
+        Probabilidad de error.
+
+    mapa: Array
+        Matriz que representa el mapa.
+
+    dispersa: bool
+        Si es True se devuelve un objeto TransicionesDispersas en lugar de la matriz densa.
+
+    compacto: bool
+        Si es True, los estados son solo las celdas libres más un estado sumidero que agrupa todos los obstáculos
+        (ver compacta_estados()), en lugar de todas las celdas del mapa.
+    """
+
+    modelo = modelo_acciones(acciones)
+    if compacto:
+        estados, compactos = compacta_estados(mapa)
+    else:
+        estados = np.arange(mapa.size)
+    sucesores, probabilidades = calcula_sucesores(modelo, prob_error, mapa, estados)
+    k = sucesores.shape[2]
+    if compacto:
+        # el sumidero va al final y es absorbente, como cada uno de los obstáculos
+        sumidero = len(estados)
+        sucesores = np.concatenate([compactos[sucesores], np.full((len(modelo), 1, k), sumidero)], axis=1)
+        probabilidades = np.concatenate([probabilidades, np.broadcast_to(np.arange(k) == 0, (len(modelo), 1, k))], axis=1)
+    if dispersa:
+        return TransicionesDispersas(sucesores, probabilidades, modelo.nombres)
+    n_estados = sucesores.shape[1]
+    matriz = np.zeros((len(modelo), n_estados, n_estados))
+    for n in range(k):
+        usados = probabilidades[:, :, n] > 0
+        a, s = np.nonzero(usados | (n == 0))
+        # se suman porque en el espacio compacto varios movimientos pueden acabar en el sumidero
+        np.add.at(matriz, (a, s, sucesores[a, s, n]), probabilidades[a, s, n])
+    return matriz
+
+def vecindario(celdas, mapa, acciones):
+    """
+    Esta función devuelve, ordenadas y sin repetir, las celdas cuyas transiciones o recompensas pueden cambiar cuando
+    cambian las celdas indicadas: las propias celdas y todas las que llegan a ellas con algún movimiento (con los
+    movimientos en 8 direcciones, el vecindario 3x3 de cada una).
+
+    Parámetros:
+    -----------
+    celdas: Array
+        Índices (x*alto + y) de las celdas que cambian.
+
+    mapa: Array
+        Matriz que representa el mapa.
+
+    acciones: List o ModeloAcciones
+        Lista de acciones o modelo de acciones.
+    """
+
+    modelo = modelo_acciones(acciones)
+    celdas = np.asarray(celdas, dtype=np.int64).ravel()
+    saltos = np.unique(modelo.dx*mapa.shape[0] + modelo.dy)
+    return np.unique(np.mod(celdas[:, None] - saltos[None, :], mapa.size))
+
+def actualiza_recompensas(recompensas, destino, mapa, acciones, estados):
+    """
+    Esta función vuelve a calcular, sobre la propia matriz, las filas de la matriz de recompensas de los estados
+    indicados, por ejemplo después de cambiar algunas celdas del mapa. Solo sirve para problemas no compactos.
+
+    Parámetros:
+    -----------
+    recompensas: Array
+        Matriz de recompensas de tamaño estados x acciones.
+
+    destino: Tuple
+        Coordenadas del destino.
+
+    mapa: Array
+        Matriz que representa el mapa.
+
+    acciones: List o ModeloAcciones
+        Lista de acciones o modelo de acciones.
+
+    estados: Array
+        Índices de los estados que hay que actualizar.
+    """
+
+    modelo = modelo_acciones(acciones)
+    estados = np.asarray(estados, dtype=np.int64)
+    xs, ys = estados // mapa.shape[0], estados % mapa.shape[0]
+    filas = np.repeat(obtiene_recompensas_vectorizado(xs, ys, destino, mapa)[:, None], len(modelo), axis=1)
+    if modelo.espera is not None:
+        filas[(xs != destino[0]) | (ys != destino[1]), modelo.espera] = -100
+    recompensas[estados] = filas
+    return recompensas
+
+def actualiza_transiciones(transiciones, acciones, prob_error, mapa, estados):
+    """
+    Esta función vuelve a calcular, sobre las propias transiciones, las filas de los estados indicados para todas
+    las acciones, por ejemplo después de cambiar algunas celdas del mapa. Sirve para la matriz densa y para
+    TransicionesDispersas, pero no para problemas compactos, en los que cambiar una celda cambia los estados.
+
+    Parámetros:
+    -----------
+    transiciones: Array o TransicionesDispersas
+        Transiciones que hay que actualizar.
+
+    acciones: List o ModeloAcciones
+        Lista de acciones o modelo de acciones.
+
+    prob_error: Float
+        Probabilidad de error.
+
+    mapa: Array
+        Matriz que representa el mapa.
+
+    estados: Array
+        Índices de los estados que hay que actualizar.
+    """
+
+    estados = np.asarray(estados, dtype=np.int64)
+    sucesores, probabilidades = calcula_sucesores(acciones, prob_error, mapa, estados)
+    if hasattr(transiciones, 'sucesores'):
+        transiciones.sucesores[:, estados] = sucesores
+        transiciones.probabilidades[:, estados] = probabilidades
+        return transiciones
+    transiciones[:, estados, :] = 0
+    a, s, n = np.nonzero(probabilidades > 0)
+    np.add.at(transiciones, (a, estados[s], sucesores[a, s, n]), probabilidades[a, s, n])
+    return transiciones
+
+def crea_politica_greedy_vectorizada(acciones, mapa, destino, compacto=False):
+    """
+    Esta función crea una política greedy para un sistema evaluando todas las acciones sobre todos
+    los estados a la vez. Devuelve el mismo resultado que crea_politica_greedy().
+
+    Parámetros:
+    -----------
+    acciones: List o ModeloAcciones
+        Lista de acciones o modelo de acciones.
+
+    mapa: Array
+        Matriz que representa el mapa.
+
+    destino: Tuple
+        Coordenadas del destino.
+
+    compacto: bool
+        Si es True, la política es la de las celdas libres más la del estado sumidero de los obstáculos.
+    """
+
+    modelo = modelo_acciones(acciones)
+    xs, ys = coordenadas_estados(mapa)
+    libres = (mapa[ys, xs] != 1)[:, None]
+    if compacto:
+        # en el sumidero todas las acciones valen lo mismo, así que se queda con la primera, como los obstáculos
+        estados, _ = compacta_estados(mapa)
+        xs, ys, libres = xs[estados], ys[estados], libres[estados]
+    valores = obtiene_recompensas_vectorizado(xs[:, None] + modelo.dx*libres, ys[:, None] + modelo.dy*libres, destino, mapa)
+    politica = [modelo.nombres[i] for i in np.argmax(valores, axis=1)]
+    return politica + [modelo.nombres[0]] if compacto else politica
+
+class ModeloGenerativo:
+    """
+    Modelo generativo de las transiciones de un sistema: en lugar de guardar ninguna matriz de transiciones,
+    el siguiente estado se calcula en el momento a partir del mapa y de las tablas del modelo de acciones.
+    Permite entrenar los algoritmos basados en muestras (SARSA, Monte Carlo y Q-Learning) en mapas demasiado grandes
+    para construir las transiciones, pasándolo en lugar de la matriz de transiciones.
+
+    Parámetros:
+    -----------
+    mapa: Array
+        Matriz que representa el mapa.
+
+    prob_error: Float
+        Probabilidad de error.
+
+    acciones: List o ModeloAcciones
+        Lista de acciones o modelo de acciones.
+
+    generador: Generator o FlujoUniformes
+        Generador de números aleatorios de NumPy. Si no se especifica se crea uno propio con la semilla indicada.
+
+    compacto: bool
+        Si es True, los estados se numeran en el espacio compacto de compacta_estados(): celdas libres y un estado
+        sumidero para los obstáculos. Por defecto es False.
+
+    semilla: int
+        Semilla del generador propio cuando no se pasa ninguno. Por defecto es None (semilla aleatoria).
+
+    Atributos:
+    -----------
+    shape: Tuple
+        Dimensiones de la matriz densa equivalente (acciones, estados, estados).
+
+    libres: Array
+        En el espacio compacto, índice de la celda de cada estado libre (None si no es compacto).
+
+    compactos: Array
+        En el espacio compacto, índice compacto de cada celda (None si no es compacto).
+
+    ndim: int
+        Número de dimensiones de la matriz densa equivalente, siempre 3.
+
+    Métodos:
+    -----------
+    muestrea(estado, accion) -> int
+        Devuelve el índice del siguiente estado tras aplicar la acción (índice) en el estado (índice).
+
+    muestrea_lote(estados, acciones) -> Array
+        Igual que muestrea() pero para arrays de estados y acciones, con operaciones de NumPy.
+
+    con_generador(generador) -> ModeloGenerativo
+        Devuelve una copia del modelo que usa otro generador de números aleatorios.
+    """
+
+    ndim = 3
+
+    def __init__(self, mapa, prob_error, acciones, generador=None, compacto=False, semilla=None):
+        self.mapa = mapa
+        self.prob_error = prob_error
+        self.modelo = modelo_acciones(acciones)
+        self.acciones = self.modelo.nombres
+        self.generador = np.random.default_rng(semilla) if generador is None else generador
+        self.libres, self.compactos = compacta_estados(mapa) if compacto else (None, None)
+        estados = mapa.size if self.libres is None else len(self.libres) + 1
+        self.shape = (len(self.acciones), estados, estados)
+
+        # tablas del modelo de acciones como listas de Python, más rápidas de indexar de una en una
+        self.movimientos = self.modelo.movimientos.tolist()
+        self.dx, self.dy = self.modelo.dx.tolist(), self.modelo.dy.tolist()
+        self.con_errores = (self.modelo.numero_errores > 0).tolist()
+        # probabilidad acumulada de los errores de cada acción, para la versión vectorizada
+        self.umbrales = np.cumsum(self.modelo.pesos_error[:, 1:], axis=1)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def con_generador(self, generador):
+        copia = copy.copy(self)
+        copia.generador = generador
+        return copia
+
+    def muestrea(self, estado, accion):
+        alto = self.mapa.shape[0]
+        if self.libres is not None:
+            if estado == len(self.libres):
+                return estado
+            estado = self.libres[estado]
+        x, y = divmod(int(estado), alto)
+        accion = int(accion)
+        columna = 0
+        if self.con_errores[accion]:
+            u = self.generador.random()
+            if u < self.prob_error:
+                columna = self.modelo.elige_movimiento(accion, u / self.prob_error)
+        if self.mapa[y, x] != 1:
+            movimiento = self.movimientos[accion][columna]
+            x, y = x + self.dx[movimiento], y + self.dy[movimiento]
+        siguiente = (x*alto + y) % self.mapa.size
+        return siguiente if self.libres is None else int(self.compactos[siguiente])
+
+    def muestrea_lote(self, estados, acciones):
+        if self.libres is not None:
+            # el sumidero es absorbente; el resto de estados se pasan a celdas y sus sucesores de vuelta al espacio compacto
+            sumidero = len(self.libres)
+            siguientes = np.full(len(estados), sumidero, dtype=np.int64)
+            validos = estados != sumidero
+            siguientes[validos] = self.compactos[self._muestrea_celdas(self.libres[estados[validos]], acciones[validos])]
+            return siguientes
+        return self._muestrea_celdas(estados, acciones)
+
+    def _muestrea_celdas(self, estados, acciones):
+        alto = self.mapa.shape[0]
+        xs, ys = estados // alto, estados % alto
+        u = self.generador.random(len(estados))
+        columnas = np.zeros(len(estados), dtype=np.int64)
+        numero_errores = self.modelo.numero_errores[acciones]
+        error = u < self.prob_error * (numero_errores > 0)
+        umbrales = self.umbrales[acciones[error]]
+        columnas[error] = 1 + np.minimum((u[error, None] / self.prob_error >= umbrales).sum(axis=1), numero_errores[error] - 1)
+        movimientos = self.modelo.movimientos[acciones, columnas]
+        libres = self.mapa[ys, xs] != 1
+        return obtiene_indices_vectorizado(xs + self.modelo.dx[movimientos]*libres, ys + self.modelo.dy[movimientos]*libres, self.mapa)
@@ -0,0 +1,72 @@
+"""
+Compara el tiempo de construcción de un problema usando las funciones originales de problem_utils
+(bucles de Python sobre estados, acciones y errores) frente a las versiones vectorizadas con NumPy.
+También comprueba que ambas versiones devuelven exactamente el mismo resultado.
+
+Uso, desde la raíz del repositorio:
+    python -m benchmarks.bench_construccion [--prob-error 0.2] [--repeticiones 3] [mapa ...]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+import AprendizajeRefuerzUS.problem_utils as problem_utils
+
+ACCIONES = ['esperar','N','NE','E','SE','S','SO','O','NO']
+MAPAS = os.path.join(os.path.dirname(__file__), '..', 'AprendizajeRefuerzUS', 'maps')
+
+
+def construye_bucles(mapa, destino, prob_error):
+    estados = problem_utils.genera_estados(mapa)
+    recompensas = problem_utils.crea_recompensas_sistema(estados, destino, mapa, ACCIONES)
+    transiciones = np.array([problem_utils.crea_transiciones_movimiento(a, prob_error, estados, mapa) for a in ACCIONES])
+    politica = problem_utils.crea_politica_greedy(estados, ACCIONES, mapa, destino)
+    return recompensas, transiciones, politica
+
+
+def construye_vectorizado(mapa, destino, prob_error):
+    recompensas = problem_utils.crea_recompensas_vectorizado(destino, mapa, ACCIONES)
+    transiciones = problem_utils.crea_transiciones_vectorizado(ACCIONES, prob_error, mapa)
+    politica = problem_utils.crea_politica_greedy_vectorizada(ACCIONES, mapa, destino)
+    return recompensas, transiciones, politica
+
+
+def mide(funcion, repeticiones, *args):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mapas', nargs='*', default=[os.path.join(MAPAS, m) for m in ('map1.txt', 'map2.txt', 'map3.txt')])
+    parser.add_argument('--prob-error', type=float, default=0.2)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mapa':<12}{'estados':>10}{'bucles (s)':>14}{'vectorizado (s)':>18}{'aceleracion':>14}")
+    for fichero in args.mapas:
+        mapa, destino = problem_utils.lee_mapa(fichero)
+        t_bucles, (r0, t0, p0) = mide(construye_bucles, args.repeticiones, mapa, destino, args.prob_error)
+        t_vector, (r1, t1, p1) = mide(construye_vectorizado, args.repeticiones, mapa, destino, args.prob_error)
+
+        assert r0.dtype == r1.dtype and np.array_equal(r0, r1), "Las recompensas no coinciden"
+        assert t0.dtype == t1.dtype and np.array_equal(t0, t1), "Las transiciones no coinciden"
+        assert p0 == p1, "Las políticas greedy no coinciden"
+
+        d0 = problem_utils.crea_transiciones_dispersas(ACCIONES, args.prob_error, problem_utils.genera_estados(mapa), mapa)
+        d1 = problem_utils.crea_transiciones_vectorizado(ACCIONES, args.prob_error, mapa, dispersa=True)
+        assert np.array_equal(d0.sucesores, d1.sucesores) and np.array_equal(d0.probabilidades, d1.probabilidades), \
+            "Las transiciones dispersas no coinciden"
+
+        print(f"{os.path.basename(fichero):<12}{mapa.size:>10}{t_bucles:>14.4f}{t_vector:>18.4f}{t_bucles/t_vector:>13.1f}x")
+
+
+if __name__ == '__main__':
+    main()
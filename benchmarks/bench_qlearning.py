@@ -0,0 +1,45 @@
+"""
+Compara el motor nativo de Q_Learning con el de mdptoolbox: tiempo de entrenamiento y pasos por segundo con el mismo
+número de pasos. No mide la calidad de la política: con la exploración y el factor de aprendizaje decrecientes de
+mdptoolbox ninguno de los dos motores converge en un número de pasos razonable para un benchmark (con un millón de pasos
+en map2.txt la política coincide con la óptima en menos del 25% de las celdas libres).
+
+Uso, desde la raíz del repositorio:
+    python -m benchmarks.bench_qlearning [--iteraciones 100000] [--prob-error 0.2] [--semilla 0] [mapa ...]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.Q_Learning import Q_Learning
+
+MAPAS = os.path.join(os.path.dirname(__file__), '..', 'AprendizajeRefuerzUS', 'maps')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mapas', nargs='*', default=[os.path.join(MAPAS, m) for m in ('map1.txt', 'map2.txt')])
+    parser.add_argument('--iteraciones', type=int, default=100000)
+    parser.add_argument('--prob-error', type=float, default=0.2)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'mapa':<12}{'motor':<12}{'tiempo (s)':>12}{'pasos/s':>14}")
+    for fichero in args.mapas:
+        problema = Problem(fichero, args.prob_error)
+        for motor in ('mdptoolbox', 'nativo'):
+            np.random.seed(args.semilla)
+            kwargs = {'semilla': args.semilla} if motor == 'nativo' else {}
+            modelo = Q_Learning(problema.transiciones, problema.recompensas, max_iteraciones=args.iteraciones, motor=motor, **kwargs)
+            inicio = time.perf_counter()
+            modelo.entrenar()
+            tiempo = time.perf_counter() - inicio
+            print(f"{os.path.basename(fichero):<12}{motor:<12}{tiempo:>12.3f}{args.iteraciones/tiempo:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Batería de benchmarks reproducible de la biblioteca: tiempo y memoria de construcción de Problem, pasos por segundo de
+SARSA (episodio a episodio y vectorizado, con 64 entornos), Monte Carlo (primera visita y cada visita), Q-Learning,
+SARSA(λ), Q(λ) y Dyna-Q, y latencia de obtener_politica().
+Se ejecuta sobre los mapas incluidos (map1.txt, map2.txt y map3.txt) y sobre mapas sintéticos cuadrados de distintos
+tamaños, generados siempre con la misma semilla, y guarda los resultados en JSON para poder comparar versiones.
+
+Los problemas con más de --max-estados-densa estados se construyen solo en formato disperso.
+
+Uso, desde la raíz del repositorio:
+    python -m benchmarks.bench_rendimiento [--salida resultados.json] [--referencia anterior.json] [--tamanos 10 50 100 250 500]
+        [--episodios 200] [--pasos-episodio 100] [--repeticiones 3] [--prob-error 0.2] [--semilla 0] [mapa ...]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import AprendizajeRefuerzUS
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.sarsa import SARSA
+from AprendizajeRefuerzUS.algorithms.Montecarlo import MonteCarlo
+from AprendizajeRefuerzUS.algorithms.Q_Learning import Q_Learning
+from AprendizajeRefuerzUS.algorithms.trazas import SARSALambda, QLambda
+from AprendizajeRefuerzUS.algorithms.dyna import DynaQ
+from AprendizajeRefuerzUS.algorithms.telemetria import Telemetria
+
+MAPAS = os.path.join(os.path.dirname(__file__), '..', 'AprendizajeRefuerzUS', 'maps')
+
+# nombre -> (clase, método de entrenamiento)
+ALGORITMOS = {
+    'sarsa': (SARSA, 'entrenar'),
+    'sarsa_vectorizado': (SARSA, 'entrenar_vectorizado'),
+    'montecarlo_primera_visita': (MonteCarlo, 'entrenar_primera_visita'),
+    'montecarlo_cada_visita': (MonteCarlo, 'entrenar_cada_visita'),
+    'q_learning': (Q_Learning, 'entrenar'),
+    'sarsa_lambda': (SARSALambda, 'entrenar'),
+    'q_lambda': (QLambda, 'entrenar'),
+    'dyna_q': (DynaQ, 'entrenar'),
+}
+
+
+def mapa_sintetico(tamano, semilla, directorio, densidad=0.2):
+    # mapa cuadrado con borde de obstáculos y obstáculos interiores aleatorios, en el formato de lee_mapa()
+    generador = np.random.default_rng(semilla)
+    mapa = (generador.random((tamano, tamano)) < densidad).astype(int)
+    mapa[0, :] = mapa[-1, :] = mapa[:, 0] = mapa[:, -1] = 1
+    filas, columnas = np.nonzero(mapa == 0)
+    if len(filas) == 0:
+        filas, columnas = np.array([tamano // 2]), np.array([tamano // 2])
+        mapa[tamano // 2, tamano // 2] = 0
+    i = generador.integers(len(filas))
+    fichero = os.path.join(directorio, f'sintetico_{tamano}x{tamano}.txt')
+    with open(fichero, 'w') as salida:
+        # las filas del fichero van de arriba abajo, la coordenada y del destino de abajo arriba
+        salida.write(f'{columnas[i]} {tamano - 1 - filas[i]}\n')
+        salida.writelines(''.join(map(str, fila)) + '\n' for fila in mapa)
+    return fichero
+
+
+def construye(fichero, prob_error, dispersa):
+    problema = Problem(fichero, prob_error, dispersa=dispersa)
+    # Problem construye las tablas la primera vez que se usan
+    problema.recompensas, problema.transiciones, problema.politica
+    return problema
+
+
+def mide_construccion(fichero, prob_error, dispersa, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        problema = construye(fichero, prob_error, dispersa)
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    construye(fichero, prob_error, dispersa)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    transiciones = problema.transiciones
+    if dispersa:
+        memoria = transiciones.sucesores.nbytes + transiciones.probabilidades.nbytes
+    else:
+        memoria = transiciones.nbytes
+    return problema, {'tiempo_construccion': min(tiempos), 'memoria_pico': pico, 'memoria_transiciones': memoria}
+
+
+def mide_algoritmo(problema, clase, metodo, episodios, pasos_episodio, semilla, repeticiones):
+    mejor = None
+    for _ in range(repeticiones):
+        telemetria = Telemetria(cambios_politica=False, guarda_episodios=False)
+        if clase is Q_Learning:
+            modelo = clase(problema.transiciones, problema.recompensas, max_iteraciones=episodios*pasos_episodio,
+                           max_episodios=episodios, pasos_por_episodio=pasos_episodio, semilla=semilla, telemetria=telemetria,
+                           motor='nativo')
+        else:
+            modelo = clase(problema.transiciones, problema.recompensas, max_iteraciones=episodios,
+                           max_pasos_episodio=pasos_episodio, semilla=semilla, telemetria=telemetria)
+        inicio = time.perf_counter()
+        getattr(modelo, metodo)()
+        tiempo = time.perf_counter() - inicio
+        if mejor is None or tiempo < mejor['tiempo']:
+            mejor = {'pasos': telemetria.pasos, 'episodios': telemetria.episodios_completados, 'tiempo': tiempo,
+                     'pasos_por_segundo': telemetria.pasos / tiempo}
+
+    llamadas = 20
+    inicio = time.perf_counter()
+    for _ in range(llamadas):
+        modelo.obtener_politica()
+    mejor['latencia_obtener_politica'] = (time.perf_counter() - inicio) / llamadas
+    return mejor
+
+
+def compara(resultados, referencia):
+    # cambio relativo de las métricas principales frente a una ejecución anterior
+    anteriores = {(r['mapa'], r['formato']): r for r in referencia['resultados']}
+    print(f"\n{'mapa':<24}{'formato':<10}{'métrica':<46}{'cambio':>10}")
+    for r in resultados:
+        anterior = anteriores.get((r['mapa'], r['formato']))
+        if anterior is None:
+            continue
+        metricas = [('tiempo_construccion', r['tiempo_construccion'], anterior['tiempo_construccion'])]
+        for nombre, datos in r['algoritmos'].items():
+            if nombre in anterior['algoritmos']:
+                metricas.append((f'{nombre}.pasos_por_segundo', datos['pasos_por_segundo'], anterior['algoritmos'][nombre]['pasos_por_segundo']))
+        for metrica, actual, previo in metricas:
+            print(f"{r['mapa']:<24}{r['formato']:<10}{metrica:<46}{actual/previo - 1:>+10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mapas', nargs='*', default=[os.path.join(MAPAS, m) for m in ('map1.txt', 'map2.txt', 'map3.txt')])
+    parser.add_argument('--tamanos', nargs='*', type=int, default=[10, 50, 100, 250, 500])
+    parser.add_argument('--episodios', type=int, default=200)
+    parser.add_argument('--pasos-episodio', type=int, default=100)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--prob-error', type=float, default=0.2)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--max-estados-densa', type=int, default=1000)
+    parser.add_argument('--salida', default='resultados_benchmark.json')
+    parser.add_argument('--referencia', default=None, help='JSON de una ejecución anterior con el que comparar')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ficheros = list(args.mapas) + [mapa_sintetico(t, args.semilla, directorio) for t in args.tamanos]
+        resultados = []
+        print(f"{'mapa':<24}{'formato':<10}{'estados':>9}{'construcción (s)':>18}{'pico (MB)':>11}"
+              + ''.join(f'{n[:14]:>16}' for n in ALGORITMOS))
+        for fichero in ficheros:
+            for dispersa in (False, True):
+                mapa = Problem(fichero, args.prob_error).mapa
+                if not dispersa and mapa.size > args.max_estados_densa:
+                    continue
+                problema, fila = mide_construccion(fichero, args.prob_error, dispersa, args.repeticiones)
+                fila = {'mapa': os.path.basename(fichero), 'formato': 'dispersa' if dispersa else 'densa',
+                        'estados': int(mapa.size), **fila, 'algoritmos': {}}
+                for nombre, (clase, metodo) in ALGORITMOS.items():
+                    fila['algoritmos'][nombre] = mide_algoritmo(problema, clase, metodo, args.episodios, args.pasos_episodio,
+                                                                args.semilla, args.repeticiones)
+                resultados.append(fila)
+                print(f"{fila['mapa']:<24}{fila['formato']:<10}{fila['estados']:>9}{fila['tiempo_construccion']:>18.4f}"
+                      f"{fila['memoria_pico']/2**20:>11.1f}"
+                      + ''.join(f"{fila['algoritmos'][n]['pasos_por_segundo']:>16.0f}" for n in ALGORITMOS))
+
+    informe = {'version': AprendizajeRefuerzUS.__version__, 'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(), 'numpy': np.__version__, 'plataforma': platform.platform(),
+               'parametros': {k: v for k, v in vars(args).items() if k not in ('salida', 'referencia')},
+               'resultados': resultados}
+    with open(args.salida, 'w') as salida:
+        json.dump(informe, salida, indent=2)
+    print(f"\nResultados guardados en {args.salida}")
+
+    if args.referencia is not None:
+        with open(args.referencia) as entrada:
+            compara(resultados, json.load(entrada))
+
+
+if __name__ == '__main__':
+    main()
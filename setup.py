@@ -1,8 +1,14 @@
+import os
+import re
 from setuptools import setup, find_packages
 
+# la versión se define solo en AprendizajeRefuerzUS/__init__.py
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AprendizajeRefuerzUS', '__init__.py')) as fichero:
+    version = re.search(r"^__version__ = '([^']+)'", fichero.read(), re.M).group(1)
+
 setup(
     name='AprendizajeRefuerzUS',
-    version='0.1',
+    version=version,
     packages=find_packages(include=['AprendizajeRefuerzUS', 'AprendizajeRefuerzUS.*']),
     description='Una aproximación al aprendizaje por refuerzo.',
     author='Ramon Gavira Sánchez y Daniel Ruiz López',
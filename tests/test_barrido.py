@@ -0,0 +1,18 @@
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.barrido import genera_configuraciones, ejecuta_barrido, ruta_mapa
+
+
+def test_barrido_reproducible_y_con_los_nombres_del_problema():
+    configuraciones = genera_configuraciones(['map1.txt'], [0.2], ['sarsa', 'q_learning'],
+                                             {'max_iteraciones': [20], 'max_pasos_episodio': [50]}, semillas=[0, 0, 1])
+    resultados = ejecuta_barrido(configuraciones, procesos=2)
+    assert [(f['algoritmo'], f['semilla']) for f in resultados] == [('sarsa', 0), ('sarsa', 1), ('q_learning', 0), ('q_learning', 1)]
+
+    acciones = set(Problem(ruta_mapa('map1.txt'), 0.2).acciones)
+    for fila in resultados:
+        assert set(fila['politica'].split()) <= acciones
+        assert 0.0 <= fila['acierto'] <= 1.0
+
+    # la misma configuración en otro barrido, repartida a otro proceso, da la misma política
+    otra = ejecuta_barrido(configuraciones[:1], procesos=1)
+    assert otra[0]['politica'] == resultados[0]['politica']
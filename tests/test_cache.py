@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+
+import AprendizajeRefuerzUS.cache as cache_modulo
+from AprendizajeRefuerzUS.cache import CacheProblemas
+from AprendizajeRefuerzUS.problem import Problem
+
+
+MAPA = os.path.join(os.path.dirname(cache_modulo.__file__), 'maps', 'map2.txt')
+
+
+def test_problema_de_la_cache_igual_al_construido(tmp_path):
+    construido = Problem(MAPA, 0.1)
+    Problem(MAPA, 0.1, cache=str(tmp_path))
+    cargado = Problem(MAPA, 0.1, cache=str(tmp_path))
+    np.testing.assert_array_equal(np.asarray(cargado.transiciones), construido.transiciones)
+    np.testing.assert_array_equal(np.asarray(cargado.recompensas), construido.recompensas)
+    assert list(cargado.politica) == list(construido.politica)
+
+
+def test_carga_de_un_problema_eliminado_por_otro_proceso_es_un_fallo(tmp_path, monkeypatch):
+    cache = CacheProblemas(str(tmp_path))
+    cache.guarda('clave', {'recompensas': np.zeros((3, 2))})
+    listdir = os.listdir
+
+    def elimina_y_lista(ruta):
+        # otro proceso libera la entrada justo después de que carga() haya comprobado que existe
+        if ruta == os.path.join(str(tmp_path), 'clave'):
+            cache.elimina(ruta)
+        return listdir(ruta)
+
+    monkeypatch.setattr(cache_modulo.os, 'listdir', elimina_y_lista)
+    assert cache.carga('clave') is None
+    monkeypatch.undo()
+    assert cache.carga('clave') is None
+    assert cache.entradas() == []
+
+
+def test_libera_espacio_conserva_los_mas_recientes(tmp_path):
+    cache = CacheProblemas(str(tmp_path), tamano_maximo=1)
+    cache.guarda('antiguo', {'a': np.zeros(10)})
+    os.utime(os.path.join(str(tmp_path), 'antiguo'), (0, 0))
+    cache.guarda('nuevo', {'a': np.zeros(10)})
+    assert cache.carga('antiguo') is None
+    assert cache.carga('nuevo') is not None
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.problem_utils import guarda_mapa
+from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValor
+from AprendizajeRefuerzUS.algorithms.sarsa import SARSA
+from AprendizajeRefuerzUS.algorithms.util import actualiza_modelo
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+# celdas junto al destino de map1 (40, 7): dos libres que pasan a ser obstáculo y un obstáculo que pasa a estar libre
+CELDAS = [(39, 8), (41, 6), (42, 7)]
+
+
+def reconstruye(problema, tmp_path, **opciones):
+    fichero = tmp_path / 'cambiado.txt'
+    guarda_mapa(fichero, problema.mapa, problema.destino)
+    return Problem(fichero, problema.prob_error, **opciones)
+
+
+@pytest.mark.parametrize('dispersa', [False, True])
+def test_cambia_celdas_igual_que_reconstruir(dispersa, tmp_path):
+    problema = Problem(os.path.join(MAPAS, 'map1.txt'), 0.1, dispersa=dispersa)
+    # se construyen las tablas antes del cambio para que se actualicen en lugar de crearse de cero
+    problema.recompensas, problema.transiciones
+    estados = problema.cambia_celdas(CELDAS)
+    nuevo = reconstruye(problema, tmp_path, dispersa=dispersa)
+
+    alto = problema.mapa.shape[0]
+    assert {x*alto + y for x, y in CELDAS} <= set(np.asarray(estados).tolist())
+    np.testing.assert_array_equal(problema.recompensas, nuevo.recompensas)
+    if dispersa:
+        np.testing.assert_array_equal(problema.transiciones.a_densa(), nuevo.transiciones.a_densa())
+    else:
+        np.testing.assert_array_equal(problema.transiciones, nuevo.transiciones)
+    assert problema.politica == nuevo.politica
+
+
+def test_repara_igual_que_resolver_de_nuevo(tmp_path):
+    problema = Problem(os.path.join(MAPAS, 'map1.txt'), 0.1, dispersa=True)
+    vi = IteracionValor(problema.transiciones, problema.recompensas, metodo='priorizado', tolerancia=1e-8)
+    vi.entrenar()
+    estados = problema.cambia_celdas(CELDAS)
+    vi.repara(estados, problema.transiciones, problema.recompensas)
+
+    nuevo = reconstruye(problema, tmp_path, dispersa=True)
+    referencia = IteracionValor(nuevo.transiciones, nuevo.recompensas, tolerancia=1e-8)
+    referencia.entrenar()
+    np.testing.assert_allclose(vi.valores, referencia.valores, atol=1e-5)
+    assert vi.obtener_politica() == referencia.obtener_politica()
+
+
+def test_actualiza_modelo_conserva_q_fuera_de_los_cambios(tmp_path):
+    problema = Problem(os.path.join(MAPAS, 'map1.txt'), 0.1, dispersa=True)
+    modelo = SARSA(problema.transiciones, problema.recompensas, max_iteraciones=50, semilla=0)
+    modelo.entrenar()
+    anterior = modelo.tabla_q.copy()
+
+    estados = problema.cambia_celdas(CELDAS)
+    actualiza_modelo(modelo, estados, problema.transiciones, problema.recompensas)
+
+    otros = np.setdiff1d(np.arange(len(anterior)), estados)
+    np.testing.assert_array_equal(modelo.tabla_q[otros], anterior[otros])
+
+    # la tabla de sucesores y los terminales quedan como si el algoritmo se hubiera creado con el mapa nuevo
+    nuevo = reconstruye(problema, tmp_path, dispersa=True)
+    referencia = SARSA(nuevo.transiciones, nuevo.recompensas, semilla=0)
+    np.testing.assert_array_equal(modelo.sucesores, referencia.sucesores)
+    np.testing.assert_array_equal(modelo.probabilidades, referencia.probabilidades)
+    np.testing.assert_array_equal(modelo.terminales, referencia.terminales)
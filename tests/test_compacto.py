@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValor
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+
+@pytest.mark.parametrize('dispersa', [False, True])
+def test_estados_alineados_con_las_tablas(dispersa):
+    problema = Problem(os.path.join(MAPAS, 'map2.txt'), 0.1, dispersa=dispersa, compacto=True)
+    estados = problema.estados
+    assert len(estados) == problema.recompensas.shape[0] == problema.transiciones.shape[1] == len(problema.politica)
+    assert estados[-1] is None
+    alto = problema.mapa.shape[0]
+    assert [x*alto + y for x, y in estados[:-1]] == problema.libres.tolist()
+
+
+@pytest.mark.parametrize('mapa', ['map1.txt', 'map2.txt'])
+def test_iteracion_valor_compacta_igual_que_la_completa(mapa):
+    completo = Problem(os.path.join(MAPAS, mapa), 0.2, dispersa=True)
+    compacto = Problem(os.path.join(MAPAS, mapa), 0.2, dispersa=True, compacto=True)
+    vi = IteracionValor(completo.transiciones, completo.recompensas, tolerancia=1e-8)
+    vi.entrenar()
+    vi_compacto = IteracionValor(compacto.transiciones, compacto.recompensas, tolerancia=1e-8)
+    vi_compacto.entrenar()
+
+    libres = compacto.libres
+    np.testing.assert_allclose(vi_compacto.valores[:-1], vi.valores[libres], atol=1e-6)
+    np.testing.assert_allclose(vi_compacto.tabla_q[:-1], vi.tabla_q[libres], atol=1e-6)
+    # el sumidero tiene el valor de cualquier obstáculo
+    obstaculo = int(np.flatnonzero(compacto.compactos == len(libres))[0])
+    assert vi_compacto.valores[-1] == pytest.approx(vi.valores[obstaculo])
+    assert compacto.politica[:-1] == [completo.politica[c] for c in libres]
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.util import DistribucionInicial
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+N = 200000
+
+
+def terminales_mapa(nombre):
+    problema = Problem(os.path.join(MAPAS, nombre), 0.1, dispersa=True)
+    return np.asarray(problema.recompensas).sum(axis=1) == 0
+
+
+def frecuencias(muestras, estados):
+    return np.bincount(muestras, minlength=estados) / len(muestras)
+
+
+def comprueba_frecuencias(observadas, esperadas, n=N):
+    # desviación máxima de 5 sigmas por estado
+    sigma = np.sqrt(esperadas * (1 - esperadas) / n)
+    assert (np.abs(observadas - esperadas) <= 5*sigma + 1e-12).all()
+
+
+@pytest.mark.parametrize('nombre', ['map1.txt', 'map2.txt'])
+def test_modo_por_defecto_uniforme_sobre_no_terminales(nombre):
+    terminales = terminales_mapa(nombre)
+    distribucion = DistribucionInicial(terminales, semilla=0)
+    lote = distribucion.muestrea_lote(N)
+    uno_a_uno = np.array([distribucion.muestrea() for _ in range(5000)])
+
+    assert not terminales[lote].any() and not terminales[uno_a_uno].any()
+    esperadas = np.where(terminales, 0.0, 1.0 / (~terminales).sum())
+    comprueba_frecuencias(frecuencias(lote, len(terminales)), esperadas)
+    np.testing.assert_array_equal(distribucion.validos, np.flatnonzero(~terminales))
+
+
+def test_modo_entero_siempre_el_mismo_estado():
+    terminales = terminales_mapa('map1.txt')
+    inicio = int(np.flatnonzero(~terminales)[10])
+    distribucion = DistribucionInicial(terminales, inicio=inicio, semilla=0)
+
+    assert all(distribucion.muestrea() == inicio for _ in range(100))
+    lote = distribucion.muestrea_lote(1000)
+    assert lote.dtype == np.int64 and (lote == inicio).all()
+
+
+def test_modo_entero_rechaza_estados_terminales():
+    terminales = terminales_mapa('map1.txt')
+    with pytest.raises(AssertionError):
+        DistribucionInicial(terminales, inicio=int(np.flatnonzero(terminales)[0]))
+    with pytest.raises(AssertionError):
+        DistribucionInicial(terminales, inicio=len(terminales))
+
+
+def test_modo_pesos_proporcional_e_ignora_terminales():
+    terminales = terminales_mapa('map1.txt')
+    generador = np.random.default_rng(3)
+    pesos = generador.random(len(terminales))
+    # la mitad de los estados no terminales tienen peso 0 y los terminales tienen pesos grandes que se deben ignorar
+    pesos[np.flatnonzero(~terminales)[::2]] = 0
+    pesos[terminales] = 100
+    distribucion = DistribucionInicial(terminales, inicio=pesos, semilla=0)
+    lote = distribucion.muestrea_lote(N)
+    uno_a_uno = np.array([distribucion.muestrea() for _ in range(5000)])
+
+    validos = ~terminales & (pesos > 0)
+    assert validos[lote].all() and validos[uno_a_uno].all()
+    esperadas = np.where(validos, pesos, 0.0)
+    esperadas /= esperadas.sum()
+    comprueba_frecuencias(frecuencias(lote, len(terminales)), esperadas)
+    comprueba_frecuencias(frecuencias(uno_a_uno, len(terminales)), esperadas, n=len(uno_a_uno))
+
+
+def test_modo_pesos_rechaza_pesos_no_validos():
+    terminales = terminales_mapa('map1.txt')
+    with pytest.raises(AssertionError):
+        DistribucionInicial(terminales, inicio=np.where(terminales, 1.0, 0.0))
+    with pytest.raises(AssertionError):
+        DistribucionInicial(terminales, inicio=-np.ones(len(terminales)))
+    with pytest.raises(AssertionError):
+        DistribucionInicial(terminales, inicio=np.ones(len(terminales) - 1))
@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.dyna import ColaPrioridad, DynaQ
+from AprendizajeRefuerzUS.algorithms.sarsa import SARSA
+from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValor, evalua_politica
+from AprendizajeRefuerzUS.algorithms.telemetria import Telemetria
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+
+def test_cola_extrae_en_orden_de_prioridad():
+    generador = np.random.default_rng(0)
+    cola = ColaPrioridad(200)
+    referencia = {}
+    for _ in range(20):
+        for clave, prioridad in zip(generador.integers(200, size=50).tolist(), generador.random(50).tolist()):
+            cola.inserta(clave, prioridad)
+            referencia[clave] = max(referencia.get(clave, 0.0), prioridad)
+        assert len(cola) == len(referencia)
+        for _ in range(30):
+            clave, prioridad = cola.extrae()
+            if clave < 0:
+                assert not referencia
+                break
+            assert prioridad == referencia.pop(clave) == max([prioridad] + list(referencia.values()))
+    while referencia:
+        clave, prioridad = cola.extrae()
+        assert prioridad == referencia.pop(clave)
+    assert cola.extrae() == (-1, 0.0)
+    assert len(cola) == 0
+
+
+def test_cola_borrado_perezoso():
+    cola = ColaPrioridad(10)
+    cola.inserta(3, 0.5)
+    cola.inserta(3, 0.2)  # con menos prioridad no cambia nada
+    assert cola.n == 1 and cola.actual[3] == 0.5
+    cola.inserta(3, 0.9)  # con más prioridad la entrada anterior queda obsoleta en el montículo
+    cola.inserta(4, 0.7)
+    assert cola.n == 3 and len(cola) == 2
+    assert cola.extrae() == (3, 0.9)
+    assert cola.extrae() == (4, 0.7)
+    # la entrada obsoleta de la clave 3 se descarta al llegar a la cima
+    assert cola.extrae() == (-1, 0.0)
+    assert cola.n == 0
+
+    cola.inserta(5, 0.1)
+    cola.vacia()
+    assert len(cola) == 0 and cola.extrae() == (-1, 0.0)
+    cola.inserta(5, 0.1)
+    assert cola.extrae() == (5, 0.1)
+
+
+def test_cola_compacta_al_superar_el_umbral():
+    cola = ColaPrioridad(10)
+    cola.inserta(0, 1.0)
+    for i in range(1, 66):
+        cola.inserta(0, 1.0 + i)
+        assert cola.n == i + 1
+    # 67 entradas con una sola vigente superan 2*1 + 64: el montículo se reconstruye con la vigente
+    cola.inserta(0, 100.0)
+    assert cola.n == 1 and len(cola) == 1
+    assert cola.extrae() == (0, 100.0)
+
+    for clave in range(5):
+        cola.inserta(clave, 1.0 + clave)
+    cola.inserta(1, 10.0)
+    cola.inserta(2, 20.0)
+    cola.compacta()
+    assert cola.n == 5
+    assert cola.prioridades[:cola.n] == [20.0, 10.0, 5.0, 4.0, 1.0]
+    assert [cola.extrae()[0] for _ in range(5)] == [2, 1, 4, 3, 0]
+
+
+@pytest.mark.parametrize('mapa, episodios', [('map1.txt', 100), ('map2.txt', 50)])
+def test_dyna_q_llega_al_optimo_con_menos_pasos_que_sarsa(mapa, episodios):
+    problema = Problem(os.path.join(MAPAS, mapa), 0.1, dispersa=True)
+    transiciones, recompensas = problema.transiciones, problema.recompensas
+    optima = IteracionValor(transiciones, recompensas, tolerancia=1e-10)
+    optima.entrenar()
+    libres = (problema.mapa.T.ravel() == 0) & (recompensas.sum(axis=1) != 0)
+
+    def perdida(modelo):
+        # lo que pierde la política greedy aprendida frente a la óptima en el peor estado libre
+        valores = evalua_politica(np.argmax(modelo.tabla_q, axis=1), recompensas, transiciones.sucesores,
+                                  transiciones.probabilidades, 0.9, tolerancia=1e-10)
+        return np.max(optima.valores[libres] - valores[libres])
+
+    dyna = DynaQ(transiciones, recompensas, max_iteraciones=episodios, max_pasos_episodio=100, pasos_planificacion=50, semilla=0)
+    dyna.entrenar()
+    assert perdida(dyna) < 1e-6
+
+    telemetria = Telemetria(cambios_politica=False)
+    sarsa = SARSA(transiciones, recompensas, max_iteraciones=2*episodios, max_pasos_episodio=100, semilla=0, telemetria=telemetria)
+    sarsa.entrenar()
+    assert telemetria.pasos > dyna.pasos_reales
+    assert perdida(sarsa) > 1.0
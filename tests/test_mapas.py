@@ -0,0 +1,43 @@
+import os
+import pathlib
+
+import numpy as np
+import pytest
+
+import AprendizajeRefuerzUS.problem_utils as problem_utils
+from AprendizajeRefuerzUS.generador_mapas import genera_mapa
+from AprendizajeRefuerzUS.problem import Problem
+
+
+MAPA = pathlib.Path(problem_utils.__file__).parent / 'maps' / 'map2.txt'
+
+
+@pytest.mark.parametrize('extension', ['.txt', '.mapa'])
+@pytest.mark.parametrize('como_ruta', [False, True])
+def test_guarda_y_lee_mapa(tmp_path, extension, como_ruta):
+    mapa, destino = problem_utils.lee_mapa(MAPA)
+    fichero = tmp_path / ('copia' + extension)
+    if not como_ruta:
+        fichero = str(fichero)
+    problem_utils.guarda_mapa(fichero, mapa, destino)
+    leido, leido_destino = problem_utils.lee_mapa(fichero)
+    np.testing.assert_array_equal(leido, mapa)
+    assert leido_destino == destino
+
+
+def test_problem_acepta_rutas_path():
+    con_ruta = Problem(MAPA, 0.1)
+    con_texto = Problem(os.fspath(MAPA), 0.1)
+    np.testing.assert_array_equal(con_ruta.transiciones, con_texto.transiciones)
+    np.testing.assert_array_equal(con_ruta.recompensas, con_texto.recompensas)
+
+
+@pytest.mark.parametrize('tipo', ['aleatorio', 'laberinto', 'habitaciones'])
+def test_generador_reproducible_con_contorno(tipo):
+    mapa, destino = genera_mapa(tipo, 21, 31, semilla=3)
+    otro, otro_destino = genera_mapa(tipo, 21, 31, semilla=3)
+    np.testing.assert_array_equal(mapa, otro)
+    assert destino == otro_destino
+    assert mapa.shape == (21, 31)
+    assert mapa[0].all() and mapa[-1].all() and mapa[:, 0].all() and mapa[:, -1].all()
+    assert mapa[int(destino[1]), int(destino[0])] == 0
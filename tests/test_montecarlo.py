@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.algorithms.util import retornos_descontados
+from AprendizajeRefuerzUS.algorithms.Montecarlo import MonteCarlo
+from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValor
+
+
+def retornos_directos(recompensas, factor_descuento):
+    # definición directa, O(T^2): G_t = sum_{i >= t} factor_descuento**(i-t) * r_i
+    return np.array([sum(factor_descuento**(i - t)*recompensas[i] for i in range(t, len(recompensas)))
+                     for t in range(len(recompensas))])
+
+
+def cadena_determinista(estados=6):
+    # pasillo sin ciclos de estados 0..estados-1 con el último terminal: la acción 0 avanza una casilla con recompensa -1
+    # y la 1 avanza dos con recompensa -1.8, algo mejor que dos pasos de -1 descontados con 0.9
+    transiciones = np.zeros((2, estados, estados))
+    recompensas = np.zeros((estados, 2))
+    for s in range(estados - 1):
+        transiciones[0, s, s + 1] = 1.0
+        transiciones[1, s, min(s + 2, estados - 1)] = 1.0
+        recompensas[s] = [-1.0, -1.8]
+    transiciones[:, estados - 1, estados - 1] = 1.0
+    return transiciones, recompensas
+
+
+@pytest.mark.parametrize('longitud', [0, 1, 2, 7, 50])
+@pytest.mark.parametrize('factor_descuento', [0.0, 0.5, 0.9, 1.0])
+def test_retornos_descontados_coinciden_con_la_definicion(longitud, factor_descuento):
+    generador = np.random.default_rng(longitud)
+    recompensas = generador.normal(size=longitud)
+    retornos = retornos_descontados(recompensas, factor_descuento)
+    assert retornos.shape == (longitud,)
+    np.testing.assert_allclose(retornos, retornos_directos(recompensas, factor_descuento), rtol=1e-12, atol=1e-12)
+
+
+def test_retornos_descontados_usa_las_recompensas_posteriores():
+    # el retorno de cada paso incluye las recompensas que le siguen, no solo la del propio paso
+    np.testing.assert_allclose(retornos_descontados([1.0, 0.0, 10.0], 0.5), [3.5, 5.0, 10.0])
+
+
+@pytest.mark.parametrize('metodo', ['entrenar_primera_visita', 'entrenar_cada_visita'])
+@pytest.mark.parametrize('semilla', [0, 1, 2])
+def test_montecarlo_converge_a_la_q_de_iteracion_de_valores(metodo, semilla):
+    transiciones, recompensas = cadena_determinista()
+    optimo = IteracionValor(transiciones, recompensas, factor_descuento=0.9, tolerancia=1e-10)
+    optimo.entrenar()
+
+    # con transiciones deterministas y paso 1, Q(s,a) es el último retorno observado, que acaba siendo el de la política óptima
+    # (sin ciclos ningún episodio se trunca, así que todos los retornos son completos)
+    mc = MonteCarlo(transiciones, recompensas, factor_descuento=0.9, max_iteraciones=2000, modo_actualizacion='constante',
+                    factor_aprendizaje=1.0, semilla=semilla, max_pasos_episodio=50)
+    getattr(mc, metodo)()
+
+    no_terminales = ~mc.terminales
+    np.testing.assert_allclose(mc.tabla_q[no_terminales], optimo.tabla_q[no_terminales], atol=1e-8)
+    np.testing.assert_array_equal(mc.politica[no_terminales], optimo.politica[no_terminales])
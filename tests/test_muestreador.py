@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.util import MuestreadorSucesores, tabla_sucesores, tablas_alias_filas
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+N = 200000
+
+
+@pytest.fixture(scope='module')
+def problemas():
+    ruta = os.path.join(MAPAS, 'map1.txt')
+    return Problem(ruta, 0.3), Problem(ruta, 0.3, dispersa=True)
+
+
+def estado(problema, x, y):
+    return x*problema.mapa.shape[0] + y
+
+
+def distribucion_alias(principal, umbral, alias, estados):
+    # probabilidad exacta de cada sucesor que implica la tabla alias de una fila
+    k = len(principal)
+    distribucion = np.zeros(estados)
+    np.add.at(distribucion, principal, umbral / k)
+    np.add.at(distribucion, alias, (1 - umbral) / k)
+    return distribucion
+
+
+def test_tablas_alias_reproducen_las_probabilidades(problemas):
+    densa, dispersa = problemas
+    sucesores, probabilidades = tabla_sucesores(dispersa.transiciones)
+    acciones, estados, k = sucesores.shape
+    umbral, alias = tablas_alias_filas(sucesores.reshape(-1, k), probabilidades.reshape(-1, k))
+    transiciones = np.asarray(densa.transiciones)
+    principal = sucesores.reshape(-1, k)
+    for fila in range(acciones*estados):
+        a, s = divmod(fila, estados)
+        implicada = distribucion_alias(principal[fila], umbral[fila], alias[fila], estados)
+        np.testing.assert_allclose(implicada, transiciones[a, s], atol=1e-12)
+
+
+@pytest.mark.parametrize('x, y', [(6, 2), (1, 1)])
+@pytest.mark.parametrize('dispersa', [False, True])
+def test_frecuencias_empiricas_de_los_sucesores(problemas, x, y, dispersa):
+    # (6, 2) está en una zona abierta y (1, 1) en una esquina, donde los deslizamientos contra la pared se quedan en el sitio
+    densa = problemas[0]
+    transiciones = np.asarray(densa.transiciones)
+    sucesores, probabilidades = tabla_sucesores(problemas[1].transiciones if dispersa else transiciones)
+    muestreador = MuestreadorSucesores(sucesores, probabilidades, semilla=0)
+    s = estado(densa, x, y)
+    estados = transiciones.shape[1]
+    # solo las acciones con deslizamiento tienen más de un sucesor
+    con_deslizamiento = [a for a in range(transiciones.shape[0]) if (transiciones[a, s] > 0).sum() > 1]
+    assert len(con_deslizamiento) > 0
+    for a in con_deslizamiento:
+        esperadas = transiciones[a, s]
+        lote = muestreador.muestrea_lote(np.full(N, s, dtype=np.int64), np.full(N, a, dtype=np.int64))
+        uno_a_uno = np.array([muestreador.muestrea(s, a) for _ in range(20000)])
+        for muestras in (lote, uno_a_uno):
+            observadas = np.bincount(muestras, minlength=estados) / len(muestras)
+            sigma = np.sqrt(esperadas * (1 - esperadas) / len(muestras))
+            assert (np.abs(observadas - esperadas) <= 5*sigma + 1e-12).all()
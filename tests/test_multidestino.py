@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.problem import Problem, ProblemaMultidestino
+from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValor
+
+
+MAPA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps', 'map2.txt')
+DESTINOS = [(1, 1), (20, 7), (37, 13)]
+
+
+def test_planificacion_por_lotes_igual_que_cada_destino_por_separado():
+    familia = ProblemaMultidestino(MAPA, 0.1, destinos=DESTINOS, dispersa=True)
+    familia.planifica(tolerancia=1e-8)
+    for i, destino in enumerate(DESTINOS):
+        problema = familia.problema(destino)
+        vi = IteracionValor(problema.transiciones, problema.recompensas, tolerancia=1e-8)
+        vi.entrenar()
+        np.testing.assert_allclose(familia.planificador.valores[i], vi.valores, atol=1e-6)
+        assert familia.politica(destino) == vi.obtener_politica()
+
+
+def test_problema_de_un_destino_igual_que_uno_independiente():
+    familia = ProblemaMultidestino(MAPA, 0.1, destinos=DESTINOS)
+    mapa = Problem(MAPA, 0.1)
+    for destino in DESTINOS:
+        problema = familia.problema(destino)
+        independiente = Problem(MAPA, 0.1)
+        independiente.destino = destino
+        np.testing.assert_array_equal(problema.recompensas, independiente.crea_recompensas_sistema())
+        assert problema.transiciones is familia.transiciones
+        np.testing.assert_array_equal(problema.transiciones, mapa.transiciones)
+
+
+def test_destino_sobre_un_obstaculo():
+    with pytest.raises(AssertionError, match='obstáculos'):
+        ProblemaMultidestino(MAPA, 0.1, destinos=[(5, 5)])
+
+
+def test_los_problemas_de_la_familia_no_se_pueden_cambiar():
+    familia = ProblemaMultidestino(MAPA, 0.1, destinos=DESTINOS)
+    for problema in (familia.problema(0), familia.base):
+        with pytest.raises(AssertionError, match='familia'):
+            problema.cambia_celdas([(2, 2)])
+    assert familia.base.mapa[2, 2] == 0
+
+
+def test_el_problema_no_depende_de_los_algoritmos():
+    codigo = "import sys, AprendizajeRefuerzUS.problem; print(any(m.startswith('AprendizajeRefuerzUS.algorithms') for m in sys.modules))"
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    salida = subprocess.run([sys.executable, '-c', codigo], cwd=raiz, capture_output=True, text=True, check=True)
+    assert salida.stdout.strip() == 'False'
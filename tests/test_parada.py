@@ -0,0 +1,62 @@
+import os
+import time
+
+import numpy as np
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.sarsa import SARSA
+from AprendizajeRefuerzUS.algorithms.Q_Learning import Q_Learning
+from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValor
+from AprendizajeRefuerzUS.algorithms.parada import CriterioParada
+from tests.test_montecarlo import cadena_determinista
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+
+def test_para_con_la_politica_estable():
+    transiciones, recompensas = cadena_determinista()
+    parada = CriterioParada(episodios_estables=50, episodios_minimos=200)
+    sarsa = SARSA(transiciones, recompensas, max_iteraciones=100000, factor_aprendizaje=0.2, semilla=0, max_pasos_episodio=50, parada=parada)
+    sarsa.entrenar()
+
+    assert parada.motivo == 'politica_estable'
+    assert 200 <= sarsa.episodios < 100001
+    assert parada.episodios == sarsa.episodios and parada.episodios_sin_cambios >= 50
+    optimo = IteracionValor(transiciones, recompensas, tolerancia=1e-10)
+    optimo.entrenar()
+    no_terminales = ~sarsa.terminales
+    np.testing.assert_array_equal(np.argmax(sarsa.tabla_q, axis=1)[no_terminales], optimo.politica[no_terminales])
+
+
+def test_para_con_la_tolerancia():
+    # en una cadena determinista Q-Learning converge a Q*, así que los cambios de Q acaban siendo menores que cualquier tolerancia
+    transiciones, recompensas = cadena_determinista()
+    parada = CriterioParada(tolerancia=1e-6)
+    modelo = Q_Learning(transiciones, recompensas, max_iteraciones=10**7, pasos_por_episodio=50, motor='nativo', semilla=0, parada=parada)
+    modelo.entrenar()
+
+    assert parada.motivo == 'tolerancia'
+    assert parada.cambio_q < 1e-6
+    assert modelo.iteraciones < 10**7
+
+
+def test_para_con_el_tiempo_maximo():
+    problema = Problem(os.path.join(MAPAS, 'map2.txt'), 0.1, dispersa=True)
+    parada = CriterioParada(tiempo_maximo=0.2)
+    sarsa = SARSA(problema.transiciones, problema.recompensas, max_iteraciones=10**7, max_pasos_episodio=100, semilla=0, parada=parada)
+    inicio = time.perf_counter()
+    sarsa.entrenar()
+
+    assert parada.motivo == 'tiempo'
+    assert sarsa.episodios < 10**7
+    assert time.perf_counter() - inicio < 5
+
+
+def test_sin_criterio_se_completan_todos_los_episodios():
+    transiciones, recompensas = cadena_determinista()
+    parada = CriterioParada()
+    sarsa = SARSA(transiciones, recompensas, max_iteraciones=300, semilla=0, max_pasos_episodio=50, parada=parada)
+    sarsa.entrenar()
+    assert parada.motivo is None
+    assert sarsa.episodios == parada.episodios == 301
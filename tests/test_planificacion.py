@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+import mdptoolbox.mdp
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValor, IteracionPolitica, evalua_politica
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+
+@pytest.fixture(scope='module', params=['map1.txt', 'map2.txt'])
+def referencia(request):
+    problema = Problem(os.path.join(MAPAS, request.param), 0.1)
+    vi = mdptoolbox.mdp.ValueIteration(problema.transiciones, problema.recompensas, 0.9, epsilon=1e-10, max_iter=100000)
+    vi.run()
+    return problema, np.array(vi.V), np.array(vi.policy)
+
+
+def comprueba(modelo, problema, valores, politica):
+    transiciones, recompensas = problema.transiciones, problema.recompensas
+    np.testing.assert_allclose(modelo.valores, valores, atol=1e-4)
+    # las políticas pueden diferir en los empates; el valor de la política obtenida tiene que ser el óptimo y,
+    # donde la mejor acción es única, la acción tiene que ser la de mdptoolbox
+    q = recompensas + 0.9*np.einsum('ast,t->sa', transiciones, valores)
+    ordenadas = np.sort(q, axis=1)
+    unica = ordenadas[:, -1] - ordenadas[:, -2] > 1e-3
+    np.testing.assert_array_equal(modelo.politica[unica], politica[unica])
+    estados = np.arange(len(valores))
+    sucesores = np.broadcast_to(estados, transiciones.shape)
+    np.testing.assert_allclose(evalua_politica(modelo.politica, recompensas, sucesores, transiciones, 0.9, tolerancia=1e-10),
+                               valores, atol=1e-4)
+
+
+@pytest.mark.parametrize('metodo', ['jacobi', 'gauss-seidel', 'priorizado'])
+def test_iteracion_valor_igual_que_mdptoolbox(metodo, referencia):
+    problema, valores, politica = referencia
+    modelo = IteracionValor(problema.transiciones, problema.recompensas, tolerancia=1e-9, max_iteraciones=10000, metodo=metodo)
+    modelo.entrenar()
+    comprueba(modelo, problema, valores, politica)
+
+
+@pytest.mark.parametrize('arranque', ['valores0', 'politica0'])
+def test_iteracion_valor_con_arranque_en_caliente(arranque, referencia):
+    problema, valores, politica = referencia
+    inicial = {'valores0': valores + np.random.default_rng(0).normal(0, 5, len(valores)), 'politica0': problema.politica}[arranque]
+    modelo = IteracionValor(problema.transiciones, problema.recompensas, tolerancia=1e-9, max_iteraciones=10000, **{arranque: inicial})
+    modelo.entrenar()
+    comprueba(modelo, problema, valores, politica)
+
+
+@pytest.mark.parametrize('evaluacion', ['iterativa', 'exacta'])
+@pytest.mark.parametrize('arranque', [False, True])
+def test_iteracion_politica_igual_que_mdptoolbox(evaluacion, arranque, referencia):
+    problema, valores, politica = referencia
+    modelo = IteracionPolitica(problema.transiciones, problema.recompensas, evaluacion=evaluacion, tolerancia=1e-10,
+                               max_iteraciones_evaluacion=100000, politica0=problema.politica if arranque else None)
+    modelo.entrenar()
+    comprueba(modelo, problema, valores, politica)
+
+
+@pytest.mark.parametrize('mapa', ['map1.txt', 'map2.txt'])
+def test_repara_igual_que_mdptoolbox(mapa):
+    problema = Problem(os.path.join(MAPAS, mapa), 0.1)
+    modelo = IteracionValor(problema.transiciones, problema.recompensas, tolerancia=1e-9, max_iteraciones=10000, metodo='priorizado')
+    modelo.entrenar()
+    x, y = map(int, problema.destino)
+    # dos celdas libres junto al destino pasan a ser obstáculos
+    celdas = [(x + dx, y + dy) for dx in (-2, -1, 1, 2) for dy in (-1, 0, 1) if problema.mapa[y + dy, x + dx] == 0][:2]
+    estados = problema.cambia_celdas(celdas)
+    modelo.repara(estados, problema.transiciones, problema.recompensas)
+
+    vi = mdptoolbox.mdp.ValueIteration(problema.transiciones, problema.recompensas, 0.9, epsilon=1e-10, max_iter=100000)
+    vi.run()
+    comprueba(modelo, problema, np.array(vi.V), np.array(vi.policy))
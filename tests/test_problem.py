@@ -0,0 +1,88 @@
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+import AprendizajeRefuerzUS.problem_utils as problem_utils
+from AprendizajeRefuerzUS.problem import Problem
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+# sha256 de las transiciones, las recompensas (tipo, forma y bytes) y la política greedy que construía la versión
+# original de Problem, con sus bucles de Python, para cada mapa y probabilidad de error
+ORIGINAL = {
+    ('map1.txt', 0.1): ('cbb745e022cfb5fb25aa0b89497177b0996363d51cfa1f3f3ffb515785e8e1a8',
+                        '6f32809965f76f48fba2bb257be5768d1bfe4f7894ab63df0ed5068e3607a010',
+                        '464e3e3048a7c62b327bdf8df9bfe820bde3520ecd2f7d670217b13dd5ab09f4'),
+    ('map1.txt', 0.2): ('474616ce074a870ad82fcdb246dc81b43d2449f67b25a4d1948de30f1274b88c',
+                        '6f32809965f76f48fba2bb257be5768d1bfe4f7894ab63df0ed5068e3607a010',
+                        '464e3e3048a7c62b327bdf8df9bfe820bde3520ecd2f7d670217b13dd5ab09f4'),
+    ('map2.txt', 0.1): ('e9ebfcebb245c4ccf446fabcaa39983cbcbfb99d820cab5d76986b23073f0f81',
+                        '40bcdd1b9b13203826732e33879213f6de415e39b563d8b1b5d9295a03033a5e',
+                        'd88e22a06e95e01301c44f6883ba3eaff513c10a97895355f8b315329f7d15fc'),
+    ('map2.txt', 0.2): ('2d63a0146a2dbd48c538ad4cf36ee57472a65529906001ab72128cbb85423be5',
+                        '40bcdd1b9b13203826732e33879213f6de415e39b563d8b1b5d9295a03033a5e',
+                        'd88e22a06e95e01301c44f6883ba3eaff513c10a97895355f8b315329f7d15fc'),
+    ('map3.txt', 0.1): ('c8d9c9e2793ffdaf2c6d0cfc060cd59333832495578449cb119384f61e8794d1',
+                        '7ed85a8a88fb620e30b4a2990828fc6564d6cecadbc8e08216bdbe763fa6953d',
+                        '5d4617931105730d1006daf136f7fbbece79b0ee16d455634d81f4a9a3dc16d8'),
+    ('map3.txt', 0.2): ('aec10b9427322445e9eead34c61311b35bbbb2073ee2b33564dd142c393aea4e',
+                        '7ed85a8a88fb620e30b4a2990828fc6564d6cecadbc8e08216bdbe763fa6953d',
+                        '5d4617931105730d1006daf136f7fbbece79b0ee16d455634d81f4a9a3dc16d8'),
+}
+
+
+def huella(array):
+    array = np.ascontiguousarray(array)
+    return hashlib.sha256(repr((array.dtype.str, array.shape)).encode() + array.tobytes()).hexdigest()
+
+
+@pytest.mark.parametrize('mapa, prob_error', sorted(ORIGINAL))
+def test_problem_identico_al_original(mapa, prob_error):
+    problema = Problem(os.path.join(MAPAS, mapa), prob_error)
+    transiciones, recompensas, politica = ORIGINAL[(mapa, prob_error)]
+    assert huella(problema.transiciones) == transiciones
+    assert huella(problema.recompensas) == recompensas
+    assert hashlib.sha256(' '.join(problema.politica).encode()).hexdigest() == politica
+
+
+@pytest.mark.parametrize('mapa', ['map1.txt', 'map2.txt', 'map3.txt'])
+def test_formato_disperso_igual_que_el_denso(mapa):
+    densa = Problem(os.path.join(MAPAS, mapa), 0.2)
+    dispersa = Problem(os.path.join(MAPAS, mapa), 0.2, dispersa=True)
+    np.testing.assert_array_equal(dispersa.transiciones.a_densa(), densa.transiciones)
+    np.testing.assert_array_equal(dispersa.recompensas, densa.recompensas)
+    assert dispersa.politica == densa.politica
+
+
+@pytest.mark.parametrize('conectividad, deslizamiento', [(8, None), (4, None), (8, {'N': {'NE': 0.8, 'NO': 0.2}, 'S': ['SE', 'SO']})])
+def test_modelo_generativo_sigue_las_transiciones(conectividad, deslizamiento):
+    problema = Problem(os.path.join(MAPAS, 'map2.txt'), 0.3, dispersa=True, conectividad=conectividad, deslizamiento=deslizamiento)
+    transiciones = problema.transiciones.a_densa()
+    np.testing.assert_allclose(transiciones.sum(axis=2), 1.0)
+
+    generador = np.random.default_rng(0)
+    modelo = problema.modelo_generativo().con_generador(generador)
+    acciones, estados, _ = transiciones.shape
+    muestras = 20000
+    pares = generador.choice(acciones*estados, size=200, replace=False)
+    for a, s in zip(pares // estados, pares % estados):
+        siguientes = modelo.muestrea_lote(np.full(muestras, s), np.full(muestras, a))
+        frecuencias = np.bincount(siguientes, minlength=estados) / muestras
+        np.testing.assert_allclose(frecuencias, transiciones[a, s], atol=0.02)
+
+
+def test_constructores_vectorizados_igual_que_los_bucles():
+    problema = Problem(os.path.join(MAPAS, 'map1.txt'), 0.1)
+    mapa, destino, acciones = problema.mapa, problema.destino, problema.acciones
+    estados = problem_utils.genera_estados(mapa)
+    assert estados == problema.estados
+
+    np.testing.assert_array_equal(np.array(problem_utils.crea_recompensas_sistema(estados, destino, mapa, acciones), dtype=np.float64),
+                                  problema.recompensas)
+    for i, accion in enumerate(acciones):
+        np.testing.assert_array_equal(problem_utils.crea_transiciones_movimiento(accion, 0.1, estados, mapa), problema.transiciones[i])
+    np.testing.assert_array_equal(problem_utils.crea_transiciones_dispersas(acciones, 0.1, estados, mapa).a_densa(), problema.transiciones)
+    assert problem_utils.crea_politica_greedy(estados, acciones, mapa, destino) == problema.politica
@@ -0,0 +1,88 @@
+import functools
+import os
+
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.sarsa import SARSA
+from AprendizajeRefuerzUS.algorithms.Montecarlo import MonteCarlo
+from AprendizajeRefuerzUS.algorithms.Q_Learning import Q_Learning
+from AprendizajeRefuerzUS.algorithms.trazas import SARSALambda, QLambda
+from AprendizajeRefuerzUS.algorithms.dyna import DynaQ
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+EPISODIOS = 40
+
+# cada algoritmo con su forma de entrenar y el parámetro que fija el número de episodios; DynaQ no está porque no
+# guarda su cola de prioridad y al reanudar la vuelve a llenar, así que no sigue exactamente el mismo camino
+ALGORITMOS = {
+    'sarsa': (functools.partial(SARSA, max_pasos_episodio=200), 'entrenar', 'max_iteraciones'),
+    'montecarlo_primera_visita': (functools.partial(MonteCarlo, max_pasos_episodio=200), 'entrenar_primera_visita', 'max_iteraciones'),
+    'montecarlo_cada_visita': (functools.partial(MonteCarlo, max_pasos_episodio=200), 'entrenar_cada_visita', 'max_iteraciones'),
+    'q_learning': (functools.partial(Q_Learning, motor='nativo', max_iteraciones=10**7, pasos_por_episodio=200), 'entrenar', 'max_episodios'),
+    'sarsa_lambda': (functools.partial(SARSALambda, max_pasos_episodio=200), 'entrenar', 'max_iteraciones'),
+    'q_lambda': (functools.partial(QLambda, max_pasos_episodio=200), 'entrenar', 'max_iteraciones'),
+}
+
+
+@pytest.fixture(scope='module')
+def problema():
+    return Problem(os.path.join(MAPAS, 'map2.txt'), 0.1, dispersa=True)
+
+
+def crea(nombre, problema, episodios, **opciones):
+    clase, metodo, parametro = ALGORITMOS[nombre]
+    modelo = clase(problema.transiciones, problema.recompensas, semilla=3, **{parametro: episodios}, **opciones)
+    return modelo, getattr(modelo, metodo)
+
+
+@pytest.mark.parametrize('nombre', sorted(ALGORITMOS))
+def test_reanudar_igual_que_sin_interrumpir(nombre, problema, tmp_path):
+    seguido, entrenar = crea(nombre, problema, 2*EPISODIOS)
+    entrenar()
+
+    fichero = str(tmp_path / 'punto_control.npz')
+    interrumpido, entrenar = crea(nombre, problema, EPISODIOS, punto_control=fichero, episodios_punto_control=7)
+    entrenar()
+    reanudado, entrenar = crea(nombre, problema, 2*EPISODIOS, punto_control=fichero, episodios_punto_control=7)
+    entrenar()
+
+    assert interrumpido.episodios < reanudado.episodios == seguido.episodios
+    np.testing.assert_array_equal(reanudado.tabla_q, seguido.tabla_q)
+    assert reanudado.obtener_politica() == seguido.obtener_politica()
+
+
+def test_dyna_q_restaura_el_estado_guardado(problema, tmp_path):
+    fichero = str(tmp_path / 'punto_control.npz')
+    interrumpido = DynaQ(problema.transiciones, problema.recompensas, max_iteraciones=EPISODIOS, max_pasos_episodio=200,
+                         semilla=3, punto_control=fichero)
+    interrumpido.entrenar()
+    # con el mismo número de episodios ya no queda nada por entrenar: solo se carga el punto de control
+    reanudado = DynaQ(problema.transiciones, problema.recompensas, max_iteraciones=EPISODIOS, max_pasos_episodio=200,
+                      semilla=3, punto_control=fichero)
+    reanudado.entrenar()
+    assert reanudado.episodios == interrumpido.episodios
+    np.testing.assert_array_equal(reanudado.tabla_q, interrumpido.tabla_q)
+    np.testing.assert_array_equal(reanudado.valores, np.where(interrumpido.terminales, 0.0, interrumpido.tabla_q.max(axis=1)))
+
+
+@pytest.mark.parametrize('nombre', sorted(ALGORITMOS))
+def test_volver_a_entrenar_sin_punto_de_control(nombre, problema, tmp_path):
+    modelo, entrenar = crea(nombre, problema, EPISODIOS)
+    entrenar()
+    episodios, anterior = modelo.episodios, modelo.tabla_q.copy()
+    # sin punto de control una segunda llamada vuelve a completar todos los episodios
+    entrenar()
+    assert modelo.episodios == episodios
+    assert not np.array_equal(modelo.tabla_q, anterior)
+
+    fichero = str(tmp_path / 'punto_control.npz')
+    modelo, entrenar = crea(nombre, problema, EPISODIOS, punto_control=fichero)
+    entrenar()
+    anterior = modelo.tabla_q.copy()
+    # con punto de control el entrenamiento ya está terminado y solo se carga
+    entrenar()
+    np.testing.assert_array_equal(modelo.tabla_q, anterior)
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.sarsa import SARSA
+from AprendizajeRefuerzUS.algorithms.planificacion import IteracionValor, evalua_politica
+from AprendizajeRefuerzUS.algorithms.telemetria import Telemetria
+from tests.test_montecarlo import cadena_determinista
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+
+@pytest.mark.parametrize('n_entornos', [1, 8, 64])
+def test_vectorizado_converge_a_la_politica_optima(n_entornos):
+    transiciones, recompensas = cadena_determinista()
+    optimo = IteracionValor(transiciones, recompensas, factor_descuento=0.9, tolerancia=1e-10)
+    optimo.entrenar()
+
+    sarsa = SARSA(transiciones, recompensas, max_iteraciones=3000, epsilon=0.1, factor_aprendizaje=0.2, semilla=0, max_pasos_episodio=50)
+    sarsa.entrenar_vectorizado(n_entornos)
+    no_terminales = ~sarsa.terminales
+    np.testing.assert_array_equal(np.argmax(sarsa.tabla_q, axis=1)[no_terminales], optimo.politica[no_terminales])
+
+
+def test_vectorizado_en_map1():
+    problema = Problem(os.path.join(MAPAS, 'map1.txt'), 0.1, dispersa=True)
+    transiciones, recompensas = problema.transiciones, problema.recompensas
+    libres = (problema.mapa.T.ravel() == 0) & (recompensas.sum(axis=1) != 0)
+
+    def valor_medio(modelo):
+        valores = evalua_politica(np.argmax(modelo.tabla_q, axis=1), recompensas, transiciones.sucesores,
+                                  transiciones.probabilidades, 0.9, tolerancia=1e-8)
+        return np.mean(valores[libres])
+
+    telemetria = Telemetria(cambios_politica=False)
+    sarsa = SARSA(transiciones, recompensas, max_iteraciones=1000, max_pasos_episodio=100, semilla=0, telemetria=telemetria)
+    inicial = valor_medio(sarsa)
+    sarsa.entrenar_vectorizado(64)
+
+    # se completan exactamente max_iteraciones + 1 episodios, aunque terminen varios entornos en el mismo paso
+    assert sarsa.episodios == telemetria.episodios_completados == len(telemetria.episodios) == 1001
+    assert all(1 <= e['pasos'] <= 100 and e['tiempo'] > 0 for e in telemetria.episodios)
+    # el tiempo de cada episodio es el que ha estado en curso su entorno, no el transcurrido desde el último registro
+    assert sum(e['tiempo'] for e in telemetria.episodios) > telemetria.tiempo_total
+    assert valor_medio(sarsa) > inicial + 50
+
+
+def test_vectorizado_reanuda_desde_el_contador(tmp_path):
+    problema = Problem(os.path.join(MAPAS, 'map2.txt'), 0.1, dispersa=True)
+    fichero = str(tmp_path / 'punto_control.npz')
+    interrumpido = SARSA(problema.transiciones, problema.recompensas, max_iteraciones=200, max_pasos_episodio=100, semilla=0,
+                         punto_control=fichero, episodios_punto_control=50)
+    interrumpido.entrenar_vectorizado(16)
+    telemetria = Telemetria(cambios_politica=False)
+    reanudado = SARSA(problema.transiciones, problema.recompensas, max_iteraciones=500, max_pasos_episodio=100, semilla=0,
+                      punto_control=fichero, telemetria=telemetria)
+    reanudado.entrenar_vectorizado(16)
+    assert interrumpido.episodios == 201
+    assert reanudado.episodios == 501 and telemetria.episodios_completados == 300
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.problem_utils import ModeloGenerativo
+from AprendizajeRefuerzUS.algorithms.util import MuestreadorSucesores, DistribucionInicial, tabla_sucesores
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+
+def secuencias(crea, muestrea, n=500):
+    # dos instancias con la misma semilla, con el generador global reiniciado entre medias, dan las mismas muestras
+    primero = crea()
+    np.random.seed(0)
+    a = [muestrea(primero, i) for i in range(n)]
+    segundo = crea()
+    np.random.seed(1)
+    b = [muestrea(segundo, i) for i in range(n)]
+    np.random.random(100)
+    return a, b
+
+
+def test_muestreador_sucesores_con_semilla():
+    problema = Problem(os.path.join(MAPAS, 'map1.txt'), 0.3, dispersa=True)
+    sucesores, probabilidades = tabla_sucesores(problema.transiciones)
+    estados = sucesores.shape[1]
+    a, b = secuencias(lambda: MuestreadorSucesores(sucesores, probabilidades, semilla=7),
+                      lambda m, i: int(m.muestrea((i*37) % estados, i % 9)))
+    assert a == b
+    assert len(set(a)) > 1
+
+
+def test_distribucion_inicial_con_semilla():
+    terminales = np.zeros(100, dtype=bool)
+    terminales[::3] = True
+    a, b = secuencias(lambda: DistribucionInicial(terminales, semilla=7), lambda d, i: int(d.muestrea()))
+    assert a == b
+    a, b = secuencias(lambda: DistribucionInicial(terminales, np.arange(100.0), semilla=7), lambda d, i: d.muestrea_lote(3).tolist())
+    assert a == b
+
+
+def test_modelo_generativo_y_paso_con_semilla():
+    problema = Problem(os.path.join(MAPAS, 'map1.txt'), 0.3)
+    estados = problema.mapa.size
+    a, b = secuencias(lambda: ModeloGenerativo(problema.mapa, 0.3, problema.modelo_acciones, semilla=7),
+                      lambda m, i: int(m.muestrea((i*37) % estados, i % 9)))
+    assert a == b
+    a, b = secuencias(lambda: Problem(os.path.join(MAPAS, 'map1.txt'), 0.3, semilla=7),
+                      lambda p, i: tuple(map(int, p.paso((i*37) % estados, i % 9))))
+    assert a == b
@@ -0,0 +1,86 @@
+import csv
+import json
+import os
+
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.problem import Problem
+from AprendizajeRefuerzUS.algorithms.sarsa import SARSA
+from AprendizajeRefuerzUS.algorithms.Montecarlo import MonteCarlo
+from AprendizajeRefuerzUS.algorithms.Q_Learning import Q_Learning
+from AprendizajeRefuerzUS.algorithms.telemetria import Telemetria
+
+
+MAPAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AprendizajeRefuerzUS', 'maps')
+
+
+@pytest.fixture(scope='module')
+def problema():
+    return Problem(os.path.join(MAPAS, 'map2.txt'), 0.1, dispersa=True)
+
+
+def test_registra_episodios_y_pasos(problema):
+    recibidos = []
+    telemetria = Telemetria(callbacks=recibidos.append, fases=True)
+    sarsa = SARSA(problema.transiciones, problema.recompensas, max_iteraciones=50, max_pasos_episodio=80, semilla=0, telemetria=telemetria)
+    sarsa.entrenar()
+
+    assert telemetria.episodios_completados == sarsa.episodios == len(telemetria.episodios) == 51
+    assert recibidos == telemetria.episodios
+    assert telemetria.pasos == sum(e['pasos'] for e in telemetria.episodios)
+    assert telemetria.truncados == sum(e['truncado'] for e in telemetria.episodios)
+    for e in telemetria.episodios:
+        # un episodio solo se corta al agotar los pasos
+        assert 1 <= e['pasos'] <= 80 and (e['pasos'] == 80 or not e['truncado'])
+        assert e['error_td_max'] >= e['error_td_medio'] >= 0
+        assert 0 <= e['cambios_politica'] <= sarsa.estados
+    assert [e['episodio'] for e in telemetria.episodios] == list(range(1, 52))
+    assert set(telemetria.tiempos) == {'seleccion', 'muestreo', 'actualizacion'} and all(t > 0 for t in telemetria.tiempos.values())
+    resumen = telemetria.resumen()
+    assert resumen['pasos'] == telemetria.pasos and resumen['episodios'] == 51
+
+
+def test_pasos_coinciden_con_las_iteraciones_de_q_learning(problema):
+    telemetria = Telemetria(cambios_politica=False, guarda_episodios=False)
+    modelo = Q_Learning(problema.transiciones, problema.recompensas, max_iteraciones=3000, pasos_por_episodio=100, motor='nativo',
+                        semilla=0, telemetria=telemetria)
+    modelo.entrenar()
+    assert telemetria.pasos == modelo.iteraciones == 3000
+    assert telemetria.episodios_completados == modelo.episodios
+    assert telemetria.episodios == []
+
+
+def test_montecarlo_sin_error_td(problema):
+    telemetria = Telemetria()
+    modelo = MonteCarlo(problema.transiciones, problema.recompensas, max_iteraciones=10, max_pasos_episodio=50, semilla=0, telemetria=telemetria)
+    modelo.entrenar_primera_visita()
+    assert telemetria.episodios_completados == 11
+    assert all(e['error_td_medio'] is None and e['error_td_max'] is None for e in telemetria.episodios)
+
+
+def test_exporta_csv_y_json(problema, tmp_path):
+    telemetria = Telemetria()
+    modelo = MonteCarlo(problema.transiciones, problema.recompensas, max_iteraciones=5, max_pasos_episodio=30, semilla=0, telemetria=telemetria)
+    modelo.entrenar_cada_visita()
+    sarsa = SARSA(problema.transiciones, problema.recompensas, max_iteraciones=5, max_pasos_episodio=30, semilla=0, telemetria=telemetria)
+    sarsa.entrenar()
+
+    telemetria.exporta_json(tmp_path / 'telemetria.json')
+    with open(tmp_path / 'telemetria.json') as entrada:
+        datos = json.load(entrada)
+    assert datos == {'resumen': telemetria.resumen(), 'episodios': telemetria.episodios}
+
+    telemetria.exporta_csv(tmp_path / 'telemetria.csv')
+    with open(tmp_path / 'telemetria.csv', newline='') as entrada:
+        filas = list(csv.DictReader(entrada))
+    assert len(filas) == len(telemetria.episodios) == 12
+    for fila, registro in zip(filas, telemetria.episodios):
+        assert set(fila) == set(registro)
+        for clave, valor in registro.items():
+            if valor is None:
+                assert fila[clave] == ''
+            elif isinstance(valor, bool):
+                assert fila[clave] == str(valor)
+            else:
+                assert type(valor)(fila[clave]) == valor
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from AprendizajeRefuerzUS.algorithms.trazas import TrazasElegibilidad, SARSALambda, QLambda
+from AprendizajeRefuerzUS.algorithms.sarsa import AprendizajeTD, SARSA
+
+
+@pytest.mark.parametrize('reemplazo', [False, True])
+def test_trazas_coinciden_con_una_tabla_densa(reemplazo):
+    claves, umbral, factor = 50, 1e-2, 0.7
+    generador = np.random.default_rng(0)
+    trazas = TrazasElegibilidad(claves, reemplazo, umbral, capacidad=4)
+    densas = np.zeros(claves)
+    q, q_densa = np.zeros(claves), np.zeros(claves)
+    for paso in range(2000):
+        indice = int(generador.integers(claves))
+        trazas.visita(indice)
+        densas[indice] = 1.0 if reemplazo else densas[indice] + 1.0
+        trazas.actualiza(q, 0.5)
+        q_densa += 0.5*densas
+        if paso % 97 == 96:
+            trazas.vacia()
+            densas[:] = 0.0
+        else:
+            trazas.decae(factor)
+            densas *= factor
+            densas[densas < umbral] = 0.0
+
+        activos = trazas.indices[:trazas.n]
+        assert len(set(activos.tolist())) == trazas.n
+        np.testing.assert_array_equal(trazas.posicion[activos], np.arange(trazas.n))
+        assert (trazas.posicion >= 0).sum() == trazas.n
+        reconstruidas = np.zeros(claves)
+        reconstruidas[activos] = trazas.valores[:trazas.n]
+        np.testing.assert_allclose(reconstruidas, densas, rtol=1e-12)
+    np.testing.assert_allclose(q, q_densa, rtol=1e-12)
+
+
+def test_trazas_comparten_la_base_de_sarsa():
+    transiciones = np.zeros((5, 3, 3))
+    transiciones[:, [0, 1, 2], [1, 2, 2]] = 1.0
+    recompensas = np.array([[-1.0]*5, [-1.0]*5, [0.0]*5])
+    for clase in (SARSALambda, QLambda):
+        modelo = clase(transiciones, recompensas, max_iteraciones=20, semilla=0)
+        assert isinstance(modelo, AprendizajeTD) and not isinstance(modelo, SARSA)
+        assert not hasattr(modelo, 'entrenar_vectorizado')
+        modelo.entrenar()
+        assert modelo.episodios == 21
+        assert len(modelo.obtener_politica()) == 3